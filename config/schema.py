@@ -0,0 +1,109 @@
+"""
+Схема OpenAPI (Swagger) проекта.
+
+Схема генерируется заранее командой generate_api_schema и отдается из файла
+с ETag и долгим кешированием. Если файла нет, схема генерируется при первом
+запросе и хранится в памяти процесса.
+"""
+
+import hashlib
+import threading
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control
+from drf_yasg import openapi
+from drf_yasg.codecs import OpenAPICodecJson, OpenAPICodecYaml
+from drf_yasg.views import get_schema_view
+from rest_framework import permissions
+
+API_INFO = openapi.Info(
+    title="Studing Place API",
+    default_version='v1',
+    description="API для платформы обучения с курсами и уроками",
+    terms_of_service="https://www.google.com/policies/terms/",
+    contact=openapi.Contact(email="contact@studingplace.local"),
+    license=openapi.License(name="BSD License"),
+)
+
+# Swagger configuration
+schema_view = get_schema_view(
+    API_INFO,
+    public=True,
+    permission_classes=[permissions.AllowAny],
+)
+
+SCHEMA_FORMATS = {
+    '.json': (OpenAPICodecJson, 'application/json; charset=utf-8'),
+    '.yaml': (OpenAPICodecYaml, 'application/yaml; charset=utf-8'),
+}
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def generate_schema(format):
+    """Генерирует схему в формате '.json' или '.yaml'"""
+    codec_class, _ = SCHEMA_FORMATS[format]
+    generator = schema_view.generator_class(API_INFO)
+    schema = generator.get_schema(request=None, public=True)
+    return codec_class(validators=[]).encode(schema)
+
+
+def get_schema_path(format):
+    return settings.API_SCHEMA_DIR / f'swagger{format}'
+
+
+def write_schema_files():
+    """Генерирует схему во всех форматах и сохраняет в API_SCHEMA_DIR"""
+    settings.API_SCHEMA_DIR.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for format in SCHEMA_FORMATS:
+        path = get_schema_path(format)
+        path.write_bytes(generate_schema(format))
+        paths.append(path)
+    reset_schema_cache()
+    return paths
+
+
+def get_schema(format):
+    """
+    Возвращает (содержимое, ETag) схемы.
+    Берет сгенерированный файл, а при его отсутствии генерирует схему
+    один раз на процесс.
+    """
+    path = get_schema_path(format)
+    try:
+        version = path.stat().st_mtime_ns
+    except FileNotFoundError:
+        version = None
+
+    cached = _cache.get(format)
+    if cached and cached[0] == version:
+        return cached[1], cached[2]
+
+    with _cache_lock:
+        cached = _cache.get(format)
+        if cached and cached[0] == version:
+            return cached[1], cached[2]
+        content = path.read_bytes() if version is not None else generate_schema(format)
+        etag = '"%s"' % hashlib.sha256(content).hexdigest()[:32]
+        _cache[format] = (version, content, etag)
+    return content, etag
+
+
+def reset_schema_cache():
+    with _cache_lock:
+        _cache.clear()
+
+
+def schema_file_view(request, format):
+    """Отдает схему с ETag и заголовками долгого кеширования"""
+    content, etag = get_schema(format)
+    if etag in request.headers.get('If-None-Match', ''):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(content, content_type=SCHEMA_FORMATS[format][1])
+    response['ETag'] = etag
+    patch_cache_control(response, public=True, max_age=settings.API_SCHEMA_CACHE_MAX_AGE)
+    return response
@@ -92,6 +92,16 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+# Время жизни кеша ролей пользователя в процессе, секунды (0 - только кеш на запрос)
+ROLES_CACHE_TTL = 0
+
+# Кеш ответов списков курсов и уроков (courses.cache): алиас из CACHES
+# и время жизни ответа в секундах (0 - кеш отключен). Включать только
+# с общим для всех процессов бэкендом кеша (Redis, Memcached):
+# LocMemCache по умолчанию у каждого процесса свой
+LIST_CACHE_ALIAS = 'default'
+LIST_CACHE_TIMEOUT = 0
+
 # Кастомная модель пользователя
 AUTH_USER_MODEL = 'users.User'
 
@@ -199,12 +209,20 @@ SWAGGER_SETTINGS = {
     'DEEP_LINKING': True,
     'SHOW_EXTENSIONS': True,
     'SHOW_COMMON_EXTENSIONS': True,
+    # Интерфейс загружает заранее сгенерированную схему вместо генерации на каждый запрос
+    'SPEC_URL': ('schema-json', {'format': '.json'}),
 }
 
 REDOC_SETTINGS = {
     'LAZY_RENDERING': False,
+    'SPEC_URL': ('schema-json', {'format': '.json'}),
 }
 
+# Каталог со сгенерированной схемой API (команда generate_api_schema)
+API_SCHEMA_DIR = BASE_DIR / 'schema'
+# Время кеширования схемы клиентами, секунды
+API_SCHEMA_CACHE_MAX_AGE = 60 * 60 * 24
+
 # Stripe settings
 STRIPE_PUBLISHABLE_KEY = 'pk_test_your_publishable_key_here'
 STRIPE_SECRET_KEY = 'sk_test_your_secret_key_here'
@@ -20,26 +20,10 @@ from django.urls import path, include, re_path
 from django.conf import settings
 from django.conf.urls.static import static
 from django.shortcuts import render
-from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from courses.views import course_list_view, lesson_list_view
 from users.views import user_list_view, index_view
-from rest_framework import permissions
-from drf_yasg.views import get_schema_view
-from drf_yasg import openapi
-
-# Swagger configuration
-schema_view = get_schema_view(
-    openapi.Info(
-        title="Studing Place API",
-        default_version='v1',
-        description="API для платформы обучения с курсами и уроками",
-        terms_of_service="https://www.google.com/policies/terms/",
-        contact=openapi.Contact(email="contact@studingplace.local"),
-        license=openapi.License(name="BSD License"),
-    ),
-    public=True,
-    permission_classes=[permissions.AllowAny],
-)
+from users.authentication import RoleTokenObtainPairView, RoleTokenRefreshView
+from config.schema import schema_view, schema_file_view
 
 urlpatterns = [
     # HTML Pages
@@ -53,8 +37,8 @@ urlpatterns = [
     path("admin/", admin.site.urls),
     
     # JWT Authentication endpoints (открытые для неавторизованных)
-    path("api/token/", TokenObtainPairView.as_view(), name='token_obtain_pair'),
-    path("api/token/refresh/", TokenRefreshView.as_view(), name='token_refresh'),
+    path("api/token/", RoleTokenObtainPairView.as_view(), name='token_obtain_pair'),
+    path("api/token/refresh/", RoleTokenRefreshView.as_view(), name='token_refresh'),
     
     # API endpoints
     path("api/courses/", include('courses.urls')),
@@ -65,7 +49,7 @@ urlpatterns = [
     path("payment/cancel/", lambda request: render(request, 'payment_cancel.html'), name='payment-cancel'),
     
     # API Documentation
-    re_path(r'^swagger(?P<format>\.json|\.yaml)$', schema_view.without_ui(cache_timeout=0), name='schema-json'),
+    re_path(r'^swagger(?P<format>\.json|\.yaml)$', schema_file_view, name='schema-json'),
     path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
     path('redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
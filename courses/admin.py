@@ -1,9 +1,12 @@
 from django.contrib import admin
 from django.core.exceptions import ValidationError
-from django.forms import ModelForm, inlineformset_factory
+from django.core.paginator import Paginator
+from django.forms import BaseInlineFormSet, ModelForm, inlineformset_factory
+from django.http import QueryDict
 from django.utils.html import format_html
+from .admin_filters import AutocompleteFilter, AutocompleteFilterMixin
 from .models import Course, Lesson, Subscription
-from .validators import validate_youtube_url
+from .validators import check_youtube_url
 
 
 class LessonAdminForm(ModelForm):
@@ -16,31 +19,80 @@ class LessonAdminForm(ModelForm):
     def clean_video_link(self):
         """Валидация video_link поля в админке"""
         video_link = self.cleaned_data.get('video_link')
-        if video_link:
-            try:
-                validate_youtube_url(video_link)
-            except ValidationError as e:
-                raise ValidationError(f"Ошибка валидации ссылки: {e}")
+        result = check_youtube_url(video_link)
+        if not result.is_valid:
+            raise ValidationError(result.message, code=result.code)
         return video_link
 
 
+class PaginatedInlineFormSet(BaseInlineFormSet):
+    """
+    Inline-формсет, который показывает и сохраняет только одну страницу объектов.
+    Номер страницы передается в параметре page_param адреса страницы
+    (форма отправляется на тот же адрес, поэтому POST относится к той же странице).
+    """
+    per_page = 20
+    page_param = 'inline_page'
+    page_number = 1
+    query_params = None
+
+    def get_queryset(self):
+        if not hasattr(self, 'page'):
+            paginator = Paginator(super().get_queryset(), self.per_page)
+            self.page = paginator.get_page(self.page_number)
+            self._queryset = self.page.object_list
+        return self._queryset
+
+    def page_links(self):
+        """Номера страниц и строки запроса для ссылок на них"""
+        self.get_queryset()
+        params = (self.query_params if self.query_params is not None else QueryDict()).copy()
+        links = []
+        for number in self.page.paginator.get_elided_page_range(self.page.number):
+            if number == Paginator.ELLIPSIS:
+                links.append((number, None))
+                continue
+            params[self.page_param] = number
+            links.append((number, params.urlencode()))
+        return links
+
+
 class LessonInline(admin.TabularInline):
-    """Inline для добавления уроков прямо в курсе"""
+    """
+    Inline для добавления уроков прямо в курсе.
+    Уроки выводятся страницами, чтобы большие курсы открывались и сохранялись быстро.
+    """
     model = Lesson
     form = LessonAdminForm
-    extra = 3  # Показывать 3 пустых формы для уроков
+    formset = PaginatedInlineFormSet
+    template = 'admin/edit_inline/tabular_paginated.html'
+    extra = 1  # Одна пустая форма для нового урока
+    per_page = 20
     fields = ['title', 'description', 'video_link', 'preview']
     readonly_fields = ['created_at']
-    
+
     def get_queryset(self, request):
         """Оптимизация запросов"""
-        return super().get_queryset(request).select_related('course', 'owner')
+        return super().get_queryset(request).select_related('course', 'owner').order_by('created_at', 'id')
+
+    def get_formset(self, request, obj=None, **kwargs):
+        """Передает в формсет номер страницы из запроса"""
+        formset = super().get_formset(request, obj, **kwargs)
+        page_param = f'{formset.get_default_prefix()}_page'
+        return type(formset.__name__, (formset,), {
+            'per_page': self.per_page,
+            'page_param': page_param,
+            'page_number': request.GET.get(page_param, 1),
+            'query_params': request.GET,
+        })
 
 
 @admin.register(Course)
-class CourseAdmin(admin.ModelAdmin):
-    list_display = ['title', 'owner', 'price_display', 'lessons_count', 'created_at']
-    list_filter = ['created_at', 'owner', 'price']
+class CourseAdmin(AutocompleteFilterMixin, admin.ModelAdmin):
+    list_display = ['title', 'owner', 'price_display', 'lessons_count', 'subscribers_count', 'created_at']
+    list_filter = ['created_at', ('owner', AutocompleteFilter), 'price']
+    list_select_related = ['owner']
+    autocomplete_fields = ['owner']
     search_fields = ['title', 'description']
     readonly_fields = ['created_at', 'updated_at']
     inlines = [LessonInline]  # Добавляем inline для уроков
@@ -70,15 +122,28 @@ class CourseAdmin(admin.ModelAdmin):
             '<span style="color: #3B82F6; font-weight: bold;">БЕСПЛАТНО</span>'
         )
     price_display.short_description = 'Цена'
+
+    def get_search_results(self, request, queryset, search_term):
+        """Результаты автодополнения курсов сортируются по названию, список - как раньше"""
+        queryset, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        if request.resolver_match and request.resolver_match.url_name == 'autocomplete':
+            queryset = queryset.order_by('title', 'pk')
+        return queryset, may_have_duplicates
     
     def lessons_count(self, obj):
-        """Количество уроков в курсе"""
-        count = obj.lessons.count()
+        """Количество уроков в курсе (денормализованный счетчик)"""
         return format_html(
             '<span style="color: #3B82F6; font-weight: bold;">{} уроков</span>',
-            count
+            obj.lessons_count
         )
     lessons_count.short_description = 'Уроки'
+    lessons_count.admin_order_field = 'lessons_count'
+
+    def subscribers_count(self, obj):
+        """Количество активных подписчиков курса (денормализованный счетчик)"""
+        return obj.subscribers_count
+    subscribers_count.short_description = 'Подписчики'
+    subscribers_count.admin_order_field = 'subscribers_count'
     
     def save_model(self, request, obj, form, change):
         """Автоматически устанавливаем владельца при создании"""
@@ -88,10 +153,12 @@ class CourseAdmin(admin.ModelAdmin):
 
 
 @admin.register(Lesson)
-class LessonAdmin(admin.ModelAdmin):
+class LessonAdmin(AutocompleteFilterMixin, admin.ModelAdmin):
     form = LessonAdminForm
     list_display = ['title', 'course', 'owner', 'video_link_status', 'created_at']
-    list_filter = ['course', 'created_at', 'owner']
+    list_filter = [('course', AutocompleteFilter), 'created_at', ('owner', AutocompleteFilter)]
+    list_select_related = ['course', 'owner']
+    autocomplete_fields = ['course', 'owner']
     search_fields = ['title', 'description', 'video_link']
     readonly_fields = ['created_at', 'updated_at']
     
@@ -117,15 +184,13 @@ class LessonAdmin(admin.ModelAdmin):
         if not obj.video_link:
             return format_html('<span style="color: #EF4444;">❌ Нет ссылки</span>')
         
-        try:
-            validate_youtube_url(obj.video_link)
+        if check_youtube_url(obj.video_link).is_valid:
             return format_html(
                 '<span style="color: #10B981;">✅ YouTube</span><br>'
                 '<a href="{}" target="_blank" style="font-size: 11px;">Открыть видео</a>',
                 obj.video_link
             )
-        except ValidationError:
-            return format_html('<span style="color: #F59E0B;">⚠️ Невалидная ссылка</span>')
+        return format_html('<span style="color: #F59E0B;">⚠️ Невалидная ссылка</span>')
     
     video_link_status.short_description = "Статус ссылки"
     
@@ -137,8 +202,10 @@ class LessonAdmin(admin.ModelAdmin):
 
 
 @admin.register(Subscription)
-class SubscriptionAdmin(admin.ModelAdmin):
+class SubscriptionAdmin(AutocompleteFilterMixin, admin.ModelAdmin):
     list_display = ['user', 'course', 'is_active', 'created_at']
-    list_filter = ['is_active', 'created_at', 'course']
+    list_filter = ['is_active', 'created_at', ('course', AutocompleteFilter)]
+    list_select_related = ['user', 'course']
+    autocomplete_fields = ['user', 'course']
     search_fields = ['user__email', 'course__title']
     readonly_fields = ['created_at']
@@ -0,0 +1,49 @@
+"""
+Фильтры админки для связей с большими таблицами.
+
+Стандартный RelatedFieldListFilter выводит в боковой панели все объекты
+связанной модели. AutocompleteFilter вместо этого показывает поле
+автодополнения, которое ищет объекты через autocomplete-представление
+админки (по search_fields связанной модели), поэтому стоимость страницы
+не зависит от размера таблицы.
+"""
+
+from django import forms
+from django.contrib import admin
+from django.contrib.admin.widgets import AutocompleteSelect
+
+
+class AutocompleteFilter(admin.RelatedFieldListFilter):
+    """
+    Фильтр по связи с полем автодополнения.
+    Использование: list_filter = [('owner', AutocompleteFilter)].
+    Связанная модель должна быть зарегистрирована в админке с search_fields.
+    """
+    template = 'admin/autocomplete_filter.html'
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        super().__init__(field, request, params, model, model_admin, field_path)
+        remote_model = field.remote_field.model
+        form_field = forms.ModelChoiceField(
+            queryset=remote_model._default_manager.all(),
+            to_field_name=field.target_field.name,
+            required=False,
+            widget=AutocompleteSelect(field, model_admin.admin_site, attrs={'style': 'width: 100%'}),
+        )
+        # Из базы загружается только выбранный объект, чтобы показать его название
+        self.rendered_widget = form_field.widget.render(self.lookup_kwarg, self.lookup_val)
+
+    def field_choices(self, field, request, model_admin):
+        return []
+
+    def has_output(self):
+        return True
+
+
+class AutocompleteFilterMixin:
+    """Подключает к ModelAdmin скрипты, нужные AutocompleteFilter"""
+
+    @property
+    def media(self):
+        widget_media = AutocompleteSelect(None, self.admin_site).media
+        return super().media + widget_media + forms.Media(js=['js/admin_autocomplete_filter.js'])
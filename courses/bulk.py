@@ -0,0 +1,95 @@
+"""
+Массовое создание и обновление уроков курса.
+
+Пакет проверяется за один проход: поля каждого урока - сериализатором,
+ссылки на видео - одним вызовом validate_many. Корректные уроки
+записываются в одной транзакции через bulk_create/bulk_update, ошибки
+возвращаются по индексу элемента и не прерывают загрузку остальных.
+bulk_create и bulk_update не отправляют сигналы, поэтому ID видео,
+поисковый индекс, счетчик уроков и кеш списков обновляются здесь же.
+"""
+
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from .cache import bump_list_cache
+from .counters import change_counter
+from .models import Lesson
+from .search import index_instances
+from .serializers import LessonBulkItemSerializer
+from .validators import validate_many
+
+BATCH_SIZE = 500
+
+
+def validate_lessons(items):
+    """
+    Проверяет элементы пакета.
+    Возвращает список (индекс, данные) корректных элементов и словарь индекс -> ошибки.
+    """
+    create_serializer = LessonBulkItemSerializer()
+    update_serializer = LessonBulkItemSerializer(partial=True)
+    valid, errors = [], {}
+    for index, item in enumerate(items):
+        serializer = update_serializer if isinstance(item, dict) and 'id' in item else create_serializer
+        try:
+            valid.append((index, serializer.run_validation(item)))
+        except ValidationError as exc:
+            errors[index] = exc.detail
+
+    # Ссылки на видео всего пакета проверяются одним вызовом
+    with_links = [(index, data) for index, data in valid if 'video_link' in data]
+    for (index, data), result in zip(with_links, validate_many([data['video_link'] for _, data in with_links])):
+        if result.is_valid:
+            data['video_id'] = result.video_id or ''
+        else:
+            errors[index] = {'video_link': [result.message]}
+    return [(index, data) for index, data in valid if index not in errors], errors
+
+
+def bulk_save_lessons(course, owner_id, items):
+    """
+    Создает уроки без id и обновляет уроки курса с id (только уроки владельца).
+    Возвращает словарь с созданными и обновленными уроками и ошибками по индексам.
+    """
+    valid, errors = validate_lessons(items)
+    update_ids = {data['id'] for _, data in valid if 'id' in data}
+    existing = {
+        lesson.pk: lesson
+        for lesson in Lesson.objects.filter(course=course, owner_id=owner_id, pk__in=update_ids)
+    }
+
+    to_create, to_update = [], []
+    update_fields = {'updated_at'}
+    now = timezone.now()
+    for index, data in valid:
+        lesson_id = data.pop('id', None)
+        if lesson_id is None:
+            to_create.append((index, Lesson(course=course, owner_id=owner_id, **data)))
+            continue
+        # pop: повторный id в том же пакете тоже считается ошибкой
+        lesson = existing.pop(lesson_id, None)
+        if lesson is None:
+            errors[index] = {'id': ['Урок не найден в курсе']}
+            continue
+        for field, value in data.items():
+            setattr(lesson, field, value)
+        lesson.updated_at = now
+        update_fields.update(data)
+        to_update.append((index, lesson))
+
+    with transaction.atomic():
+        Lesson.objects.bulk_create([lesson for _, lesson in to_create], batch_size=BATCH_SIZE)
+        if to_update:
+            Lesson.objects.bulk_update([lesson for _, lesson in to_update], sorted(update_fields), batch_size=BATCH_SIZE)
+        change_counter(course.pk, 'lessons_count', len(to_create))
+        index_instances([lesson for _, lesson in to_create + to_update])
+    if to_create or to_update:
+        bump_list_cache([owner_id, course.owner_id], everyone=True)
+
+    return {
+        'created': [{'index': index, 'id': lesson.pk} for index, lesson in to_create],
+        'updated': [{'index': index, 'id': lesson.pk} for index, lesson in to_update],
+        'errors': [{'index': index, 'errors': errors[index]} for index in sorted(errors)],
+    }
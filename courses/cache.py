@@ -0,0 +1,156 @@
+"""
+Кеш ответов списков курсов и уроков.
+
+Ответ list() сохраняется в кеше Django (настройка LIST_CACHE_ALIAS) под
+ключом из имени списка, пользователя, его роли, строки запроса и версий
+данных. Версии хранятся в том же кеше: своя у каждого пользователя и общая
+для модераторов, которые видят все курсы. Сигналы post_save/post_delete
+курсов, уроков и подписок меняют версии затронутых пользователей, после
+чего старые ответы больше не читаются и вытесняются по таймауту.
+
+По умолчанию кеш отключен (LIST_CACHE_TIMEOUT = 0). Включать его нужно
+только с общим для всех процессов бэкендом (Redis, Memcached, база данных):
+в LocMemCache версии свои в каждом процессе, и изменение, сделанное через
+один процесс, не сбрасывает списки в остальных. Если бэкенд не хранит
+значения (DummyCache), версий нет и списки не кешируются. Попадания и
+промахи считаются в процессе (get_list_cache_stats) и отдаются в заголовке
+X-Cache.
+"""
+
+import hashlib
+import logging
+import threading
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.response import Response
+
+from .roles import is_moderator
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'courses:list'
+ALL_VERSION_KEY = f'{KEY_PREFIX}:version:all'
+
+_stats = {'hits': 0, 'misses': 0}
+_stats_lock = threading.Lock()
+
+
+def _get_cache():
+    return caches[getattr(settings, 'LIST_CACHE_ALIAS', 'default')]
+
+
+def _get_timeout():
+    """Время жизни ответа в секундах (0 - кеш отключен)"""
+    return getattr(settings, 'LIST_CACHE_TIMEOUT', 0)
+
+
+def list_cache_enabled():
+    """
+    Включен ли кеш списков. Включение означает, что бэкенд кеша общий
+    для всех процессов, и версиям данных можно доверять.
+    """
+    return _get_timeout() > 0
+
+
+def _user_version_key(user_id):
+    return f'{KEY_PREFIX}:version:user:{user_id}'
+
+
+def _get_versions(keys):
+    """
+    Возвращает версии по ключам, создавая отсутствующие,
+    или None, если кеш не сохранил версию
+    """
+    cache = _get_cache()
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, uuid.uuid4().hex, None)
+            versions[key] = cache.get(key)
+            if versions[key] is None:
+                return None
+    return [versions[key] for key in keys]
+
+
+def bump_list_cache(user_ids=(), everyone=False):
+    """
+    Делает устаревшими закешированные списки пользователей user_ids,
+    а с everyone=True - и списки модераторов.
+    """
+    keys = {_user_version_key(user_id) for user_id in user_ids if user_id is not None}
+    if everyone:
+        keys.add(ALL_VERSION_KEY)
+    if keys:
+        _get_cache().set_many({key: uuid.uuid4().hex for key in keys}, None)
+
+
+def get_list_cache_key(request, name):
+    """
+    Ключ ответа списка name для текущего пользователя и строки запроса
+    или None, если версии данных недоступны
+    """
+    user_id = request.user.pk
+    moderator = is_moderator(request)
+    version_keys = [_user_version_key(user_id)]
+    if moderator:
+        version_keys.append(ALL_VERSION_KEY)
+    versions = _get_versions(version_keys)
+    if versions is None:
+        return None
+    versions = '.'.join(versions)
+    query = hashlib.md5(request.META.get('QUERY_STRING', '').encode()).hexdigest()
+    role = 'moderator' if moderator else 'user'
+    return f'{KEY_PREFIX}:{name}:{role}:{user_id}:{versions}:{query}'
+
+
+def _record(result):
+    with _stats_lock:
+        _stats[result] += 1
+
+
+def get_list_cache_stats():
+    """Счетчики попаданий и промахов кеша списков в текущем процессе"""
+    with _stats_lock:
+        stats = dict(_stats)
+    total = stats['hits'] + stats['misses']
+    stats['hit_rate'] = stats['hits'] / total if total else 0.0
+    return stats
+
+
+def reset_list_cache_stats():
+    with _stats_lock:
+        _stats.update(hits=0, misses=0)
+
+
+class CachedListMixin:
+    """
+    Кеширует ответы list() представления для текущего пользователя.
+    list_cache_name задает имя списка в ключе кеша.
+    """
+    list_cache_name = None
+
+    def list(self, request, *args, **kwargs):
+        if not list_cache_enabled() or not request.user.is_authenticated:
+            return super().list(request, *args, **kwargs)
+
+        key = get_list_cache_key(request, self.list_cache_name or type(self).__name__)
+        if key is None:
+            return super().list(request, *args, **kwargs)
+
+        cache = _get_cache()
+        data = cache.get(key)
+        if data is not None:
+            _record('hits')
+            response = Response(data)
+            response['X-Cache'] = 'HIT'
+            return response
+
+        _record('misses')
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, _get_timeout())
+        response['X-Cache'] = 'MISS'
+        logger.debug('Промах кеша списка %s', key)
+        return response
@@ -0,0 +1,126 @@
+"""
+Условные GET-запросы (ETag / Last-Modified) для курсов и уроков.
+
+Валидаторы объекта вычисляются легкими агрегирующими запросами по updated_at
+до его загрузки и сериализации. ETag списка строится из ключа кеша списков
+(courses/cache.py: пользователь, роль, строка запроса и версии данных,
+которые сигналы меняют при изменении курсов, уроков и подписок) и числа
+строк с MAX(updated_at) отфильтрованного списка. Версии хранятся в кеше,
+поэтому ETag списков отдается только при включенном кеше списков (общий
+бэкенд для всех процессов); иначе список отдается без ETag. Если клиент
+прислал совпадающий If-None-Match (или If-Modified-Since для отдельного
+объекта), возвращается 304 Not Modified без загрузки данных.
+
+Для списков и курсов (с вложенными уроками и подписками) Last-Modified
+не отправляется: после удаления строки или обновления через update()
+MAX(updated_at) может не измениться, поэтому они сравниваются только по ETag.
+"""
+
+import hashlib
+
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from .cache import get_list_cache_key, list_cache_enabled
+
+
+def make_etag(values):
+    """Строгий ETag из значений валидаторов"""
+    return quote_etag(hashlib.md5(repr(tuple(values)).encode()).hexdigest())
+
+
+class ConditionalGetMixin:
+    """
+    Поддержка If-None-Match / If-Modified-Since для list() и retrieve().
+    Представление может переопределить get_list_validators и get_object_validators.
+    Ответ 304 отдается без check_object_permissions, поэтому доступ к объектам
+    при чтении должен ограничиваться get_queryset.
+    """
+
+    def get_list_validators(self, queryset):
+        """
+        Значения для ETag отфильтрованного списка: ключ кеша списков с версиями
+        данных пользователя, число строк и MAX(updated_at). Возвращает None,
+        если версиям данных нельзя доверять.
+        """
+        if not list_cache_enabled():
+            return None
+        key = get_list_cache_key(self.request, getattr(self, 'list_cache_name', None) or type(self).__name__)
+        if key is None:
+            return None
+        aggregate = queryset.order_by().aggregate(count=Count('pk'), last_updated=Max('updated_at'))
+        return key, aggregate['count'], aggregate['last_updated']
+
+    def get_object_validators(self, queryset):
+        """
+        Возвращает (значения для ETag, время изменения или None) объекта
+        или None, если объект не найден.
+        """
+        updated_at = queryset.values_list('updated_at', flat=True).first()
+        if updated_at is None:
+            return None
+        return (updated_at,), updated_at
+
+    def _conditional_response(self, request, etag, last_modified=None):
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is not None:
+            self._set_validators(response, etag, last_modified)
+        return response
+
+    @staticmethod
+    def _set_validators(response, etag, last_modified=None):
+        response['ETag'] = etag
+        if last_modified:
+            response['Last-Modified'] = http_date(last_modified.timestamp())
+        # Содержимое зависит от пользователя
+        patch_vary_headers(response, ['Authorization'])
+
+    def filter_queryset(self, queryset):
+        # list() фильтрует queryset один раз: для ETag и для ответа
+        filtered = getattr(self, '_filtered_list_queryset', None)
+        if filtered is not None:
+            return filtered
+        return super().filter_queryset(queryset)
+
+    def list(self, request, *args, **kwargs):
+        self._filtered_list_queryset = self.filter_queryset(self.get_queryset())
+        validators = self.get_list_validators(self._filtered_list_queryset)
+        if validators is None:
+            return super().list(request, *args, **kwargs)
+
+        etag = make_etag(validators)
+        not_modified = self._conditional_response(request, etag)
+        if not_modified is not None:
+            return not_modified
+
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == 200:
+            self._set_validators(response, etag)
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            queryset = self.filter_queryset(self.get_queryset()).filter(
+                **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+            )
+            validators = self.get_object_validators(queryset)
+        except (TypeError, ValueError, ValidationError):
+            validators = None
+        if validators is None:
+            # 404 выполнит обычная обработка
+            return super().retrieve(request, *args, **kwargs)
+
+        values, last_modified = validators
+        etag = make_etag(values)
+        not_modified = self._conditional_response(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        response = super().retrieve(request, *args, **kwargs)
+        if response.status_code == 200:
+            self._set_validators(response, etag, last_modified)
+        return response
@@ -0,0 +1,94 @@
+"""
+Денормализованные счетчики курса: число уроков и активных подписчиков.
+
+Счетчики хранятся в колонках Course.lessons_count и Course.subscribers_count
+и изменяются F()-выражениями из сигналов сохранения и удаления уроков
+и подписок, поэтому списки курсов выводят и сортируют их без COUNT
+по связанным таблицам. Операции без сигналов (bulk_create, update)
+пересчитывают счетчики затронутых курсов через recount_course_counters,
+команда rebuild_course_counters пересчитывает их для всех курсов.
+Массовые удаления выполняются внутри manual_updates(), чтобы сигналы
+не обновляли счетчики и кеш списков отдельным запросом на каждую строку.
+"""
+
+import threading
+from contextlib import contextmanager
+
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Course, Lesson, Subscription
+
+COUNTER_FIELDS = Course.COUNTER_FIELDS
+
+# Модель -> (счетчик курса, поля, от которых зависит учет объекта)
+COUNTED_MODELS = {
+    Lesson: ('lessons_count', ('course',)),
+    Subscription: ('subscribers_count', ('course', 'is_active')),
+}
+
+
+_local = threading.local()
+
+
+@contextmanager
+def manual_updates():
+    """
+    Внутри блока сигналы уроков и подписок не обновляют счетчики и кеш списков:
+    вызывающий код делает это сам (recount_course_counters, bump_list_cache)
+    """
+    _local.depth = getattr(_local, 'depth', 0) + 1
+    try:
+        yield
+    finally:
+        _local.depth -= 1
+
+
+def updates_are_manual():
+    return getattr(_local, 'depth', 0) > 0
+
+
+def get_counted_queryset(field):
+    """Объекты, которые учитывает счетчик"""
+    if field == 'lessons_count':
+        return Lesson.objects.all()
+    return Subscription.objects.filter(is_active=True)
+
+
+def get_counted_course_id(instance):
+    """Курс, в счетчике которого учтен объект, или None"""
+    if isinstance(instance, Subscription) and not instance.is_active:
+        return None
+    return instance.course_id
+
+
+def count_subquery(queryset):
+    """Подзапрос с числом объектов курса (0, если их нет)"""
+    counts = queryset.filter(course=OuterRef('pk')).order_by().values('course').annotate(total=Count('pk')).values('total')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def change_counter(course_id, field, delta):
+    """Изменяет счетчик курса на delta одним UPDATE (не ниже нуля)"""
+    if course_id is None or not delta:
+        return
+    Course.objects.filter(pk=course_id).update(**{field: Greatest(F(field) + delta, Value(0))})
+
+
+def move_counted(field, old_course_id, new_course_id):
+    """Переносит объект из счетчика одного курса в счетчик другого"""
+    if old_course_id == new_course_id:
+        return
+    change_counter(old_course_id, field, -1)
+    change_counter(new_course_id, field, 1)
+
+
+def recount_course_counters(course_ids=None, fields=COUNTER_FIELDS):
+    """
+    Пересчитывает счетчики одним UPDATE для указанных курсов
+    (или для всех). Возвращает число обновленных курсов.
+    """
+    courses = Course.objects.all()
+    if course_ids is not None:
+        courses = courses.filter(pk__in=course_ids)
+    return courses.update(**{field: count_subquery(get_counted_queryset(field)) for field in fields})
@@ -0,0 +1,18 @@
+import django_filters
+from .models import Lesson
+from .validators import extract_video_id
+
+class LessonFilter(django_filters.FilterSet):
+    video_id = django_filters.CharFilter(field_name='video_id')
+    # Любая форма ссылки на видео (youtu.be, watch?v=, m.youtube.com) приводится к video_id
+    video = django_filters.CharFilter(method='filter_video')
+
+    class Meta:
+        model = Lesson
+        fields = ['title', 'description', 'course', 'video_id']
+
+    def filter_video(self, queryset, name, value):
+        video_id = extract_video_id(value)
+        if not video_id:
+            return queryset.none()
+        return queryset.filter(video_id=video_id)
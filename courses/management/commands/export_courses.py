@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from courses.models import Course
+from courses.transfer import DEFAULT_BATCH_SIZE, export_courses
+
+
+class Command(BaseCommand):
+    help = 'Выгружает курсы с уроками в JSONL для переноса в другое окружение'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output',
+            help='Путь к файлу (по умолчанию вывод в stdout)'
+        )
+        parser.add_argument('--owner', help='Email владельца: выгрузить только его курсы')
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help='Количество курсов, читаемых из базы за один раз'
+        )
+
+    def handle(self, *args, **options):
+        queryset = Course.objects.all()
+        if options['owner']:
+            queryset = queryset.filter(owner__email=options['owner'])
+        lines = export_courses(queryset, batch_size=options['batch_size'])
+
+        if options['output']:
+            count = 0
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                for line in lines:
+                    output.write(line)
+                    count += 1
+            self.stderr.write(self.style.SUCCESS(f'Выгружено курсов: {count} -> {options["output"]}'))
+        else:
+            for line in lines:
+                self.stdout.write(line, ending='')
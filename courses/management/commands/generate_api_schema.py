@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from config.schema import write_schema_files
+
+
+class Command(BaseCommand):
+    help = 'Генерирует схему OpenAPI и сохраняет ее в API_SCHEMA_DIR'
+
+    def handle(self, *args, **options):
+        for path in write_schema_files():
+            self.stdout.write(self.style.SUCCESS(f'Схема сохранена: {path}'))
@@ -0,0 +1,40 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from courses.transfer import DEFAULT_BATCH_SIZE, import_courses
+
+
+class Command(BaseCommand):
+    help = 'Загружает курсы с уроками из JSONL (владельцы ищутся по email)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Путь к файлу JSONL или "-" для чтения из stdin')
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help='Количество курсов, записываемых за одну транзакцию'
+        )
+        parser.add_argument(
+            '--max-errors',
+            type=int,
+            default=20,
+            help='Сколько ошибок вывести подробно'
+        )
+
+    def handle(self, *args, **options):
+        if options['path'] == '-':
+            result = import_courses(sys.stdin, batch_size=options['batch_size'])
+        else:
+            try:
+                with open(options['path'], encoding='utf-8') as source:
+                    result = import_courses(source, batch_size=options['batch_size'])
+            except OSError as exc:
+                raise CommandError(f'Не удалось открыть файл: {exc}')
+
+        for error in result['errors'][:options['max_errors']]:
+            self.stderr.write(self.style.WARNING(f'Строка {error["line"]}: {error["errors"]}'))
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено курсов: {result["courses"]}, уроков: {result["lessons"]}, '
+            f'пропущено записей: {len(result["errors"])}'
+        ))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from courses.counters import recount_course_counters
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счетчики уроков и подписчиков курсов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--course',
+            type=int,
+            action='append',
+            dest='course_ids',
+            help='ID курса (можно указать несколько раз); по умолчанию - все курсы'
+        )
+
+    def handle(self, *args, **options):
+        count = recount_course_counters(options['course_ids'])
+        self.stdout.write(self.style.SUCCESS(f'Пересчитаны счетчики курсов: {count}'))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from courses.search import INDEXED_FIELDS, rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает поисковый индекс по курсам и урокам'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Размер пакета при записи индекса'
+        )
+
+    def handle(self, *args, **options):
+        for model in INDEXED_FIELDS:
+            count = rebuild_index(model, batch_size=options['batch_size'])
+            self.stdout.write(
+                self.style.SUCCESS(f'{model._meta.verbose_name_plural}: проиндексировано {count}')
+            )
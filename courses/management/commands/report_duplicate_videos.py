@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from courses.models import Lesson
+
+
+class Command(BaseCommand):
+    help = 'Выводит видео YouTube, которые используются в нескольких уроках'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-count',
+            type=int,
+            default=2,
+            help='Минимальное число уроков с одним видео'
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=100,
+            help='Максимальное число видео в отчете'
+        )
+
+    def handle(self, *args, **options):
+        # Группировка идет по индексу video_id, без разбора ссылок
+        duplicates = list(
+            Lesson.objects.exclude(video_id='')
+            .values('video_id')
+            .annotate(lessons=Count('id'))
+            .filter(lessons__gte=options['min_count'])
+            .order_by('-lessons', 'video_id')[:options['limit']]
+        )
+        if not duplicates:
+            self.stdout.write(self.style.SUCCESS('Дубликаты видео не найдены'))
+            return
+
+        lessons_by_video = {}
+        lessons = Lesson.objects.filter(
+            video_id__in=[row['video_id'] for row in duplicates]
+        ).only('id', 'title', 'video_id', 'course_id').order_by('video_id', 'id')
+        for lesson in lessons:
+            lessons_by_video.setdefault(lesson.video_id, []).append(lesson)
+
+        for row in duplicates:
+            self.stdout.write(f"{row['video_id']}: уроков {row['lessons']}")
+            for lesson in lessons_by_video.get(row['video_id'], []):
+                self.stdout.write(f'  #{lesson.id} "{lesson.title}" (курс #{lesson.course_id})')
+
+        self.stdout.write(self.style.WARNING(f'Найдено видео с дубликатами: {len(duplicates)}'))
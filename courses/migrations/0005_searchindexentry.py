@@ -0,0 +1,198 @@
+# Generated by Django 4.2.7 on 2026-10-17 23:26
+
+import re
+
+from django.db import migrations, models
+
+# Копия токенизатора courses.search на момент создания миграции:
+# миграция не зависит от текущего кода приложения
+MAX_TERM_LENGTH = 64
+
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+_CYRILLIC_RE = re.compile(r'[а-я]')
+
+
+class RussianStemmer:
+    """Стеммер Портера (Snowball) для русского языка"""
+
+    VOWELS = 'аеиоуыэюя'
+
+    PERFECTIVE_GERUND_1 = ('вшись', 'вши', 'в')
+    PERFECTIVE_GERUND_2 = ('ившись', 'ывшись', 'ивши', 'ывши', 'ив', 'ыв')
+    ADJECTIVE = (
+        'ими', 'ыми', 'его', 'ого', 'ему', 'ому',
+        'ее', 'ие', 'ые', 'ое', 'ей', 'ий', 'ый', 'ой', 'ем', 'им', 'ым', 'ом',
+        'их', 'ых', 'ую', 'юю', 'ая', 'яя', 'ою', 'ею',
+    )
+    PARTICIPLE_1 = ('ем', 'нн', 'вш', 'ющ', 'щ')
+    PARTICIPLE_2 = ('ивш', 'ывш', 'ующ')
+    REFLEXIVE = ('ся', 'сь')
+    VERB_1 = (
+        'ете', 'йте', 'ешь', 'нно',
+        'ла', 'на', 'ли', 'ем', 'ло', 'но', 'ет', 'ют', 'ны', 'ть',
+        'й', 'л', 'н',
+    )
+    VERB_2 = (
+        'ейте', 'уйте',
+        'ила', 'ыла', 'ена', 'ите', 'или', 'ыли', 'ило', 'ыло', 'ено', 'ует', 'уют',
+        'ены', 'ить', 'ыть', 'ишь',
+        'ей', 'уй', 'ил', 'ыл', 'им', 'ым', 'ен', 'ят', 'ит', 'ыт', 'ую',
+        'ю',
+    )
+    NOUN = (
+        'иями', 'ями', 'ами', 'ией', 'иям', 'ием', 'иях',
+        'ев', 'ов', 'ие', 'ье', 'еи', 'ии', 'ей', 'ой', 'ий', 'ям', 'ем', 'ам', 'ом',
+        'ах', 'ях', 'ию', 'ью', 'ия', 'ья',
+        'а', 'е', 'и', 'й', 'о', 'у', 'ы', 'ь', 'ю', 'я',
+    )
+    SUPERLATIVE = ('ейше', 'ейш')
+    DERIVATIONAL = ('ость', 'ост')
+
+    def stem(self, word):
+        word = word.replace('ё', 'е')
+        rv_start = self._rv_start(word)
+        if rv_start is None:
+            return word
+        r2_start = self._r2_start(word)
+        prefix, rv = word[:rv_start], word[rv_start:]
+
+        # Шаг 1
+        rv, removed = self._remove_preceded(rv, self.PERFECTIVE_GERUND_1, self.PERFECTIVE_GERUND_2)
+        if not removed:
+            rv = self._remove(rv, self.REFLEXIVE)[0]
+            rv, removed = self._remove_adjectival(rv)
+            if not removed:
+                rv, removed = self._remove_preceded(rv, self.VERB_1, self.VERB_2)
+            if not removed:
+                rv = self._remove(rv, self.NOUN)[0]
+
+        # Шаг 2
+        if rv.endswith('и'):
+            rv = rv[:-1]
+
+        # Шаг 3: словообразовательные окончания только в R2
+        r2_in_rv = max(r2_start - rv_start, 0)
+        for suffix in self.DERIVATIONAL:
+            if rv.endswith(suffix) and len(rv) - len(suffix) >= r2_in_rv:
+                rv = rv[:-len(suffix)]
+                break
+
+        # Шаг 4
+        if rv.endswith('нн'):
+            rv = rv[:-1]
+        else:
+            rv, removed = self._remove(rv, self.SUPERLATIVE)
+            if removed and rv.endswith('нн'):
+                rv = rv[:-1]
+            elif rv.endswith('ь'):
+                rv = rv[:-1]
+
+        return prefix + rv
+
+    def _rv_start(self, word):
+        for index, char in enumerate(word):
+            if char in self.VOWELS:
+                return index + 1
+        return None
+
+    def _r2_start(self, word):
+        r1 = self._region_after_vc(word, 0)
+        return self._region_after_vc(word, r1)
+
+    def _region_after_vc(self, word, start):
+        for index in range(start + 1, len(word)):
+            if word[index] not in self.VOWELS and word[index - 1] in self.VOWELS:
+                return index + 1
+        return len(word)
+
+    @staticmethod
+    def _remove(rv, suffixes):
+        for suffix in suffixes:
+            if rv.endswith(suffix):
+                return rv[:-len(suffix)], True
+        return rv, False
+
+    @staticmethod
+    def _remove_preceded(rv, group_1, group_2):
+        """Удаляет окончание: группа 1 только после 'а'/'я', группа 2 - всегда"""
+        candidates = [(suffix, True) for suffix in group_1] + [(suffix, False) for suffix in group_2]
+        candidates.sort(key=lambda item: len(item[0]), reverse=True)
+        for suffix, needs_a in candidates:
+            if not rv.endswith(suffix):
+                continue
+            if needs_a:
+                if len(rv) > len(suffix) and rv[-len(suffix) - 1] in 'ая':
+                    return rv[:-len(suffix)], True
+                continue
+            return rv[:-len(suffix)], True
+        return rv, False
+
+    def _remove_adjectival(self, rv):
+        rv, removed = self._remove(rv, self.ADJECTIVE)
+        if removed:
+            rv = self._remove_preceded(rv, self.PARTICIPLE_1, self.PARTICIPLE_2)[0]
+        return rv, removed
+
+
+_stemmer = RussianStemmer()
+
+
+def tokenize(text):
+    """Разбивает текст на нормализованные основы слов"""
+    terms = []
+    for word in _WORD_RE.findall((text or '').lower()):
+        if _CYRILLIC_RE.search(word):
+            word = _stemmer.stem(word)
+        if word:
+            terms.append(word[:MAX_TERM_LENGTH])
+    return terms
+
+
+
+def build_search_index(apps, schema_editor):
+    """Индексирует уже существующие курсы и уроки"""
+    SearchIndexEntry = apps.get_model('courses', 'SearchIndexEntry')
+    weights = {'title': 3, 'description': 1}
+    for model_name in ('course', 'lesson'):
+        model = apps.get_model('courses', model_name)
+        entries = []
+        for instance in model.objects.only('pk', *weights).iterator(chunk_size=1000):
+            terms = {}
+            for field, weight in weights.items():
+                for term in tokenize(getattr(instance, field)):
+                    terms[term] = terms.get(term, 0) + weight
+            entries.extend(
+                SearchIndexEntry(model_name=model_name, object_id=instance.pk, term=term, weight=weight)
+                for term, weight in terms.items()
+            )
+            if len(entries) >= 1000:
+                SearchIndexEntry.objects.bulk_create(entries)
+                entries = []
+        SearchIndexEntry.objects.bulk_create(entries)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0004_course_price'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchIndexEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model_name', models.CharField(max_length=20, verbose_name='Модель')),
+                ('object_id', models.BigIntegerField(verbose_name='ID объекта')),
+                ('term', models.CharField(max_length=64, verbose_name='Термин')),
+                ('weight', models.PositiveIntegerField(default=1, verbose_name='Вес')),
+            ],
+            options={
+                'verbose_name': 'Запись поискового индекса',
+                'verbose_name_plural': 'Поисковый индекс',
+                'indexes': [models.Index(fields=['model_name', 'object_id'], name='search_entry_object_idx')],
+                'unique_together': {('model_name', 'term', 'object_id')},
+            },
+        ),
+        migrations.RunPython(build_search_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-17 23:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0005_searchindexentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='stripe_price_amount',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True, verbose_name='Сумма цены в Stripe'),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='stripe_price_id',
+            field=models.CharField(blank=True, max_length=255, null=True, verbose_name='Stripe Price ID'),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='stripe_product_id',
+            field=models.CharField(blank=True, max_length=255, null=True, verbose_name='Stripe Product ID'),
+        ),
+    ]
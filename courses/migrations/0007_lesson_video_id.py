@@ -0,0 +1,79 @@
+# Generated by Django 4.2.7 on 2026-10-17 23:41
+
+import re
+from urllib.parse import parse_qs, urlsplit
+
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+# Копия разбора ссылок courses.validators на момент создания миграции:
+# миграция не зависит от текущего кода приложения
+ALLOWED_DOMAINS = frozenset({
+    'youtube.com',
+    'youtu.be',
+    'm.youtube.com',
+    'music.youtube.com',
+    'gaming.youtube.com',
+})
+ALLOWED_DOMAIN_SUFFIX = '.youtube.com'
+
+_PATH_VIDEO_ID_RE = re.compile(r'^/(?:embed|shorts|live|v)/([A-Za-z0-9_-]+)')
+_VIDEO_ID_RE = re.compile(r'^[A-Za-z0-9_-]+$')
+
+
+def extract_video_id(value):
+    """Возвращает канонический ID видео YouTube или None"""
+    if not value or not value.strip():
+        return None
+    try:
+        parts = urlsplit(value.strip())
+        host = parts.hostname or ''
+    except ValueError:
+        return None
+    if host.startswith('www.'):
+        host = host[4:]
+    if host not in ALLOWED_DOMAINS and not host.endswith(ALLOWED_DOMAIN_SUFFIX):
+        return None
+    if parts.scheme != 'https':
+        return None
+
+    if host == 'youtu.be':
+        video_id = parts.path.lstrip('/').split('/', 1)[0]
+        return video_id if _VIDEO_ID_RE.match(video_id) else None
+    if parts.path == '/watch':
+        video_id = parse_qs(parts.query).get('v', [''])[0]
+        return video_id if _VIDEO_ID_RE.match(video_id) else None
+    match = _PATH_VIDEO_ID_RE.match(parts.path)
+    return match.group(1) if match else None
+
+
+def fill_video_ids(apps, schema_editor):
+    """Заполняет video_id существующих уроков порциями по первичному ключу"""
+    Lesson = apps.get_model('courses', 'Lesson')
+    lessons = Lesson.objects.only('id', 'video_link').order_by('id')
+    last_id = 0
+    while True:
+        chunk = list(lessons.filter(id__gt=last_id)[:BATCH_SIZE])
+        if not chunk:
+            break
+        last_id = chunk[-1].id
+        for lesson in chunk:
+            lesson.video_id = extract_video_id(lesson.video_link) or ''
+        Lesson.objects.bulk_update(chunk, ['video_id'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0006_course_stripe_ids'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lesson',
+            name='video_id',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=32, verbose_name='ID видео'),
+        ),
+        migrations.RunPython(fill_video_ids, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 4.2.7 on 2026-10-18 00:19
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def _count(queryset):
+    counts = queryset.filter(course=OuterRef('pk')).order_by().values('course').annotate(total=Count('pk')).values('total')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def fill_counters(apps, schema_editor):
+    """Заполняет счетчики существующих курсов одним UPDATE"""
+    Course = apps.get_model('courses', 'Course')
+    Lesson = apps.get_model('courses', 'Lesson')
+    Subscription = apps.get_model('courses', 'Subscription')
+    Course.objects.update(
+        lessons_count=_count(Lesson.objects.all()),
+        subscribers_count=_count(Subscription.objects.filter(is_active=True)),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0008_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='lessons_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество уроков'),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='subscribers_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество подписчиков'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['-lessons_count'], name='course_lessons_count_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['-subscribers_count'], name='course_subscribers_idx'),
+        ),
+    ]
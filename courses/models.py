@@ -2,6 +2,8 @@ from django.db import models
 from django.conf import settings
 from django.utils import timezone
 
+from .validators import extract_video_id
+
 class Course(models.Model):
     title = models.CharField(max_length=200, verbose_name='Название курса')
     preview = models.ImageField(upload_to='course_previews/', verbose_name='Превью курса', null=True, blank=True)
@@ -11,18 +13,50 @@ class Course(models.Model):
     created_at = models.DateTimeField(default=timezone.now, verbose_name='Дата создания')
     updated_at = models.DateTimeField(auto_now=True, verbose_name='Дата обновления')
 
+    # Stripe: продукт и цена, созданные для курса, переиспользуются при оплате
+    stripe_product_id = models.CharField(max_length=255, blank=True, null=True, verbose_name='Stripe Product ID')
+    stripe_price_id = models.CharField(max_length=255, blank=True, null=True, verbose_name='Stripe Price ID')
+    stripe_price_amount = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True, verbose_name='Сумма цены в Stripe')
+
+    # Денормализованные счетчики, поддерживаются сигналами (courses/counters.py)
+    lessons_count = models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество уроков')
+    subscribers_count = models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество подписчиков')
+
     class Meta:
         verbose_name = 'Курс'
         verbose_name_plural = 'Курсы'
+        indexes = [
+            # Список курсов владельца и общий список, новые сначала
+            models.Index(fields=['owner', '-created_at'], name='course_owner_created_idx'),
+            models.Index(fields=['-created_at'], name='course_created_idx'),
+            # Сортировка курсов по размеру и популярности
+            models.Index(fields=['-lessons_count'], name='course_lessons_count_idx'),
+            models.Index(fields=['-subscribers_count'], name='course_subscribers_idx'),
+        ]
+
+    COUNTER_FIELDS = ('lessons_count', 'subscribers_count')
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        # Счетчики меняются только F()-выражениями, поэтому обычное сохранение
+        # загруженного курса не перезаписывает их значениями из памяти
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTER_FIELDS and field.attname not in deferred
+            ]
+        super().save(*args, **kwargs)
+
 class Lesson(models.Model):
     title = models.CharField(max_length=200, verbose_name='Название урока')
     description = models.TextField(verbose_name='Описание урока')
     preview = models.ImageField(upload_to='lesson_previews/', verbose_name='Превью', null=True, blank=True)
     video_link = models.URLField(verbose_name='Ссылка на видео')
+    # Канонический ID видео YouTube, вычисляется из video_link при сохранении
+    video_id = models.CharField(max_length=32, blank=True, default='', db_index=True, editable=False, verbose_name='ID видео')
     course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='lessons', verbose_name='Курс')
     owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, verbose_name='Владелец', null=True, blank=True)
     created_at = models.DateTimeField(default=timezone.now, verbose_name='Дата создания')
@@ -31,10 +65,24 @@ class Lesson(models.Model):
     class Meta:
         verbose_name = 'Урок'
         verbose_name_plural = 'Уроки'
+        indexes = [
+            # Список уроков владельца и общий список, новые сначала
+            models.Index(fields=['owner', '-created_at'], name='lesson_owner_created_idx'),
+            models.Index(fields=['-created_at'], name='lesson_created_idx'),
+            # Уроки курса в порядке добавления (вложенный список в курсе)
+            models.Index(fields=['course', 'created_at'], name='lesson_course_created_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        self.video_id = extract_video_id(self.video_link) or ''
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'video_link' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'video_id'}
+        super().save(*args, **kwargs)
+
 
 class Subscription(models.Model):
     """Модель подписки пользователя на обновления курса"""
@@ -60,3 +108,22 @@ class Subscription(models.Model):
 
     def __str__(self):
         return f'{self.user.email} подписан на "{self.course.title}"'
+
+
+class SearchIndexEntry(models.Model):
+    """Запись обратного индекса полнотекстового поиска по курсам и урокам"""
+    model_name = models.CharField(max_length=20, verbose_name='Модель')
+    object_id = models.BigIntegerField(verbose_name='ID объекта')
+    term = models.CharField(max_length=64, verbose_name='Термин')
+    weight = models.PositiveIntegerField(default=1, verbose_name='Вес')
+
+    class Meta:
+        verbose_name = 'Запись поискового индекса'
+        verbose_name_plural = 'Поисковый индекс'
+        unique_together = ('model_name', 'term', 'object_id')
+        indexes = [
+            models.Index(fields=['model_name', 'object_id'], name='search_entry_object_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.model_name}:{self.object_id} {self.term}'
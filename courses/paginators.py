@@ -1,14 +1,213 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import json
+from datetime import datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Пагинация по ключу (курсору) без COUNT(*) и OFFSET.
+
+    Страница выбирается условием по полю сортировки и id вида
+    (created_at, id) < (значение, id последнего элемента), поэтому
+    глубокие страницы работают так же быстро, как первая.
+    Общее количество считается только по запросу клиента (?with_count=1).
+    """
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 50
+    cursor_query_param = 'cursor'
+    count_query_param = 'with_count'
+    ordering = '-created_at'  # Используется, если у представления нет сортировки
+    invalid_cursor_message = 'Неверный курсор'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.field, self.descending = self.get_ordering(request, queryset, view)
+
+        self.count = None
+        if self.wants_count(request):
+            self.count = queryset.count()
+
+        cursor = self.decode_cursor(request, queryset.model)
+        backwards = cursor is not None and cursor['previous']
+
+        # При движении назад запрашиваем элементы в обратном порядке
+        descending = self.descending != backwards
+        prefix = '-' if descending else ''
+        queryset = queryset.order_by(prefix + self.field, prefix + 'id')
+        if cursor is not None:
+            queryset = queryset.filter(
+                self.get_keyset_filter(cursor['value'], cursor['id'], descending)
+            )
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        page = results[:self.page_size]
+
+        if backwards:
+            page.reverse()
+            self.has_previous = has_more
+            self.has_next = True
+        else:
+            self.has_previous = cursor is not None
+            self.has_next = has_more
+
+        self.page = page
+        return page
+
+    def get_page_size(self, request):
+        if self.page_size_query_param:
+            try:
+                page_size = int(request.query_params[self.page_size_query_param])
+                if page_size > 0:
+                    return min(page_size, self.max_page_size)
+            except (KeyError, ValueError):
+                pass
+        return self.page_size
+
+    def get_ordering(self, request, queryset, view):
+        """
+        Возвращает поле сортировки и направление.
+        Учитывает ?ordering=, обработанный OrderingFilter представления,
+        иначе берет сортировку по умолчанию из представления.
+        """
+        ordering = None
+        for backend in getattr(view, 'filter_backends', []):
+            if hasattr(backend, 'get_ordering'):
+                ordering = backend().get_ordering(request, queryset, view)
+                break
+        if not ordering:
+            ordering = getattr(view, 'ordering', None) or self.ordering
+        if isinstance(ordering, str):
+            ordering = [ordering]
+
+        field = ordering[0]
+        descending = field.startswith('-')
+        field = field.lstrip('-')
+        if field == 'pk':
+            field = 'id'
+        return field, descending
+
+    def get_keyset_filter(self, value, pk, descending):
+        """Условие «строго после (значение, id)» в заданном направлении"""
+        lookup = 'lt' if descending else 'gt'
+        if self.field == 'id':
+            return Q(**{f'id__{lookup}': pk})
+        return (
+            Q(**{f'{self.field}__{lookup}': value})
+            | Q(**{self.field: value, f'id__{lookup}': pk})
+        )
+
+    def wants_count(self, request):
+        return request.query_params.get(self.count_query_param, '').lower() in ('1', 'true', 'yes')
+
+    def encode_cursor(self, instance, previous):
+        value = getattr(instance, self.field)
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        elif value is not None:
+            value = str(value)
+        payload = json.dumps({'v': value, 'id': instance.pk, 'p': previous})
+        cursor = base64.urlsafe_b64encode(payload.encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode()).decode())
+            field = model._meta.get_field(self.field)
+            return {
+                'value': field.to_python(payload['v']),
+                'id': int(payload['id']),
+                'previous': bool(payload['p']),
+            }
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], previous=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], previous=True)
+
+    def get_paginated_response(self, data):
+        response = {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        }
+        if self.count is not None:
+            response = {'count': self.count, **response}
+        return Response(response)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'count': {'type': 'integer', 'example': 123},
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
 
 
 class StandardResultsSetPagination(PageNumberPagination):
     """
     Общий пагинатор для всех эндпоинтов проекта.
     Унифицированный класс пагинации с настраиваемыми параметрами.
+
+    По умолчанию работает постранично. Пагинация по курсору включается
+    параметром ?pagination=cursor (или наличием ?cursor=), а для всего
+    представления - атрибутом pagination_mode = 'cursor'.
     """
     page_size = 10  # Количество элементов на странице по умолчанию
     page_size_query_param = 'page_size'  # Параметр для изменения размера страницы
     max_page_size = 50  # Максимальное количество элементов на странице
+    mode_query_param = 'pagination'  # Параметр для выбора режима: page или cursor
+    keyset_class = KeysetPagination
+
+    keyset = None
+
+    def get_mode(self, request, view):
+        mode = request.query_params.get(self.mode_query_param)
+        if mode in ('page', 'cursor'):
+            return mode
+        if self.keyset_class.cursor_query_param in request.query_params:
+            return 'cursor'
+        return getattr(view, 'pagination_mode', 'page')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.get_mode(request, view) == 'cursor':
+            self.keyset = self.keyset_class()
+            self.keyset.page_size = self.page_size
+            self.keyset.page_size_query_param = self.page_size_query_param
+            self.keyset.max_page_size = self.max_page_size
+            return self.keyset.paginate_queryset(queryset, request, view)
+        self.keyset = None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
 
 
 # Алиасы для обратной совместимости
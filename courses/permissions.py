@@ -1,4 +1,5 @@
 from rest_framework import permissions
+from .roles import is_moderator
 
 class IsModerator(permissions.BasePermission):
     """
@@ -8,9 +9,9 @@ class IsModerator(permissions.BasePermission):
     """
     def has_permission(self, request, view):
         # Модераторы НЕ могут создавать и удалять
-        if view.action in ['create', 'destroy']:
+        if getattr(view, 'action', None) in ['create', 'destroy']:
             return False
-        return request.user.is_authenticated and request.user.groups.filter(name='Модераторы').exists()
+        return request.user.is_authenticated and is_moderator(request)
 
 class IsOwner(permissions.BasePermission):
     """
@@ -18,7 +19,7 @@ class IsOwner(permissions.BasePermission):
     Владельцы могут выполнять любые операции со своими объектами.
     """
     def has_object_permission(self, request, view, obj):
-        return obj.owner == request.user
+        return obj.owner_id == request.user.pk
 
 class IsModeratorOrOwner(permissions.BasePermission):
     """
@@ -27,9 +28,9 @@ class IsModeratorOrOwner(permissions.BasePermission):
     Владельцы могут выполнять любые операции со своими объектами.
     """
     def has_object_permission(self, request, view, obj):
-        if request.user.groups.filter(name='Модераторы').exists():
+        if is_moderator(request):
             return True
-        return obj.owner == request.user
+        return obj.owner_id == request.user.pk
 
 class IsModeratorOrOwnerForModify(permissions.BasePermission):
     """
@@ -40,6 +41,6 @@ class IsModeratorOrOwnerForModify(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
         if request.method in permissions.SAFE_METHODS:
             return True
-        if request.user.groups.filter(name='Модераторы').exists():
+        if is_moderator(request):
             return True
-        return obj.owner == request.user
+        return obj.owner_id == request.user.pk
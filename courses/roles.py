@@ -0,0 +1,86 @@
+"""
+Определение ролей пользователя.
+
+Роли вычисляются один раз за запрос и сохраняются на объекте запроса,
+поэтому представления и классы разрешений не выполняют повторных запросов
+к группам пользователя. Дополнительно можно включить кеш на уровне процесса
+с ограниченным временем жизни (настройка ROLES_CACHE_TTL, в секундах).
+"""
+
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import Group
+
+MODERATORS_GROUP = 'Модераторы'
+
+_REQUEST_ATTR = '_user_roles'
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def _get_ttl():
+    """Время жизни кеша ролей в секундах (0 - кеш отключен)"""
+    return getattr(settings, 'ROLES_CACHE_TTL', 0)
+
+
+def _load_roles(user):
+    """Загружает роли пользователя из базы данных одним запросом"""
+    return frozenset(Group.objects.filter(user__pk=user.pk).values_list('name', flat=True))
+
+
+def get_roles_for_user(user):
+    """
+    Возвращает множество ролей (названий групп) пользователя.
+    Использует кеш процесса, если он включен.
+    """
+    if not user or not user.is_authenticated:
+        return frozenset()
+
+    # Пользователь из JWT без запроса к базе: роли уже есть в токене
+    token_roles = getattr(user, 'token_roles', None)
+    if token_roles is not None:
+        return token_roles
+
+    ttl = _get_ttl()
+    if ttl <= 0:
+        return _load_roles(user)
+
+    now = time.monotonic()
+    with _cache_lock:
+        cached = _cache.get(user.pk)
+    if cached and cached[0] > now:
+        return cached[1]
+
+    roles = _load_roles(user)
+    with _cache_lock:
+        _cache[user.pk] = (now + ttl, roles)
+    return roles
+
+
+def get_request_roles(request):
+    """Возвращает роли текущего пользователя, вычисляя их не чаще раза за запрос"""
+    # У запроса DRF роли сохраняются на исходном HttpRequest,
+    # чтобы их видели и middleware, и представления
+    target = getattr(request, '_request', request)
+    roles = getattr(target, _REQUEST_ATTR, None)
+    if roles is None:
+        roles = get_roles_for_user(getattr(request, 'user', None))
+        setattr(target, _REQUEST_ATTR, roles)
+    return roles
+
+
+def is_moderator(request):
+    """Проверяет, входит ли текущий пользователь в группу модераторов"""
+    return MODERATORS_GROUP in get_request_roles(request)
+
+
+def invalidate_user_roles(user_id=None):
+    """Сбрасывает кеш ролей для пользователя или целиком"""
+    with _cache_lock:
+        if user_id is None:
+            _cache.clear()
+        else:
+            _cache.pop(user_id, None)
@@ -0,0 +1,290 @@
+"""
+Полнотекстовый поиск по курсам и урокам.
+
+Вместо LIKE '%term%' по неиндексированным текстовым полям используется
+обратный индекс (таблица SearchIndexEntry): для каждого объекта хранятся
+основы слов из названия и описания с весами. Последнее слово запроса
+ищется по префиксу основы (term LIKE 'осн%' по индексу (model_name, term)),
+поэтому находятся и недописанные слова: "pyth", "Программ". Индекс
+обновляется сигналами post_save/post_delete и перестраивается командой
+rebuild_search_index.
+Таблица индекса одинаково работает на SQLite и PostgreSQL.
+"""
+
+import re
+
+from django.db import transaction
+from django.db.models import Case, CharField, Count, F, OuterRef, Q, Subquery, Sum, Value, When
+from rest_framework import filters
+
+from .models import Course, Lesson, SearchIndexEntry
+
+# Индексируемые поля и их веса при ранжировании
+INDEXED_FIELDS = {
+    Course: {'title': 3, 'description': 1},
+    Lesson: {'title': 3, 'description': 1},
+}
+
+MAX_TERM_LENGTH = 64
+
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+_CYRILLIC_RE = re.compile(r'[а-я]')
+
+
+class RussianStemmer:
+    """Стеммер Портера (Snowball) для русского языка"""
+
+    VOWELS = 'аеиоуыэюя'
+
+    PERFECTIVE_GERUND_1 = ('вшись', 'вши', 'в')
+    PERFECTIVE_GERUND_2 = ('ившись', 'ывшись', 'ивши', 'ывши', 'ив', 'ыв')
+    ADJECTIVE = (
+        'ими', 'ыми', 'его', 'ого', 'ему', 'ому',
+        'ее', 'ие', 'ые', 'ое', 'ей', 'ий', 'ый', 'ой', 'ем', 'им', 'ым', 'ом',
+        'их', 'ых', 'ую', 'юю', 'ая', 'яя', 'ою', 'ею',
+    )
+    PARTICIPLE_1 = ('ем', 'нн', 'вш', 'ющ', 'щ')
+    PARTICIPLE_2 = ('ивш', 'ывш', 'ующ')
+    REFLEXIVE = ('ся', 'сь')
+    VERB_1 = (
+        'ете', 'йте', 'ешь', 'нно',
+        'ла', 'на', 'ли', 'ем', 'ло', 'но', 'ет', 'ют', 'ны', 'ть',
+        'й', 'л', 'н',
+    )
+    VERB_2 = (
+        'ейте', 'уйте',
+        'ила', 'ыла', 'ена', 'ите', 'или', 'ыли', 'ило', 'ыло', 'ено', 'ует', 'уют',
+        'ены', 'ить', 'ыть', 'ишь',
+        'ей', 'уй', 'ил', 'ыл', 'им', 'ым', 'ен', 'ят', 'ит', 'ыт', 'ую',
+        'ю',
+    )
+    NOUN = (
+        'иями', 'ями', 'ами', 'ией', 'иям', 'ием', 'иях',
+        'ев', 'ов', 'ие', 'ье', 'еи', 'ии', 'ей', 'ой', 'ий', 'ям', 'ем', 'ам', 'ом',
+        'ах', 'ях', 'ию', 'ью', 'ия', 'ья',
+        'а', 'е', 'и', 'й', 'о', 'у', 'ы', 'ь', 'ю', 'я',
+    )
+    SUPERLATIVE = ('ейше', 'ейш')
+    DERIVATIONAL = ('ость', 'ост')
+
+    def stem(self, word):
+        word = word.replace('ё', 'е')
+        rv_start = self._rv_start(word)
+        if rv_start is None:
+            return word
+        r2_start = self._r2_start(word)
+        prefix, rv = word[:rv_start], word[rv_start:]
+
+        # Шаг 1
+        rv, removed = self._remove_preceded(rv, self.PERFECTIVE_GERUND_1, self.PERFECTIVE_GERUND_2)
+        if not removed:
+            rv = self._remove(rv, self.REFLEXIVE)[0]
+            rv, removed = self._remove_adjectival(rv)
+            if not removed:
+                rv, removed = self._remove_preceded(rv, self.VERB_1, self.VERB_2)
+            if not removed:
+                rv = self._remove(rv, self.NOUN)[0]
+
+        # Шаг 2
+        if rv.endswith('и'):
+            rv = rv[:-1]
+
+        # Шаг 3: словообразовательные окончания только в R2
+        r2_in_rv = max(r2_start - rv_start, 0)
+        for suffix in self.DERIVATIONAL:
+            if rv.endswith(suffix) and len(rv) - len(suffix) >= r2_in_rv:
+                rv = rv[:-len(suffix)]
+                break
+
+        # Шаг 4
+        if rv.endswith('нн'):
+            rv = rv[:-1]
+        else:
+            rv, removed = self._remove(rv, self.SUPERLATIVE)
+            if removed and rv.endswith('нн'):
+                rv = rv[:-1]
+            elif rv.endswith('ь'):
+                rv = rv[:-1]
+
+        return prefix + rv
+
+    def _rv_start(self, word):
+        for index, char in enumerate(word):
+            if char in self.VOWELS:
+                return index + 1
+        return None
+
+    def _r2_start(self, word):
+        r1 = self._region_after_vc(word, 0)
+        return self._region_after_vc(word, r1)
+
+    def _region_after_vc(self, word, start):
+        for index in range(start + 1, len(word)):
+            if word[index] not in self.VOWELS and word[index - 1] in self.VOWELS:
+                return index + 1
+        return len(word)
+
+    @staticmethod
+    def _remove(rv, suffixes):
+        for suffix in suffixes:
+            if rv.endswith(suffix):
+                return rv[:-len(suffix)], True
+        return rv, False
+
+    @staticmethod
+    def _remove_preceded(rv, group_1, group_2):
+        """Удаляет окончание: группа 1 только после 'а'/'я', группа 2 - всегда"""
+        candidates = [(suffix, True) for suffix in group_1] + [(suffix, False) for suffix in group_2]
+        candidates.sort(key=lambda item: len(item[0]), reverse=True)
+        for suffix, needs_a in candidates:
+            if not rv.endswith(suffix):
+                continue
+            if needs_a:
+                if len(rv) > len(suffix) and rv[-len(suffix) - 1] in 'ая':
+                    return rv[:-len(suffix)], True
+                continue
+            return rv[:-len(suffix)], True
+        return rv, False
+
+    def _remove_adjectival(self, rv):
+        rv, removed = self._remove(rv, self.ADJECTIVE)
+        if removed:
+            rv = self._remove_preceded(rv, self.PARTICIPLE_1, self.PARTICIPLE_2)[0]
+        return rv, removed
+
+
+_stemmer = RussianStemmer()
+
+
+def tokenize(text):
+    """Разбивает текст на нормализованные основы слов"""
+    terms = []
+    for word in _WORD_RE.findall((text or '').lower()):
+        if _CYRILLIC_RE.search(word):
+            word = _stemmer.stem(word)
+        if word:
+            terms.append(word[:MAX_TERM_LENGTH])
+    return terms
+
+
+def _model_name(model):
+    return model._meta.model_name
+
+
+def build_entries(instance):
+    """Строит записи индекса для объекта: термин -> суммарный вес"""
+    weights = {}
+    for field, weight in INDEXED_FIELDS[type(instance)].items():
+        for term in tokenize(getattr(instance, field)):
+            weights[term] = weights.get(term, 0) + weight
+    model_name = _model_name(type(instance))
+    return [
+        SearchIndexEntry(model_name=model_name, object_id=instance.pk, term=term, weight=weight)
+        for term, weight in weights.items()
+    ]
+
+
+def index_instance(instance):
+    """Переиндексирует один объект"""
+    with transaction.atomic():
+        remove_instance(instance)
+        SearchIndexEntry.objects.bulk_create(build_entries(instance))
+
+
+def index_instances(instances, batch_size=1000):
+    """Переиндексирует объекты одной модели пакетно (для bulk_create/bulk_update)"""
+    if not instances:
+        return
+    with transaction.atomic():
+        SearchIndexEntry.objects.filter(
+            model_name=_model_name(type(instances[0])),
+            object_id__in=[instance.pk for instance in instances]
+        ).delete()
+        entries = [entry for instance in instances for entry in build_entries(instance)]
+        SearchIndexEntry.objects.bulk_create(entries, batch_size=batch_size)
+
+
+def remove_instance(instance):
+    """Удаляет объект из индекса"""
+    SearchIndexEntry.objects.filter(
+        model_name=_model_name(type(instance)),
+        object_id=instance.pk
+    ).delete()
+
+
+def rebuild_index(model, batch_size=1000):
+    """Полностью перестраивает индекс для модели, возвращает число объектов"""
+    fields = ['pk', *INDEXED_FIELDS[model]]
+    total = 0
+    with transaction.atomic():
+        SearchIndexEntry.objects.filter(model_name=_model_name(model)).delete()
+        entries = []
+        for instance in model.objects.only(*fields).iterator(chunk_size=batch_size):
+            entries.extend(build_entries(instance))
+            total += 1
+            if len(entries) >= batch_size:
+                SearchIndexEntry.objects.bulk_create(entries, batch_size=batch_size)
+                entries = []
+        SearchIndexEntry.objects.bulk_create(entries, batch_size=batch_size)
+    return total
+
+
+def search_ranks(model, query):
+    """
+    Возвращает queryset вида (object_id, rank) для объектов,
+    содержащих все термины запроса, или None, если в запросе нет терминов.
+    Последний термин совпадает с любым термином индекса, который с него начинается.
+    """
+    words = tokenize(query)
+    if not words:
+        return None
+    terms = set(words[:-1])
+    prefix = words[-1]
+    if any(term.startswith(prefix) for term in terms):
+        # Префикс уже покрыт точным совпадением другого термина
+        prefix = None
+
+    condition = Q(term__in=terms)
+    if prefix:
+        condition |= Q(term__startswith=prefix)
+    # Все термины индекса, найденные по префиксу, считаются одним совпадением
+    matched_term = Case(When(term__in=terms, then=F('term')), default=Value(''), output_field=CharField())
+    return SearchIndexEntry.objects.filter(
+        condition,
+        model_name=_model_name(model)
+    ).values('object_id').annotate(
+        matched=Count(matched_term, distinct=True),
+        rank=Sum('weight')
+    ).filter(matched=len(terms) + bool(prefix))
+
+
+class IndexedSearchFilter(filters.SearchFilter):
+    """
+    Замена SearchFilter, использующая обратный индекс.
+    Результаты упорядочиваются по релевантности, если клиент
+    не передал явную сортировку (?ordering=). Должен стоять в
+    filter_backends после OrderingFilter.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        model = queryset.model
+        if model not in INDEXED_FIELDS:
+            return super().filter_queryset(request, queryset, view)
+
+        query = request.query_params.get(self.search_param, '')
+        if not query.strip():
+            return queryset
+
+        ranks = search_ranks(model, query)
+        if ranks is None:
+            return queryset
+
+        # Сначала отбираем объекты по индексу (pk IN ...), и только для них
+        # вычисляется ранг, чтобы поиск не просматривал всю таблицу
+        queryset = queryset.filter(pk__in=ranks.values('object_id'))
+
+        if filters.OrderingFilter.ordering_param in request.query_params:
+            return queryset
+        return queryset.annotate(
+            search_rank=Subquery(ranks.filter(object_id=OuterRef('pk')).values('rank')[:1])
+        ).order_by('-search_rank', *queryset.query.order_by)
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import Course, Lesson
+from .models import Course, Lesson, Subscription
 from .validators import validate_youtube_url
 
 
@@ -14,26 +14,135 @@ class LessonSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
+class LessonBriefSerializer(serializers.ModelSerializer):
+    """Краткое представление урока внутри курса (без ?expand=lessons)"""
+
+    class Meta:
+        model = Lesson
+        fields = ['id', 'title']
+
+
+class LessonBulkItemSerializer(serializers.ModelSerializer):
+    """
+    Урок в массовой загрузке: без id - создание, с id - обновление.
+    Ссылки на видео проверяются для всего пакета сразу (validate_many).
+    """
+    id = serializers.IntegerField(required=False, min_value=1)
+
+    class Meta:
+        model = Lesson
+        fields = ['id', 'title', 'description', 'video_link']
+
+
+class LessonBulkSerializer(serializers.Serializer):
+    """Сериализатор запроса массовой загрузки уроков в курс"""
+    course_id = serializers.IntegerField(min_value=1)
+    # Элементы проверяются по отдельности (LessonBulkItemSerializer),
+    # чтобы ошибка в одном уроке не отменяла загрузку остальных
+    lessons = serializers.ListField(allow_empty=False, max_length=1000)
+
+
+class LessonImportSerializer(serializers.ModelSerializer):
+    """Урок в записи импорта курсов; владелец задается email (естественный ключ)"""
+    owner = serializers.EmailField(required=False, allow_null=True)
+
+    class Meta:
+        model = Lesson
+        fields = ['title', 'description', 'video_link', 'created_at', 'owner']
+
+
+class CourseImportSerializer(serializers.ModelSerializer):
+    """Запись импорта курсов (строка JSONL); уроки проверяются LessonImportSerializer"""
+    owner = serializers.EmailField(required=False, allow_null=True)
+    preview = serializers.CharField(required=False, allow_blank=True, allow_null=True, max_length=100)
+    lessons = serializers.ListField(required=False, max_length=10000)
+
+    class Meta:
+        model = Course
+        fields = ['title', 'description', 'price', 'preview', 'created_at', 'owner', 'lessons']
+
+
+def get_field_selection(request):
+    """
+    Разбирает параметры ?fields= и ?expand= GET-запроса.
+    Возвращает (множество запрошенных полей или None, множество раскрываемых связей).
+    """
+    if request is None or request.method != 'GET':
+        return None, set()
+
+    def parse(name):
+        value = request.query_params.get(name, '')
+        return {item.strip() for item in value.split(',') if item.strip()}
+
+    fields = parse('fields')
+    expand = parse('expand')
+    return (fields | expand if fields else None), expand
+
+
+class CourseListSerializer(serializers.ListSerializer):
+    """
+    Список курсов: один запрос подписок текущего пользователя на всю страницу
+    вместо отдельного запроса на каждый курс.
+    """
+
+    def to_representation(self, data):
+        courses = list(data.all() if hasattr(data, 'all') else data)
+        request = self.context.get('request')
+        if request and request.user.is_authenticated and 'is_subscribed' in self.child.fields:
+            self.context['subscribed_course_ids'] = set(
+                Subscription.objects.filter(
+                    user_id=request.user.pk,
+                    course__in=[course.pk for course in courses],
+                    is_active=True
+                ).values_list('course_id', flat=True)
+            )
+        return super().to_representation(courses)
+
+
 class CourseSerializer(serializers.ModelSerializer):
-    lessons_count = serializers.SerializerMethodField()
+    """
+    Курс с уроками.
+    ?fields=id,title,... оставляет только перечисленные поля; уроки в таком
+    ответе выводятся кратко (id, title), а полностью - с ?expand=lessons.
+    """
     lessons = LessonSerializer(many=True, read_only=True)
     is_subscribed = serializers.SerializerMethodField()
     
     class Meta:
         model = Course
-        fields = '__all__'
-    
-    def get_lessons_count(self, obj):
-        return obj.lessons.count()
+        exclude = ['stripe_product_id', 'stripe_price_id', 'stripe_price_amount']
+        list_serializer_class = CourseListSerializer
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        fields, expand = get_field_selection(self.context.get('request'))
+        if fields is None:
+            return
+        for name in set(self.fields) - fields:
+            self.fields.pop(name)
+        if 'lessons' in self.fields and 'lessons' not in expand:
+            self.fields['lessons'] = LessonBriefSerializer(many=True, read_only=True)
     
     def get_is_subscribed(self, obj):
         """Проверяет, подписан ли текущий пользователь на курс"""
+        subscribed_course_ids = self.context.get('subscribed_course_ids')
+        if subscribed_course_ids is not None:
+            return obj.pk in subscribed_course_ids
         request = self.context.get('request')
         if request and request.user.is_authenticated:
-            from .models import Subscription
             return Subscription.objects.filter(
-                user=request.user, 
+                user_id=request.user.pk, 
                 course=obj,
                 is_active=True
             ).exists()
         return False
+
+
+class SubscriptionBulkSerializer(serializers.Serializer):
+    """Сериализатор для массовой подписки и отписки от курсов"""
+    course_ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=1000
+    )
+    action = serializers.ChoiceField(choices=['subscribe', 'unsubscribe'], default='subscribe')
@@ -0,0 +1,143 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.db.models import QuerySet
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .cache import bump_list_cache
+from .counters import COUNTED_MODELS, change_counter, get_counted_course_id, move_counted, updates_are_manual
+from .models import Course, Lesson, SearchIndexEntry, Subscription
+from .roles import invalidate_user_roles
+from .search import index_instance, remove_instance
+
+User = get_user_model()
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def reset_roles_on_groups_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """Сбрасывает кеш ролей при изменении состава групп пользователя"""
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        invalidate_user_roles(instance.pk)
+    elif pk_set:
+        for user_id in pk_set:
+            invalidate_user_roles(user_id)
+    else:
+        invalidate_user_roles()
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def reset_roles_on_group_change(sender, **kwargs):
+    """Сбрасывает кеш ролей при переименовании или удалении группы"""
+    invalidate_user_roles()
+
+
+def _deleted_with_course(origin):
+    """Объект удаляется каскадом вместе с курсом (или набором курсов)"""
+    if isinstance(origin, QuerySet):
+        return origin.model is Course
+    return isinstance(origin, Course)
+
+
+@receiver(pre_delete, sender=Course)
+def prepare_course_delete(sender, instance, **kwargs):
+    """
+    Обрабатывает уроки и подписки курса одним запросом на каждую операцию:
+    их сигналы при каскадном удалении ничего не делают
+    """
+    lessons = Lesson.objects.filter(course_id=instance.pk)
+    user_ids = set(lessons.values_list('owner_id', flat=True).distinct())
+    user_ids.update(Subscription.objects.filter(course_id=instance.pk).values_list('user_id', flat=True))
+    SearchIndexEntry.objects.filter(model_name='lesson', object_id__in=lessons.values('pk')).delete()
+    bump_list_cache(user_ids, everyone=True)
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_save, sender=Lesson)
+def update_search_index(sender, instance, raw=False, **kwargs):
+    """Обновляет поисковый индекс при сохранении курса или урока"""
+    if raw:
+        return
+    index_instance(instance)
+
+
+@receiver(post_delete, sender=Course)
+@receiver(post_delete, sender=Lesson)
+def remove_from_search_index(sender, instance, origin=None, **kwargs):
+    """Удаляет курс или урок из поискового индекса"""
+    if sender is Lesson and _deleted_with_course(origin):
+        return
+    remove_instance(instance)
+
+
+@receiver(pre_save, sender=Lesson)
+@receiver(pre_save, sender=Subscription)
+def remember_counted_course(sender, instance, raw=False, **kwargs):
+    """Запоминает курс, в счетчике которого объект учтен до сохранения"""
+    if raw or instance._state.adding:
+        return
+    _, fields = COUNTED_MODELS[sender]
+    old = sender.objects.filter(pk=instance.pk).only(*fields).first()
+    instance._counted_course_id = get_counted_course_id(old) if old else None
+
+
+@receiver(post_save, sender=Lesson)
+@receiver(post_save, sender=Subscription)
+def update_counters_on_save(sender, instance, created, raw=False, **kwargs):
+    """Обновляет счетчики курса при создании объекта или переносе в другой курс"""
+    if raw:
+        return
+    field, _ = COUNTED_MODELS[sender]
+    old_course_id = None if created else getattr(instance, '_counted_course_id', None)
+    new_course_id = get_counted_course_id(instance)
+    move_counted(field, old_course_id, new_course_id)
+    instance._counted_course_id = new_course_id
+
+
+@receiver(post_delete, sender=Lesson)
+@receiver(post_delete, sender=Subscription)
+def update_counters_on_delete(sender, instance, origin=None, **kwargs):
+    """Уменьшает счетчик курса удаленного объекта"""
+    if updates_are_manual() or _deleted_with_course(origin):
+        return
+    field, _ = COUNTED_MODELS[sender]
+    change_counter(get_counted_course_id(instance), field, -1)
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+def bump_course_lists(sender, instance, **kwargs):
+    """Сбрасывает кеш списков владельца курса и модераторов"""
+    bump_list_cache([instance.owner_id], everyone=True)
+
+
+@receiver(post_save, sender=Lesson)
+@receiver(post_delete, sender=Lesson)
+def bump_lesson_lists(sender, instance, origin=None, **kwargs):
+    """Сбрасывает кеш списков владельцев урока и его курса (уроки входят в курс)"""
+    if updates_are_manual() or _deleted_with_course(origin):
+        return
+    course_owner_id = Course.objects.filter(pk=instance.course_id).values_list('owner_id', flat=True).first()
+    bump_list_cache([instance.owner_id, course_owner_id], everyone=True)
+
+
+@receiver(post_save, sender=Subscription)
+@receiver(post_delete, sender=Subscription)
+def bump_subscriber_lists(sender, instance, origin=None, **kwargs):
+    """
+    Сбрасывает кеш списков подписчика (в курсах есть признак is_subscribed),
+    владельца курса и модераторов (в курсах есть число подписчиков)
+    """
+    if updates_are_manual() or _deleted_with_course(origin):
+        return
+    course_owner_id = Course.objects.filter(pk=instance.course_id).values_list('owner_id', flat=True).first()
+    bump_list_cache([instance.user_id, course_owner_id], everyone=True)
+
+
+@receiver(post_save, sender=User)
+def bump_user_lists(sender, instance, created, **kwargs):
+    """Новому пользователю выдается новая версия кеша списков"""
+    if created:
+        bump_list_cache([instance.pk])
@@ -0,0 +1,175 @@
+"""
+Перенос курсов с уроками между окружениями в формате JSONL.
+
+Каждая строка - один курс с вложенным списком уроков. Владельцы
+указываются email (естественный ключ пользователя), поэтому записи
+не зависят от первичных ключей исходной базы.
+
+Выгрузка читает курсы порциями по первичному ключу, а уроки - одним
+запросом на порцию, и сразу превращает их в строки. Загрузка читает
+строки потоком и записывает порции курсов и уроков через bulk_create
+в одной транзакции на порцию, поэтому расход памяти ограничен размером
+порции. bulk_create не отправляет сигналы: ID видео, счетчик уроков,
+поисковый индекс и кеш списков заполняются здесь же.
+Используется командами export_courses/import_courses и эндпоинтами
+/api/courses/export/ и /api/courses/import/.
+"""
+
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import F
+from rest_framework.exceptions import ValidationError
+
+from .cache import bump_list_cache
+from .models import Course, Lesson
+from .search import index_instances
+from .serializers import CourseImportSerializer, LessonImportSerializer
+from .validators import validate_many
+
+COURSE_FIELDS = ('title', 'description', 'price', 'preview', 'created_at')
+LESSON_FIELDS = ('title', 'description', 'video_link', 'created_at')
+
+DEFAULT_BATCH_SIZE = 500
+
+
+def iter_course_records(queryset, batch_size=DEFAULT_BATCH_SIZE):
+    """Возвращает словари курсов с уроками, читая курсы порциями по первичному ключу"""
+    courses = queryset.prefetch_related(None).order_by('pk').values(
+        'pk', *COURSE_FIELDS, owner_email=F('owner__email')
+    )
+    last_pk = 0
+    while True:
+        chunk = list(courses.filter(pk__gt=last_pk)[:batch_size])
+        if not chunk:
+            return
+        last_pk = chunk[-1]['pk']
+
+        lessons = {}
+        rows = Lesson.objects.filter(course_id__in=[course['pk'] for course in chunk]).order_by(
+            'course_id', 'created_at', 'id'
+        ).values('course_id', *LESSON_FIELDS, owner_email=F('owner__email'))
+        for row in rows:
+            course_id = row.pop('course_id')
+            row['owner'] = row.pop('owner_email')
+            lessons.setdefault(course_id, []).append(row)
+
+        for course in chunk:
+            course_id = course.pop('pk')
+            course['owner'] = course.pop('owner_email')
+            course['preview'] = course['preview'] or None
+            course['lessons'] = lessons.get(course_id, [])
+            yield course
+
+
+def export_courses(queryset, batch_size=DEFAULT_BATCH_SIZE):
+    """Генератор строк JSONL с курсами и их уроками"""
+    for record in iter_course_records(queryset, batch_size):
+        yield json.dumps(record, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+
+def import_courses(lines, owner_id=None, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Загружает курсы из строк JSONL (str или bytes).
+    С owner_id все курсы и уроки назначаются этому пользователю, иначе
+    владельцы ищутся по email. Некорректные записи пропускаются.
+    Возвращает словарь с числом созданных курсов и уроков и ошибками по номерам строк.
+    """
+    result = {'courses': 0, 'lessons': 0, 'errors': []}
+    batch = []
+    for number, line in enumerate(lines, 1):
+        if isinstance(line, bytes):
+            line = line.decode('utf-8')
+        if not line.strip():
+            continue
+        try:
+            batch.append((number, json.loads(line)))
+        except ValueError as exc:
+            result['errors'].append({'line': number, 'errors': f'Некорректный JSON: {exc}'})
+            continue
+        if len(batch) >= batch_size:
+            _import_batch(batch, owner_id, result, batch_size)
+            batch = []
+    if batch:
+        _import_batch(batch, owner_id, result, batch_size)
+    return result
+
+
+def _validate_batch(batch, owner_id, errors):
+    """Проверяет записи порции, возвращает [(номер строки, данные курса, данные уроков)]"""
+    course_serializer = CourseImportSerializer()
+    lesson_serializer = LessonImportSerializer()
+    valid = []
+    for number, record in batch:
+        try:
+            course = course_serializer.run_validation(record)
+            lessons = []
+            for index, item in enumerate(course.pop('lessons', [])):
+                try:
+                    lessons.append(lesson_serializer.run_validation(item))
+                except ValidationError as exc:
+                    raise ValidationError({'lessons': {index: exc.detail}})
+        except ValidationError as exc:
+            errors[number] = exc.detail
+            continue
+        if owner_id is not None:
+            course['owner'] = None
+            for lesson in lessons:
+                lesson['owner'] = None
+        valid.append((number, course, lessons))
+
+    # Ссылки на видео всей порции проверяются одним вызовом
+    links = [(number, lesson) for number, _, lessons in valid for lesson in lessons]
+    for (number, lesson), link in zip(links, validate_many([lesson['video_link'] for _, lesson in links])):
+        if link.is_valid:
+            lesson['video_id'] = link.video_id or ''
+        else:
+            errors.setdefault(number, {'video_link': [f'{lesson["video_link"]}: {link.message}']})
+    return [item for item in valid if item[0] not in errors]
+
+
+def _import_batch(batch, owner_id, result, batch_size):
+    errors = {}
+    valid = _validate_batch(batch, owner_id, errors)
+
+    # Владельцы по естественному ключу - одним запросом на порцию
+    emails = {course.get('owner') for _, course, _ in valid} | {
+        lesson.get('owner') for _, _, lessons in valid for lesson in lessons
+    }
+    emails.discard(None)
+    users = dict(get_user_model().objects.filter(email__in=emails).values_list('email', 'pk'))
+
+    courses, lessons = [], []
+    for number, course_data, lessons_data in valid:
+        owners = {course_data.get('owner'), *(lesson.get('owner') for lesson in lessons_data)}
+        missing = sorted(owners - {None} - set(users))
+        if missing:
+            errors[number] = {'owner': [f'Пользователь {email} не найден' for email in missing]}
+            continue
+        course_owner = course_data.pop('owner', None)
+        course_owner_id = owner_id or users.get(course_owner)
+        course = Course(owner_id=course_owner_id, lessons_count=len(lessons_data), **course_data)
+        courses.append(course)
+        for lesson_data in lessons_data:
+            lesson_owner = lesson_data.pop('owner', None)
+            lessons.append(Lesson(
+                course=course,
+                owner_id=users[lesson_owner] if lesson_owner else course_owner_id,
+                **lesson_data
+            ))
+
+    with transaction.atomic():
+        Course.objects.bulk_create(courses, batch_size=batch_size)
+        # course_id уроков берется из вставленных курсов при сохранении
+        Lesson.objects.bulk_create(lessons, batch_size=batch_size)
+        index_instances(courses)
+        index_instances(lessons)
+    if courses:
+        owner_ids = {course.owner_id for course in courses} | {lesson.owner_id for lesson in lessons}
+        bump_list_cache(owner_ids, everyone=True)
+
+    result['courses'] += len(courses)
+    result['lessons'] += len(lessons)
+    result['errors'].extend({'line': number, 'errors': errors[number]} for number in sorted(errors))
@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import CourseViewSet, LessonListCreateView, LessonDetailView, course_list_view, lesson_list_view, SubscriptionAPIView
+from .views import CourseViewSet, LessonListCreateView, LessonDetailView, LessonBulkAPIView, course_list_view, lesson_list_view, SubscriptionAPIView, SubscriptionBulkAPIView
 
 router = DefaultRouter()
 router.register(r'courses', CourseViewSet)
@@ -9,9 +9,11 @@ urlpatterns = [
     path('', include(router.urls)),
     path('lessons/', LessonListCreateView.as_view(), name='lesson-list-create'),
     path('lessons/<int:pk>/', LessonDetailView.as_view(), name='lesson-detail'),
+    path('lessons/bulk/', LessonBulkAPIView.as_view(), name='lesson-bulk'),
     
     # Subscription API
     path('subscription/', SubscriptionAPIView.as_view(), name='course-subscription'),
+    path('subscription/bulk/', SubscriptionBulkAPIView.as_view(), name='course-subscription-bulk'),
     
     # HTML views
     path('html/courses/', course_list_view, name='course_list'),
@@ -1,6 +1,78 @@
+from collections import namedtuple
 from django.core.exceptions import ValidationError
 import re
-from urllib.parse import urlparse
+from urllib.parse import urlsplit, parse_qs
+
+# Разрешенные домены YouTube (без www.) и суффикс для поддоменов youtube.com.
+# Собираются один раз при импорте модуля, а не при каждой проверке.
+ALLOWED_DOMAINS = frozenset({
+    'youtube.com',
+    'youtu.be',
+    'm.youtube.com',
+    'music.youtube.com',
+    'gaming.youtube.com',
+})
+ALLOWED_DOMAIN_SUFFIX = '.youtube.com'
+
+# Пути вида /embed/<id>, /shorts/<id>, /live/<id>, /v/<id>
+_PATH_VIDEO_ID_RE = re.compile(r'^/(?:embed|shorts|live|v)/([A-Za-z0-9_-]+)')
+_VIDEO_ID_RE = re.compile(r'^[A-Za-z0-9_-]+$')
+
+ERROR_MESSAGES = {
+    'invalid_url': (
+        'Разрешены только ссылки на YouTube. '
+        'Ссылки на сторонние ресурсы запрещены.'
+    ),
+    'insecure_url': 'Ссылка должна использовать HTTPS протокол.',
+    'invalid_format': 'Некорректный формат URL. Проверьте правильность ссылки.',
+}
+
+YouTubeURLResult = namedtuple('YouTubeURLResult', ['url', 'is_valid', 'video_id', 'code', 'message'])
+YouTubeURLResult.__doc__ = 'Результат проверки ссылки: код и сообщение ошибки заполнены для невалидных ссылок'
+
+
+def _error(value, code):
+    return YouTubeURLResult(value, False, None, code, ERROR_MESSAGES[code])
+
+
+def _get_video_id(host, path, query):
+    if host == 'youtu.be':
+        video_id = path.lstrip('/').split('/', 1)[0]
+        return video_id if _VIDEO_ID_RE.match(video_id) else None
+    if path == '/watch':
+        video_id = parse_qs(query).get('v', [''])[0]
+        return video_id if _VIDEO_ID_RE.match(video_id) else None
+    match = _PATH_VIDEO_ID_RE.match(path)
+    return match.group(1) if match else None
+
+
+def check_youtube_url(value):
+    """
+    Проверяет ссылку без выбрасывания исключений.
+    Возвращает YouTubeURLResult с каноническим ID видео, если его удалось извлечь.
+    Пустые значения считаются валидными.
+    """
+    if not value or not value.strip():
+        return YouTubeURLResult(value, True, None, None, None)
+
+    try:
+        parts = urlsplit(value.strip())
+        host = parts.hostname or ''
+    except ValueError:
+        return _error(value, 'invalid_format')
+
+    # Убираем www. префикс для унификации
+    if host.startswith('www.'):
+        host = host[4:]
+
+    if host not in ALLOWED_DOMAINS and not host.endswith(ALLOWED_DOMAIN_SUFFIX):
+        return _error(value, 'invalid_url')
+
+    # Дополнительная проверка: URL должен быть HTTPS для безопасности
+    if parts.scheme != 'https':
+        return _error(value, 'insecure_url')
+
+    return YouTubeURLResult(value, True, _get_video_id(host, parts.path, parts.query), None, None)
 
 
 def validate_youtube_url(value):
@@ -8,49 +80,23 @@ def validate_youtube_url(value):
     Валидатор для проверки, что ссылка ведет только на YouTube.
     Разрешены только ссылки на youtube.com и youtu.be домены.
     """
-    if not value:
-        return  # Пустые значения пропускаем (если поле не обязательное)
-    
-    try:
-        # Парсим URL
-        parsed_url = urlparse(value)
-        domain = parsed_url.netloc.lower()
-        
-        # Убираем www. префикс для унификации
-        if domain.startswith('www.'):
-            domain = domain[4:]
-        
-        # Список разрешенных доменов YouTube
-        allowed_domains = [
-            'youtube.com',
-            'youtu.be',
-            'm.youtube.com',
-            'music.youtube.com',
-            'gaming.youtube.com'
-        ]
-        
-        # Проверяем, что домен в списке разрешенных
-        if domain not in allowed_domains and not domain.endswith('.youtube.com'):
-            raise ValidationError(
-                'Разрешены только ссылки на YouTube. '
-                'Ссылки на сторонние ресурсы запрещены.',
-                code='invalid_url'
-            )
-            
-        # Дополнительная проверка: URL должен быть HTTPS для безопасности
-        if parsed_url.scheme != 'https':
-            raise ValidationError(
-                'Ссылка должна использовать HTTPS протокол.',
-                code='insecure_url'
-            )
-            
-    except Exception as e:
-        if isinstance(e, ValidationError):
-            raise e
-        raise ValidationError(
-            'Некорректный формат URL. Проверьте правильность ссылки.',
-            code='invalid_format'
-        )
+    result = check_youtube_url(value)
+    if not result.is_valid:
+        raise ValidationError(result.message, code=result.code)
+
+
+def validate_many(urls):
+    """
+    Проверяет набор ссылок за один проход.
+    Возвращает список YouTubeURLResult в том же порядке, что и ссылки.
+    """
+    return [check_youtube_url(url) for url in urls]
+
+
+def extract_video_id(value):
+    """Возвращает канонический ID видео YouTube или None"""
+    result = check_youtube_url(value)
+    return result.video_id if result.is_valid else None
 
 
 class YouTubeURLValidator:
@@ -60,11 +106,11 @@ class YouTubeURLValidator:
     """
     def __init__(self, field=None):
         self.field = field
-    
+
     def __call__(self, value):
         """Вызывается при валидации"""
         validate_youtube_url(value)
-    
+
     def deconstruct(self):
         """Необходимо для миграций Django"""
         return (
@@ -72,9 +118,9 @@ class YouTubeURLValidator:
             (),
             {'field': self.field}
         )
-    
+
     def __fields__(self):
         """Возвращает список полей, которые валидирует данный валидатор"""
         if self.field:
             return [self.field]
-        return []
\ No newline at end of file
+        return []
@@ -1,16 +1,33 @@
-from django.shortcuts import render, get_object_or_404
-from rest_framework import viewsets, filters
+from django.db import transaction
+from django.db.models import Count, Max, Prefetch, Q
+from django.http import StreamingHttpResponse
+from django.shortcuts import render
+from rest_framework import viewsets, filters, status
+from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser
 from rest_framework.generics import ListCreateAPIView, RetrieveUpdateDestroyAPIView
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.views import APIView
+from rest_framework.exceptions import NotFound
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 from .models import Course, Lesson, Subscription
-from .serializers import CourseSerializer, LessonSerializer
+from .filters import LessonFilter
+from .serializers import (
+    CourseSerializer, LessonBulkSerializer, LessonSerializer, SubscriptionBulkSerializer, get_field_selection
+)
 from .permissions import IsModeratorOrOwnerForModify, IsOwner, IsModeratorOrOwner, IsModerator
 from .paginators import CoursesPagination, LessonsPagination
+from .roles import is_moderator
+from .bulk import bulk_save_lessons
+from .cache import CachedListMixin, bump_list_cache
+from .counters import manual_updates, recount_course_counters
+from .conditional import ConditionalGetMixin
+from .search import IndexedSearchFilter
+from .transfer import export_courses, import_courses
+from users.authentication import get_full_user
 
 # Create your views here.
 
@@ -23,8 +40,19 @@ def lesson_list_view(request):
     """Отображение HTML страницы уроков"""
     return render(request, 'lessons.html')
 
+FIELDS_PARAMETERS = [
+    openapi.Parameter(
+        'fields', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+        description="Поля курса через запятую, например id,title,lessons_count"
+    ),
+    openapi.Parameter(
+        'expand', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+        description="Раскрываемые связи: lessons - полные данные уроков вместо id и названия"
+    ),
+]
+
 # API Views
-class CourseViewSet(viewsets.ModelViewSet):
+class CourseViewSet(ConditionalGetMixin, CachedListMixin, viewsets.ModelViewSet):
     """
     ViewSet для управления курсами.
     
@@ -36,10 +64,11 @@ class CourseViewSet(viewsets.ModelViewSet):
     serializer_class = CourseSerializer
     permission_classes = [IsAuthenticated]
     pagination_class = CoursesPagination
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    list_cache_name = 'courses'
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, IndexedSearchFilter]
     filterset_fields = ['title', 'description']
     search_fields = ['title', 'description']
-    ordering_fields = ['title', 'created_at', 'updated_at']
+    ordering_fields = ['title', 'created_at', 'updated_at', 'lessons_count', 'subscribers_count']
     ordering = ['-created_at']
 
     def get_permissions(self):
@@ -52,7 +81,7 @@ class CourseViewSet(viewsets.ModelViewSet):
         elif self.action == 'destroy':
             # Только владельцы могут удалять (модераторы НЕ могут)
             permission_classes = [IsAuthenticated, IsOwner]
-        elif self.action == 'create':
+        elif self.action in ['create', 'import_file']:
             # Только обычные пользователи могут создавать (модераторы НЕ могут)
             permission_classes = [IsAuthenticated, ~IsModerator]
         elif self.action in ['list', 'retrieve']:
@@ -77,6 +106,7 @@ class CourseViewSet(viewsets.ModelViewSet):
     
     @swagger_auto_schema(
         operation_summary="Получить список курсов",
+        manual_parameters=FIELDS_PARAMETERS,
         operation_description="Возвращает список курсов с пагинацией и фильтрацией",
         responses={
             200: CourseSerializer(many=True),
@@ -88,6 +118,7 @@ class CourseViewSet(viewsets.ModelViewSet):
     
     @swagger_auto_schema(
         operation_summary="Получить курс",
+        manual_parameters=FIELDS_PARAMETERS,
         operation_description="Возвращает детальную информацию о курсе",
         responses={
             200: CourseSerializer,
@@ -135,22 +166,106 @@ class CourseViewSet(viewsets.ModelViewSet):
     def destroy(self, request, *args, **kwargs):
         return super().destroy(request, *args, **kwargs)
 
+    @swagger_auto_schema(
+        operation_summary="Выгрузить курсы",
+        operation_description=(
+            "Потоковая выгрузка доступных пользователю курсов с уроками в JSONL "
+            "(одна строка - один курс, владельцы указаны email). Поддерживает фильтры списка."
+        ),
+        responses={200: "Файл выгрузки"}
+    )
+    @action(detail=False, methods=['get'], pagination_class=None)
+    def export(self, request):
+        """Потоковая выгрузка курсов с уроками"""
+        response = StreamingHttpResponse(
+            export_courses(self.filter_queryset(self.get_queryset())),
+            content_type='application/x-ndjson; charset=utf-8'
+        )
+        response['Content-Disposition'] = 'attachment; filename="courses.jsonl"'
+        return response
+
+    @swagger_auto_schema(
+        operation_summary="Загрузить курсы",
+        operation_description=(
+            "Загружает курсы с уроками из файла JSONL (поле file). Все курсы и уроки "
+            "назначаются текущему пользователю. Некорректные строки пропускаются "
+            "и возвращаются в errors с номером строки."
+        ),
+        manual_parameters=[
+            openapi.Parameter('file', openapi.IN_FORM, type=openapi.TYPE_FILE, required=True, description='Файл JSONL')
+        ],
+        responses={200: "Результат загрузки", 400: "Файл не передан", 403: "Доступ запрещен"}
+    )
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser])
+    def import_file(self, request):
+        """Потоковая загрузка курсов с уроками из JSONL"""
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({"error": "Не передан файл"}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(import_courses(upload, owner_id=request.user.pk))
+
+    def get_object_validators(self, queryset):
+        # Last-Modified для курса не отправляется: удаление урока и изменения
+        # подписок и счетчиков не меняют updated_at, поэтому курс сравнивается только по ETag
+        values = self.get_course_validators(queryset)
+        if not values[1]:
+            return None
+        return values, None
+
+    def get_course_validators(self, queryset):
+        """
+        Значения для ETag курса: сам курс, его уроки (вложены в ответ)
+        и подписки (поля subscribers_count и is_subscribed)
+        """
+        course_ids = queryset.order_by().values('pk')
+        courses = Course.objects.filter(pk__in=course_ids).aggregate(updated=Max('updated_at'), count=Count('pk'))
+        lessons = Lesson.objects.filter(course__in=course_ids).aggregate(updated=Max('updated_at'), count=Count('pk'))
+        subscriptions = Subscription.objects.filter(course__in=course_ids, is_active=True).aggregate(
+            count=Count('pk'),
+            last=Max('pk'),
+            own=Count('pk', filter=Q(user_id=self.request.user.pk)),
+        )
+        return (
+            courses['updated'], courses['count'], lessons['updated'], lessons['count'],
+            subscriptions['count'], subscriptions['last'], subscriptions['own'],
+        )
+
     def perform_create(self, serializer):
         """Автоматически назначаем владельца при создании курса"""
-        serializer.save(owner=self.request.user)
+        serializer.save(owner=get_full_user(self.request.user))
 
     def get_queryset(self):
         """Фильтруем queryset в зависимости от роли пользователя"""
-        if self.request.user.groups.filter(name='Модераторы').exists():
-            return Course.objects.all()
-        return Course.objects.filter(owner=self.request.user)
+        if getattr(self, 'swagger_fake_view', False):
+            return Course.objects.none()
+        if is_moderator(self.request):
+            queryset = Course.objects.all()
+        else:
+            queryset = Course.objects.filter(owner_id=self.request.user.pk)
+        fields, expand = get_field_selection(self.request)
+        if fields is not None:
+            # Не запрошенные клиентом колонки не читаются (владелец нужен для проверки прав)
+            deferred = [
+                field.attname for field in Course._meta.concrete_fields
+                if not field.primary_key and field.name != 'owner' and field.name not in fields
+            ]
+            if deferred:
+                queryset = queryset.defer(*deferred)
+        # Уроки считываются заранее, чтобы сериализатор не делал запросов на каждый курс
+        if fields is None or 'lessons' in fields:
+            lessons = Lesson.objects.order_by('created_at', 'id')
+            if fields is not None and 'lessons' not in expand:
+                lessons = lessons.only('id', 'title', 'course_id')
+            queryset = queryset.prefetch_related(Prefetch('lessons', queryset=lessons))
+        return queryset
 
-class LessonListCreateView(ListCreateAPIView):
+class LessonListCreateView(ConditionalGetMixin, CachedListMixin, ListCreateAPIView):
     queryset = Lesson.objects.all()
     serializer_class = LessonSerializer
     pagination_class = LessonsPagination
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = ['title', 'description', 'course']
+    list_cache_name = 'lessons'
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, IndexedSearchFilter]
+    filterset_class = LessonFilter
     search_fields = ['title', 'description']
     ordering_fields = ['title', 'created_at', 'updated_at']
     ordering = ['-created_at']
@@ -168,15 +283,17 @@ class LessonListCreateView(ListCreateAPIView):
 
     def perform_create(self, serializer):
         """Автоматически назначаем владельца при создании урока"""
-        serializer.save(owner=self.request.user)
+        serializer.save(owner=get_full_user(self.request.user))
 
     def get_queryset(self):
         """Фильтруем queryset в зависимости от роли пользователя"""
-        if self.request.user.groups.filter(name='Модераторы').exists():
+        if getattr(self, 'swagger_fake_view', False):
+            return Lesson.objects.none()
+        if is_moderator(self.request):
             return Lesson.objects.all()
-        return Lesson.objects.filter(owner=self.request.user)
+        return Lesson.objects.filter(owner_id=self.request.user.pk)
 
-class LessonDetailView(RetrieveUpdateDestroyAPIView):
+class LessonDetailView(ConditionalGetMixin, RetrieveUpdateDestroyAPIView):
     queryset = Lesson.objects.all()
     serializer_class = LessonSerializer
     permission_classes = [IsAuthenticated]
@@ -197,9 +314,41 @@ class LessonDetailView(RetrieveUpdateDestroyAPIView):
 
     def get_queryset(self):
         """Фильтруем queryset в зависимости от роли пользователя"""
-        if self.request.user.groups.filter(name='Модераторы').exists():
+        if getattr(self, 'swagger_fake_view', False):
+            return Lesson.objects.none()
+        if is_moderator(self.request):
             return Lesson.objects.all()
-        return Lesson.objects.filter(owner=self.request.user)
+        return Lesson.objects.filter(owner_id=self.request.user.pk)
+
+
+class LessonBulkAPIView(APIView):
+    """API для массового создания и обновления уроков курса"""
+    permission_classes = [IsAuthenticated, ~IsModerator]
+
+    @swagger_auto_schema(
+        operation_summary="Массовая загрузка уроков",
+        operation_description=(
+            "Создает уроки без id и обновляет уроки с id в курсе пользователя. "
+            "Ошибки возвращаются по индексу элемента и не отменяют загрузку остальных уроков."
+        ),
+        request_body=LessonBulkSerializer,
+        responses={
+            200: "Результат загрузки",
+            400: "Ошибка валидации данных",
+            404: "Курс не найден"
+        }
+    )
+    def post(self, request, *args, **kwargs):
+        serializer = LessonBulkSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        course = Course.objects.filter(
+            pk=serializer.validated_data['course_id'], owner_id=request.user.pk
+        ).only('id', 'owner_id').first()
+        if course is None:
+            raise NotFound('Курс не найден')
+
+        result = bulk_save_lessons(course, request.user.pk, serializer.validated_data['lessons'])
+        return Response({"course_id": course.pk, **result})
 
 
 class SubscriptionAPIView(APIView):
@@ -217,31 +366,89 @@ class SubscriptionAPIView(APIView):
                 status=400
             )
         
-        course_item = get_object_or_404(Course, id=course_id)
+        try:
+            course_id = int(course_id)
+        except (TypeError, ValueError):
+            return Response(
+                {"error": "Некорректный ID курса"},
+                status=400
+            )
         
-        # Проверяем существующую подписку
-        subs_item = Subscription.objects.filter(
-            user=user, 
-            course=course_item
-        )
+        course = Course.objects.filter(pk=course_id).values('title', 'owner_id').first()
+        if course is None:
+            raise NotFound('Курс не найден')
+        course_title = course['title']
         
-        # Если подписка есть - удаляем
-        if subs_item.exists():
-            subs_item.delete()
-            message = 'подписка удалена'
-            subscribed = False
-        # Если подписки нет - создаем
-        else:
-            Subscription.objects.create(
-                user=user,
-                course=course_item
-            )
-            message = 'подписка добавлена'
-            subscribed = True
+        # Удаление и создание выполняются в одной транзакции без отдельной проверки
+        # существования; параллельное создание той же подписки игнорируется
+        with transaction.atomic():
+            deleted, _ = Subscription.objects.filter(user_id=user.pk, course_id=course_id).delete()
+            if deleted:
+                message = 'подписка удалена'
+                subscribed = False
+            else:
+                Subscription.objects.bulk_create(
+                    [Subscription(user_id=user.pk, course_id=course_id)],
+                    ignore_conflicts=True
+                )
+                # bulk_create не отправляет post_save
+                recount_course_counters([course_id], fields=['subscribers_count'])
+                bump_list_cache([user.pk, course['owner_id']], everyone=True)
+                message = 'подписка добавлена'
+                subscribed = True
         
         return Response({
             "message": message,
             "subscribed": subscribed,
             "course_id": course_id,
-            "course_title": course_item.title
+            "course_title": course_title
+        })
+
+
+class SubscriptionBulkAPIView(APIView):
+    """API для массовой подписки и отписки от курсов"""
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_summary="Массовая подписка на курсы",
+        operation_description="Подписывает пользователя на курсы из списка или отписывает от них одним запросом",
+        request_body=SubscriptionBulkSerializer,
+        responses={
+            200: "Результат операции",
+            400: "Ошибка валидации данных"
+        }
+    )
+    def post(self, request, *args, **kwargs):
+        serializer = SubscriptionBulkSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        course_ids = set(serializer.validated_data['course_ids'])
+        user = request.user
+        
+        if serializer.validated_data['action'] == 'unsubscribe':
+            # Счетчики и кеш обновляются одним запросом, а не сигналами на каждую подписку
+            with transaction.atomic(), manual_updates():
+                deleted, _ = Subscription.objects.filter(user_id=user.pk, course_id__in=course_ids).delete()
+                recount_course_counters(course_ids, fields=['subscribers_count'])
+            owner_ids = set(Course.objects.filter(pk__in=course_ids).values_list('owner_id', flat=True))
+            bump_list_cache([user.pk, *owner_ids], everyone=True)
+            return Response({
+                "action": "unsubscribe",
+                "removed": deleted
+            })
+        
+        owners = dict(Course.objects.filter(pk__in=course_ids).values_list('pk', 'owner_id'))
+        existing_ids = set(owners)
+        with transaction.atomic():
+            Subscription.objects.bulk_create(
+                [Subscription(user_id=user.pk, course_id=course_id) for course_id in sorted(existing_ids)],
+                ignore_conflicts=True
+            )
+            # bulk_create не отправляет post_save
+            recount_course_counters(existing_ids, fields=['subscribers_count'])
+        bump_list_cache([user.pk, *set(owners.values())], everyone=True)
+        
+        return Response({
+            "action": "subscribe",
+            "subscribed": sorted(existing_ids),
+            "not_found": sorted(course_ids - existing_ids)
         })
@@ -0,0 +1,18 @@
+'use strict';
+// Применяет фильтр AutocompleteFilter сразу после выбора значения
+{
+    const $ = django.jQuery;
+
+    $(document).on('change', '.autocomplete-filter select', function() {
+        const container = this.closest('.autocomplete-filter');
+        const params = new URLSearchParams(window.location.search);
+        params.delete(container.dataset.lookupKwargIsnull);
+        params.delete('p');
+        if (this.value) {
+            params.set(container.dataset.lookupKwarg, this.value);
+        } else {
+            params.delete(container.dataset.lookupKwarg);
+        }
+        window.location.search = params.toString();
+    });
+}
@@ -0,0 +1,275 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models.fields.files import FieldFile
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from courses.models import Course, Lesson, Subscription
+
+User = get_user_model()
+
+
+class AdminChangelistQueriesTestCase(TestCase):
+    """Тесты количества SQL-запросов в списках админки"""
+
+    def setUp(self):
+        """Подготовка тестовых данных"""
+        self.admin = User.objects.create_user(
+            email='admin@test.com',
+            password='testpass123',
+            first_name='Admin',
+            last_name='User',
+            phone='+1234567890',
+            city='Moscow',
+            is_staff=True,
+            is_superuser=True
+        )
+        self.client.force_login(self.admin)
+        self.created = 0
+
+    def create_courses(self, count):
+        """Создает курсы разных владельцев с уроками и подписками"""
+        for _ in range(count):
+            i = self.created
+            self.created += 1
+            owner = User.objects.create_user(
+                email=f'owner{i}@test.com',
+                password='testpass123',
+                phone='+1234567890',
+                city='Moscow'
+            )
+            course = Course.objects.create(title=f'Курс {i}', description='Описание', owner=owner)
+            for j in range(i % 3 + 1):
+                Lesson.objects.create(
+                    title=f'Урок {i}.{j}',
+                    description='Описание',
+                    video_link='https://youtube.com/watch?v=test123',
+                    course=course,
+                    owner=owner
+                )
+            Subscription.objects.create(user=owner, course=course)
+            Subscription.objects.create(user=self.admin, course=course, is_active=i % 2 == 0)
+
+    def count_queries(self, url, **params):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries), response
+
+    def assert_constant_queries(self, url_name):
+        url = reverse(url_name)
+        self.create_courses(2)
+        small_count, _ = self.count_queries(url)
+
+        self.create_courses(8)
+        large_count, _ = self.count_queries(url)
+
+        self.assertEqual(small_count, large_count)
+
+    def test_course_changelist(self):
+        """Тест: список курсов не выполняет запросов на каждую строку"""
+        self.assert_constant_queries('admin:courses_course_changelist')
+
+    def test_lesson_changelist(self):
+        """Тест: список уроков не выполняет запросов на каждую строку"""
+        self.assert_constant_queries('admin:courses_lesson_changelist')
+
+    def test_subscription_changelist(self):
+        """Тест: список подписок не выполняет запросов на каждую строку"""
+        self.assert_constant_queries('admin:courses_subscription_changelist')
+
+    def test_course_counters_are_sortable(self):
+        """Тест: сортировка по количеству уроков и подписчиков"""
+        self.create_courses(3)
+        url = reverse('admin:courses_course_changelist')
+
+        # Колонка 4 - lessons_count, 5 - subscribers_count (нумерация с 1 без чекбокса)
+        _, response = self.count_queries(url, o='-4')
+        courses = list(response.context['cl'].result_list)
+        self.assertEqual(courses[0].title, 'Курс 2')
+        self.assertEqual(courses[0].lessons_count, 3)
+
+        _, response = self.count_queries(url, o='-5.1')
+        courses = list(response.context['cl'].result_list)
+        self.assertEqual([course.subscribers_count for course in courses], [2, 2, 1])
+        self.assertEqual(courses[0].title, 'Курс 0')
+
+
+class AdminAutocompleteTestCase(TestCase):
+    """Тесты фильтров и виджетов автодополнения в админке"""
+
+    def setUp(self):
+        """Подготовка тестовых данных"""
+        self.admin = User.objects.create_user(
+            email='admin@test.com',
+            password='testpass123',
+            phone='+1234567890',
+            city='Moscow',
+            is_staff=True,
+            is_superuser=True
+        )
+        self.client.force_login(self.admin)
+        self.course = Course.objects.create(title='Python', description='Описание', owner=self.admin)
+        self.other_course = Course.objects.create(title='Django', description='Описание', owner=self.admin)
+        self.lesson = Lesson.objects.create(
+            title='Урок',
+            description='Описание',
+            video_link='https://youtube.com/watch?v=test123',
+            course=self.course,
+            owner=self.admin
+        )
+
+    def create_users(self, count, start):
+        User.objects.bulk_create([
+            User(email=f'user{i}@test.com', phone='+1234567890', city='Moscow')
+            for i in range(start, start + count)
+        ])
+
+    def count_queries(self, url, **params):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries), response
+
+    def test_pages_do_not_load_all_users(self):
+        """Тест: страницы админки не загружают всех пользователей"""
+        urls = [
+            reverse('admin:courses_course_changelist'),
+            reverse('admin:courses_lesson_changelist'),
+            reverse('admin:courses_lesson_change', args=[self.lesson.pk]),
+            reverse('admin:users_payment_add'),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                self.create_users(3, start=User.objects.count())
+                self.client.get(url)
+                small_count, response = self.count_queries(url)
+                self.assertNotContains(response, 'user1@test.com')
+
+                self.create_users(20, start=User.objects.count())
+                large_count, _ = self.count_queries(url)
+                self.assertEqual(small_count, large_count)
+
+    def test_filter_by_selected_course(self):
+        """Тест: фильтр показывает выбранный курс и фильтрует список"""
+        Lesson.objects.create(
+            title='Другой урок',
+            description='Описание',
+            video_link='https://youtube.com/watch?v=test123',
+            course=self.other_course,
+            owner=self.admin
+        )
+        url = reverse('admin:courses_lesson_changelist')
+
+        _, response = self.count_queries(url, course__id__exact=self.other_course.pk)
+
+        self.assertEqual([lesson.title for lesson in response.context['cl'].result_list], ['Другой урок'])
+        self.assertContains(response, 'class="autocomplete-filter"')
+        self.assertContains(response, f'<option value="{self.other_course.pk}" selected>Django</option>', html=True)
+        self.assertNotContains(response, f'<option value="{self.course.pk}"')
+
+    def test_autocomplete_search(self):
+        """Тест: поиск курсов для фильтра через autocomplete-представление"""
+        response = self.client.get(reverse('admin:autocomplete'), {
+            'app_label': 'courses',
+            'model_name': 'lesson',
+            'field_name': 'course',
+            'term': 'Djan',
+        })
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item['text'] for item in response.json()['results']], ['Django'])
+
+    def test_autocomplete_ordered_by_title(self):
+        """Тест: автодополнение сортирует курсы по названию, список курсов - по умолчанию"""
+        response = self.client.get(reverse('admin:autocomplete'), {
+            'app_label': 'courses',
+            'model_name': 'lesson',
+            'field_name': 'course',
+        })
+        self.assertEqual([item['text'] for item in response.json()['results']], ['Django', 'Python'])
+
+        _, response = self.count_queries(reverse('admin:courses_course_changelist'))
+        self.assertEqual(
+            [course.pk for course in response.context['cl'].result_list],
+            list(Course.objects.order_by('-pk').values_list('pk', flat=True))
+        )
+
+
+class LessonInlinePaginationTestCase(TestCase):
+    """Тесты постраничного inline уроков на странице курса"""
+
+    def setUp(self):
+        """Подготовка тестовых данных"""
+        self.admin = User.objects.create_user(
+            email='admin@test.com',
+            password='testpass123',
+            phone='+1234567890',
+            city='Moscow',
+            is_staff=True,
+            is_superuser=True
+        )
+        self.client.force_login(self.admin)
+        self.course = Course.objects.create(title='Большой курс', description='Описание', owner=self.admin)
+        for i in range(45):
+            Lesson.objects.create(
+                title=f'Урок {i}',
+                description='Описание',
+                video_link='https://youtube.com/watch?v=test123',
+                course=self.course,
+                owner=self.admin
+            )
+        self.url = reverse('admin:courses_course_change', args=[self.course.pk])
+
+    def get_formset(self, response):
+        return response.context['inline_admin_formsets'][0].formset
+
+    def build_post_data(self, response):
+        """Собирает данные формы курса и inline уроков из ответа GET"""
+        data = {}
+        form = response.context['adminform'].form
+        formset = self.get_formset(response)
+        for bound_form in [form, *formset.initial_forms]:
+            for field in bound_form:
+                value = field.value()
+                if value not in (None, False) and not isinstance(value, FieldFile):
+                    data[field.html_name] = value
+        data.update({
+            f'{formset.prefix}-TOTAL_FORMS': formset.initial_form_count(),
+            f'{formset.prefix}-INITIAL_FORMS': formset.initial_form_count(),
+            f'{formset.prefix}-MIN_NUM_FORMS': 0,
+            f'{formset.prefix}-MAX_NUM_FORMS': 1000,
+        })
+        return data
+
+    def test_lessons_are_paginated(self):
+        """Тест: на странице курса выводится одна страница уроков"""
+        response = self.client.get(self.url)
+        formset = self.get_formset(response)
+        self.assertEqual(formset.initial_form_count(), 20)
+        self.assertEqual(formset.initial_forms[0].instance.title, 'Урок 0')
+        self.assertContains(response, '?lessons_page=3')
+
+        response = self.client.get(self.url, {'lessons_page': 3})
+        formset = self.get_formset(response)
+        self.assertEqual(
+            [form.instance.title for form in formset.initial_forms],
+            [f'Урок {i}' for i in range(40, 45)]
+        )
+
+    def test_save_page(self):
+        """Тест: сохранение страницы уроков меняет только измененные уроки"""
+        page_url = f'{self.url}?lessons_page=2'
+        response = self.client.get(page_url)
+        data = self.build_post_data(response)
+        formset = self.get_formset(response)
+        edited = formset.initial_forms[0]
+        self.assertEqual(edited.instance.title, 'Урок 20')
+        data[edited['title'].html_name] = 'Измененный урок'
+
+        response = self.client.post(page_url, data)
+
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(Lesson.objects.filter(title='Измененный урок', course=self.course).exists())
+        self.assertEqual(Lesson.objects.filter(course=self.course).count(), 45)
+        self.assertTrue(Lesson.objects.filter(title='Урок 0').exists())
@@ -1,3 +1,5 @@
+from unittest import mock
+
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import Group
@@ -334,6 +336,144 @@ class AllEndpointsTestCase(APITestCase):
             api_settings.ACCESS_TOKEN_LIFETIME = original_lifetime
 
 
+class StatelessJWTTestCase(APITestCase):
+    """Тесты аутентификации по JWT с ролями в токене"""
+
+    def setUp(self):
+        """Подготовка тестовых данных"""
+        self.moderators_group = Group.objects.create(name='Модераторы')
+        self.moderator_user = User.objects.create_user(
+            email='moderator@test.com',
+            password='testpass123',
+            first_name='Moderator',
+            last_name='User',
+            phone='+1234567891',
+            city='Moscow'
+        )
+        self.moderator_user.groups.add(self.moderators_group)
+        self.owner_user = User.objects.create_user(
+            email='owner@test.com',
+            password='testpass123',
+            first_name='Owner',
+            last_name='User',
+            phone='+1234567890',
+            city='Moscow'
+        )
+        Course.objects.create(title='Курс', description='Описание', owner=self.owner_user)
+
+        from rest_framework.views import APIView
+        from users.authentication import StatelessJWTAuthentication
+        patcher = mock.patch.object(APIView, 'authentication_classes', [StatelessJWTAuthentication])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def obtain_token(self, email):
+        response = self.client.post(reverse('token_obtain_pair'), {
+            'email': email,
+            'password': 'testpass123'
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data['access']
+
+    def test_token_contains_roles(self):
+        """Тест: токен содержит email и роли пользователя"""
+        from rest_framework_simplejwt.tokens import AccessToken
+
+        token = AccessToken(self.obtain_token('moderator@test.com'))
+
+        self.assertEqual(token['email'], 'moderator@test.com')
+        self.assertEqual(token['roles'], ['Модераторы'])
+
+    def test_refresh_rereads_roles(self):
+        """Тест: обновленный access-токен не сохраняет роли, снятые после входа"""
+        from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+        response = self.client.post(reverse('token_obtain_pair'), {
+            'email': 'moderator@test.com',
+            'password': 'testpass123'
+        })
+        refresh = response.data['refresh']
+        self.assertNotIn('roles', RefreshToken(refresh).payload)
+
+        self.moderator_user.groups.remove(self.moderators_group)
+        response = self.client.post(reverse('token_refresh'), {'refresh': refresh})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        token = AccessToken(response.data['access'])
+        self.assertEqual(token['roles'], [])
+        self.assertEqual(token['email'], 'moderator@test.com')
+
+    def test_moderator_authorized_without_user_queries(self):
+        """Тест: запрос модератора авторизуется без запросов к пользователям и группам"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        token = self.obtain_token('moderator@test.com')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse('course-list'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 1)
+        tables = ' '.join(query['sql'] for query in context.captured_queries)
+        self.assertNotIn('"users_user"', tables)
+        self.assertNotIn('"auth_group"', tables)
+
+    def test_profile_loads_full_user(self):
+        """Тест: представления, которым нужна модель пользователя, получают ее"""
+        token = self.obtain_token('owner@test.com')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+        response = self.client.get(reverse('user-profile'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['city'], 'Moscow')
+
+
+class SchemaTestCase(TestCase):
+    """Тесты отдачи схемы OpenAPI"""
+
+    def setUp(self):
+        """Подготовка временного каталога для схемы"""
+        import tempfile
+        from pathlib import Path
+        from config.schema import reset_schema_cache
+
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.schema_dir = Path(temp_dir.name) / 'schema'
+        settings_override = self.settings(API_SCHEMA_DIR=self.schema_dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        reset_schema_cache()
+        self.addCleanup(reset_schema_cache)
+        self.url = reverse('schema-json', kwargs={'format': '.json'})
+
+    def test_schema_generated_lazily_with_etag(self):
+        """Тест: без файла схема генерируется и отдается с ETag"""
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('/courses/courses/', response.json()['paths'])
+        self.assertIn('max-age', response['Cache-Control'])
+
+        cached = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_schema_served_from_generated_file(self):
+        """Тест: схема отдается из файла, созданного командой"""
+        from django.core.management import call_command
+        from io import StringIO
+
+        call_command('generate_api_schema', stdout=StringIO())
+        (self.schema_dir / 'swagger.json').write_text('{"paths": {}}')
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.json(), {'paths': {}})
+
+
 class HTMLViewsTestCase(TestCase):
     """Тесты HTML представлений"""
 
@@ -1,4 +1,7 @@
-from django.test import TestCase
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import Group
 from django.urls import reverse
@@ -419,6 +422,62 @@ class SubscriptionTestCase(APITestCase):
         self.assertFalse(response.data['is_subscribed'])
 
 
+class SubscriptionBulkTestCase(APITestCase):
+    """Тесты массовой подписки на курсы"""
+
+    def setUp(self):
+        """Подготовка тестовых данных"""
+        self.user = User.objects.create_user(
+            email='user@test.com',
+            password='testpass123',
+            first_name='Test',
+            last_name='User',
+            phone='+1234567890',
+            city='Moscow'
+        )
+        self.courses = [
+            Course.objects.create(title=f'Курс {i}', description='Описание', owner=self.user)
+            for i in range(3)
+        ]
+        self.url = reverse('course-subscription-bulk')
+        self.client.force_authenticate(user=self.user)
+
+    def test_bulk_subscribe(self):
+        """Тест: подписка на несколько курсов, повторные подписки игнорируются"""
+        Subscription.objects.create(user=self.user, course=self.courses[0])
+        course_ids = [course.id for course in self.courses] + [99999]
+
+        response = self.client.post(self.url, {'course_ids': course_ids}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['subscribed'], sorted(course.id for course in self.courses))
+        self.assertEqual(response.data['not_found'], [99999])
+        self.assertEqual(Subscription.objects.filter(user=self.user).count(), 3)
+
+    def test_bulk_unsubscribe(self):
+        """Тест: отписка от нескольких курсов"""
+        for course in self.courses:
+            Subscription.objects.create(user=self.user, course=course)
+
+        response = self.client.post(self.url, {
+            'course_ids': [self.courses[0].id, self.courses[1].id],
+            'action': 'unsubscribe'
+        }, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['removed'], 2)
+        self.assertEqual(
+            list(Subscription.objects.values_list('course_id', flat=True)),
+            [self.courses[2].id]
+        )
+
+    def test_bulk_requires_course_ids(self):
+        """Тест: пустой список курсов не принимается"""
+        response = self.client.post(self.url, {'course_ids': []}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
 class PaginationTestCase(APITestCase):
     """Тесты пагинации"""
 
@@ -496,6 +555,56 @@ class PaginationTestCase(APITestCase):
         # Должно вернуть не больше max_page_size
         self.assertLessEqual(len(response.data['results']), 20)
 
+    def test_lessons_cursor_pagination_walks_all_items(self):
+        """Тест пагинации по курсору: все уроки без пропусков и повторов"""
+        from django.utils import timezone
+
+        # Одинаковая дата создания проверяет сортировку по id при равенстве
+        Lesson.objects.update(created_at=timezone.now())
+        self.client.force_authenticate(user=self.user)
+        url = reverse('lesson-list-create')
+
+        response = self.client.get(url, {'pagination': 'cursor', 'page_size': 7})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('count', response.data)
+        self.assertIsNone(response.data['previous'])
+
+        seen = [item['id'] for item in response.data['results']]
+        pages = [response]
+        while response.data['next']:
+            response = self.client.get(response.data['next'])
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            seen.extend(item['id'] for item in response.data['results'])
+            pages.append(response)
+
+        expected = sorted((lesson.id for lesson in self.lessons), reverse=True)
+        self.assertEqual(seen, expected)
+        self.assertEqual(len(pages), 4)
+
+        # Ссылка назад возвращает предыдущую страницу целиком
+        previous = self.client.get(pages[-1].data['previous'])
+        self.assertEqual(
+            [item['id'] for item in previous.data['results']],
+            [item['id'] for item in pages[-2].data['results']]
+        )
+
+    def test_cursor_pagination_count_on_request(self):
+        """Тест: общее количество считается только по запросу"""
+        self.client.force_authenticate(user=self.user)
+        url = reverse('course-list')
+        response = self.client.get(url, {'pagination': 'cursor', 'with_count': 1})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 15)
+
+    def test_invalid_cursor(self):
+        """Тест: некорректный курсор возвращает 404"""
+        self.client.force_authenticate(user=self.user)
+        url = reverse('lesson-list-create')
+        response = self.client.get(url, {'cursor': 'invalid'})
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
 
 class PermissionsTestCase(APITestCase):
     """Тесты системы прав доступа"""
@@ -578,3 +687,1003 @@ class PermissionsTestCase(APITestCase):
         
         # Должна быть ошибка 404, так как курс не в queryset владельца 1
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class CourseListQueriesTestCase(APITestCase):
+    """Тесты количества SQL-запросов при получении списка курсов"""
+
+    def setUp(self):
+        """Подготовка тестовых данных"""
+        self.user = User.objects.create_user(
+            email='queries@test.com',
+            password='testpass123',
+            first_name='Queries',
+            last_name='User',
+            phone='+1234567890',
+            city='Moscow'
+        )
+        self.url = reverse('course-list')
+
+    def create_courses(self, count):
+        """Создает курсы с уроками и подписками"""
+        for i in range(count):
+            course = Course.objects.create(
+                title=f'Курс {i}',
+                description='Описание',
+                owner=self.user
+            )
+            for j in range(2):
+                Lesson.objects.create(
+                    title=f'Урок {i}.{j}',
+                    description='Описание',
+                    video_link='https://youtube.com/watch?v=test123',
+                    course=course,
+                    owner=self.user
+                )
+            if i % 2 == 0:
+                Subscription.objects.create(user=self.user, course=course)
+
+    def count_list_queries(self):
+        """Возвращает количество запросов для первой страницы списка курсов"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.url, {'page_size': 50})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(context.captured_queries), response
+
+    def test_list_queries_do_not_depend_on_page_size(self):
+        """Тест: количество запросов не растет вместе с числом курсов"""
+        self.client.force_authenticate(user=self.user)
+
+        self.create_courses(2)
+        small_count, _ = self.count_list_queries()
+
+        self.create_courses(10)
+        large_count, response = self.count_list_queries()
+
+        self.assertEqual(small_count, large_count)
+        self.assertEqual(response.data['count'], 12)
+
+    def test_list_returns_precomputed_values(self):
+        """Тест: количество уроков и статус подписки считаются корректно"""
+        self.client.force_authenticate(user=self.user)
+        self.create_courses(3)
+
+        _, response = self.count_list_queries()
+        results = {item['title']: item for item in response.data['results']}
+
+        self.assertEqual(results['Курс 0']['lessons_count'], 2)
+        self.assertEqual(len(results['Курс 0']['lessons']), 2)
+        self.assertTrue(results['Курс 0']['is_subscribed'])
+        self.assertFalse(results['Курс 1']['is_subscribed'])
+
+
+class RolesResolutionTestCase(APITestCase):
+    """Тесты определения ролей пользователя"""
+
+    def setUp(self):
+        """Подготовка тестовых данных"""
+        self.moderators_group = Group.objects.create(name='Модераторы')
+        self.moderator = User.objects.create_user(
+            email='moderator@test.com',
+            password='testpass123',
+            first_name='Moderator',
+            last_name='User',
+            phone='+1234567890',
+            city='Moscow'
+        )
+        self.moderator.groups.add(self.moderators_group)
+        self.owner = User.objects.create_user(
+            email='owner@test.com',
+            password='testpass123',
+            first_name='Owner',
+            last_name='User',
+            phone='+1234567891',
+            city='Moscow'
+        )
+        self.course = Course.objects.create(
+            title='Курс',
+            description='Описание',
+            owner=self.owner
+        )
+
+    def count_group_queries(self, method, url, data=None):
+        """Считает запросы к группам пользователя во время запроса к API"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as context:
+            response = getattr(self.client, method)(url, data)
+        group_queries = [
+            query for query in context.captured_queries
+            if 'auth_group' in query['sql']
+        ]
+        return response, len(group_queries)
+
+    def test_moderator_update_checks_groups_once(self):
+        """Тест: при обновлении курса модератором роли запрашиваются один раз"""
+        self.client.force_authenticate(user=self.moderator)
+        url = reverse('course-detail', kwargs={'pk': self.course.pk})
+
+        response, group_queries = self.count_group_queries('patch', url, {'title': 'Новое название'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(group_queries, 1)
+
+    def test_process_cache_is_reset_on_group_change(self):
+        """Тест: кеш ролей сбрасывается при изменении групп пользователя"""
+        from courses.roles import get_roles_for_user, invalidate_user_roles
+
+        with self.settings(ROLES_CACHE_TTL=60):
+            invalidate_user_roles()
+            self.assertIn('Модераторы', get_roles_for_user(self.moderator))
+
+            self.moderator.groups.remove(self.moderators_group)
+            self.assertNotIn('Модераторы', get_roles_for_user(self.moderator))
+
+
+class SearchTestCase(APITestCase):
+    """Тесты полнотекстового поиска по курсам и урокам"""
+
+    def setUp(self):
+        """Подготовка тестовых данных"""
+        self.user = User.objects.create_user(
+            email='search@test.com',
+            password='testpass123',
+            first_name='Search',
+            last_name='User',
+            phone='+1234567890',
+            city='Moscow'
+        )
+        self.python_course = Course.objects.create(
+            title='Программирование на Python',
+            description='Основы языка для начинающих',
+            owner=self.user
+        )
+        self.django_course = Course.objects.create(
+            title='Django для веб-разработки',
+            description='Курс требует знаний программирования на Python',
+            owner=self.user
+        )
+        self.other_course = Course.objects.create(
+            title='Рисование',
+            description='Курс для художников',
+            owner=self.user
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def search_titles(self, url, query, **params):
+        response = self.client.get(url, {'search': query, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [item['title'] for item in response.data['results']]
+
+    def test_search_uses_word_forms(self):
+        """Тест: поиск находит разные формы слова"""
+        titles = self.search_titles(reverse('course-list'), 'программированию')
+
+        self.assertEqual(set(titles), {'Программирование на Python', 'Django для веб-разработки'})
+
+    def test_search_orders_by_relevance(self):
+        """Тест: совпадение в названии важнее совпадения в описании"""
+        titles = self.search_titles(reverse('course-list'), 'python')
+
+        self.assertEqual(titles, ['Программирование на Python', 'Django для веб-разработки'])
+
+    def test_search_requires_all_terms(self):
+        """Тест: в результатах только объекты со всеми словами запроса"""
+        titles = self.search_titles(reverse('course-list'), 'python django')
+
+        self.assertEqual(titles, ['Django для веб-разработки'])
+
+    def test_search_by_word_prefix(self):
+        """Тест: последнее слово запроса ищется по началу слова"""
+        url = reverse('course-list')
+        both = {'Программирование на Python', 'Django для веб-разработки'}
+
+        self.assertEqual(set(self.search_titles(url, 'pyth')), both)
+        self.assertEqual(set(self.search_titles(url, 'Программ')), both)
+        self.assertEqual(self.search_titles(url, 'python djan'), ['Django для веб-разработки'])
+        # Префиксом считается только последнее слово
+        self.assertEqual(self.search_titles(url, 'pyth django'), [])
+
+    def test_prefix_matching_several_words(self):
+        """Тест: несколько слов объекта с одним префиксом не мешают проверке всех слов запроса"""
+        Course.objects.create(title='Python: пакеты и потоки', description='Описание', owner=self.user)
+
+        titles = self.search_titles(reverse('course-list'), 'python п')
+
+        self.assertIn('Python: пакеты и потоки', titles)
+
+    def test_index_follows_changes(self):
+        """Тест: индекс обновляется при изменении и удалении объектов"""
+        url = reverse('course-list')
+        self.other_course.title = 'Рисование на Python'
+        self.other_course.save()
+        self.assertIn('Рисование на Python', self.search_titles(url, 'python'))
+
+        self.python_course.delete()
+        self.assertNotIn('Программирование на Python', self.search_titles(url, 'python'))
+
+    def test_lesson_search(self):
+        """Тест: поиск по урокам"""
+        Lesson.objects.create(
+            title='Переменные и типы данных',
+            description='Первый урок',
+            video_link='https://youtube.com/watch?v=test123',
+            course=self.python_course,
+            owner=self.user
+        )
+
+        titles = self.search_titles(reverse('lesson-list-create'), 'переменная')
+
+        self.assertEqual(titles, ['Переменные и типы данных'])
+
+
+class LessonVideoIdTestCase(APITestCase):
+    """Тесты канонического ID видео у уроков"""
+
+    def setUp(self):
+        """Подготовка тестовых данных"""
+        self.user = User.objects.create_user(
+            email='video@test.com',
+            password='testpass123',
+            first_name='Video',
+            last_name='User',
+            phone='+1234567890',
+            city='Moscow'
+        )
+        self.course = Course.objects.create(
+            title='Курс с видео',
+            description='Описание',
+            owner=self.user
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def create_lesson(self, title, video_link):
+        return Lesson.objects.create(
+            title=title,
+            description='Описание',
+            video_link=video_link,
+            course=self.course,
+            owner=self.user
+        )
+
+    def test_video_id_is_normalized_on_save(self):
+        """Тест: разные формы ссылки дают один video_id"""
+        first = self.create_lesson('Урок 1', 'https://youtu.be/dQw4w9WgXcQ')
+        second = self.create_lesson('Урок 2', 'https://m.youtube.com/watch?v=dQw4w9WgXcQ&t=10')
+
+        self.assertEqual(first.video_id, 'dQw4w9WgXcQ')
+        self.assertEqual(second.video_id, 'dQw4w9WgXcQ')
+
+        second.video_link = 'https://www.youtube.com/watch?v=abcDEF12345'
+        second.save(update_fields=['video_link'])
+        second.refresh_from_db()
+        self.assertEqual(second.video_id, 'abcDEF12345')
+
+    def test_filter_by_video(self):
+        """Тест: фильтр уроков по ссылке в любой форме и по video_id"""
+        self.create_lesson('Урок 1', 'https://youtu.be/dQw4w9WgXcQ')
+        self.create_lesson('Урок 2', 'https://www.youtube.com/watch?v=abcDEF12345')
+        url = reverse('lesson-list-create')
+
+        response = self.client.get(url, {'video': 'https://www.youtube.com/watch?v=dQw4w9WgXcQ'})
+        self.assertEqual([item['title'] for item in response.data['results']], ['Урок 1'])
+
+        response = self.client.get(url, {'video_id': 'abcDEF12345'})
+        self.assertEqual([item['title'] for item in response.data['results']], ['Урок 2'])
+        self.assertEqual(response.data['results'][0]['video_id'], 'abcDEF12345')
+
+        response = self.client.get(url, {'video': 'https://vimeo.com/123'})
+        self.assertEqual(response.data['results'], [])
+
+    def test_duplicate_report(self):
+        """Тест: команда отчета находит видео в нескольких уроках"""
+        self.create_lesson('Урок 1', 'https://youtu.be/dQw4w9WgXcQ')
+        self.create_lesson('Урок 2', 'https://www.youtube.com/embed/dQw4w9WgXcQ')
+        self.create_lesson('Урок 3', 'https://www.youtube.com/watch?v=abcDEF12345')
+
+        out = StringIO()
+        call_command('report_duplicate_videos', stdout=out)
+
+        output = out.getvalue()
+        self.assertIn('dQw4w9WgXcQ: уроков 2', output)
+        self.assertIn('"Урок 2"', output)
+        self.assertNotIn('abcDEF12345', output)
+
+
+@override_settings(LIST_CACHE_TIMEOUT=300)
+class ListCacheTestCase(APITestCase):
+    """Тесты кеша ответов списков курсов и уроков"""
+
+    def setUp(self):
+        """Подготовка тестовых данных"""
+        from django.core.cache import cache
+        from courses.cache import reset_list_cache_stats
+
+        cache.clear()
+        reset_list_cache_stats()
+        self.user = User.objects.create_user(
+            email='cache@test.com',
+            password='testpass123',
+            first_name='Cache',
+            last_name='User',
+            phone='+1234567890',
+            city='Moscow'
+        )
+        self.other_user = User.objects.create_user(
+            email='cache-other@test.com',
+            password='testpass123',
+            first_name='Other',
+            last_name='User',
+            phone='+1234567890',
+            city='Moscow'
+        )
+        self.moderator = User.objects.create_user(
+            email='cache-moderator@test.com',
+            password='testpass123',
+            first_name='Moderator',
+            last_name='User',
+            phone='+1234567890',
+            city='Moscow'
+        )
+        moderators, _ = Group.objects.get_or_create(name='Модераторы')
+        self.moderator.groups.add(moderators)
+        self.course = Course.objects.create(title='Мой курс', description='Описание', owner=self.user)
+        self.courses_url = reverse('course-list')
+        self.lessons_url = reverse('lesson-list-create')
+
+    def get(self, url, user, **params):
+        self.client.force_authenticate(user=user)
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response
+
+    def test_repeated_list_is_served_from_cache(self):
+        """Тест: повторный запрос того же списка берется из кеша"""
+        first = self.get(self.courses_url, self.user)
+        self.assertEqual(first['X-Cache'], 'MISS')
+
+        second = self.get(self.courses_url, self.user)
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(second.data, first.data)
+
+        other_page = self.get(self.courses_url, self.user, page_size=5)
+        self.assertEqual(other_page['X-Cache'], 'MISS')
+
+        from courses.cache import get_list_cache_stats
+        self.assertEqual(get_list_cache_stats()['hits'], 1)
+        self.assertEqual(get_list_cache_stats()['misses'], 2)
+
+    def test_changes_invalidate_owner_lists(self):
+        """Тест: изменения уроков и подписок сбрасывают кеш владельца"""
+        self.get(self.courses_url, self.user)
+        self.get(self.lessons_url, self.user)
+
+        Lesson.objects.create(
+            title='Новый урок',
+            description='Описание',
+            video_link='https://youtube.com/watch?v=test123',
+            course=self.course,
+            owner=self.user
+        )
+        response = self.get(self.courses_url, self.user)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['results'][0]['lessons_count'], 1)
+        response = self.get(self.lessons_url, self.user)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['count'], 1)
+
+        self.client.post(reverse('course-subscription'), {'course_id': self.course.pk})
+        response = self.get(self.courses_url, self.user)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertTrue(response.data['results'][0]['is_subscribed'])
+
+    def test_other_users_changes_keep_cache(self):
+        """Тест: чужие изменения не сбрасывают кеш пользователя, но сбрасывают кеш модераторов"""
+        self.get(self.courses_url, self.user)
+        self.get(self.courses_url, self.moderator)
+
+        Course.objects.create(title='Чужой курс', description='Описание', owner=self.other_user)
+
+        self.assertEqual(self.get(self.courses_url, self.user)['X-Cache'], 'HIT')
+        response = self.get(self.courses_url, self.moderator)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['count'], 2)
+
+    def test_cache_without_storage(self):
+        """Тест: с кешем, который не хранит значения, списки отдаются без кеширования"""
+        dummy = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+        with override_settings(CACHES=dummy):
+            for url in (self.courses_url, self.lessons_url):
+                with self.subTest(url=url):
+                    response = self.get(url, self.user)
+                    self.assertNotIn('X-Cache', response)
+
+    @override_settings(LIST_CACHE_TIMEOUT=0)
+    def test_cache_disabled_by_timeout(self):
+        """Тест: с нулевым таймаутом кеш не используется"""
+        self.get(self.courses_url, self.user)
+
+        self.assertNotIn('X-Cache', self.get(self.courses_url, self.user))
+
+
+@override_settings(LIST_CACHE_TIMEOUT=300)
+class ConditionalGetTestCase(APITestCase):
+    """Тесты условных GET-запросов (ETag / Last-Modified)"""
+
+    def setUp(self):
+        """Подготовка тестовых данных"""
+        from django.core.cache import cache
+
+        cache.clear()
+        self.user = User.objects.create_user(
+            email='etag@test.com',
+            password='testpass123',
+            first_name='Etag',
+            last_name='User',
+            phone='+1234567890',
+            city='Moscow'
+        )
+        self.course = Course.objects.create(title='Курс', description='Описание', owner=self.user)
+        self.lesson = Lesson.objects.create(
+            title='Урок',
+            description='Описание',
+            video_link='https://youtube.com/watch?v=test123',
+            course=self.course,
+            owner=self.user
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def get(self, url, **headers):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, **headers)
+        return response, [query['sql'] for query in context.captured_queries]
+
+    def test_course_detail_not_modified(self):
+        """Тест: 304 для неизмененного курса без загрузки уроков"""
+        url = reverse('course-detail', args=[self.course.pk])
+        response, _ = self.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response['ETag']
+        self.assertNotIn('Last-Modified', response)
+
+        response, queries = self.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+        self.assertFalse([sql for sql in queries if '"courses_lesson"."title"' in sql])
+
+        # Изменение вложенного урока меняет ETag курса
+        self.lesson.title = 'Новое название'
+        self.lesson.save()
+        response, _ = self.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_course_detail_after_lesson_delete(self):
+        """Тест: после удаления урока курс не считается неизмененным по If-Modified-Since"""
+        from django.utils.http import http_date
+
+        Lesson.objects.create(
+            title='Второй урок',
+            description='Описание',
+            video_link='https://youtube.com/watch?v=test456',
+            course=self.course,
+            owner=self.user
+        )
+        url = reverse('course-detail', args=[self.course.pk])
+        response, _ = self.get(url)
+        etag = response['ETag']
+        self.assertEqual(len(response.data['lessons']), 2)
+
+        self.lesson.delete()
+        since = http_date(self.course.updated_at.timestamp() + 3600)
+        response, _ = self.get(url, HTTP_IF_MODIFIED_SINCE=since)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['lessons']), 1)
+
+        response, _ = self.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_list_etag_follows_deletes(self):
+        """Тест: ETag списка меняется при удалении строки"""
+        url = reverse('course-list')
+        Course.objects.create(title='Второй курс', description='Описание', owner=self.user)
+        response, _ = self.get(url)
+        etag = response['ETag']
+        self.assertNotIn('Last-Modified', response)
+
+        response, _ = self.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        Course.objects.get(title='Второй курс').delete()
+        response, _ = self.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 1)
+
+    def test_list_etag_single_query(self):
+        """Тест: ETag списка строится одним агрегирующим запросом без уроков и подписок"""
+        url = reverse('course-list')
+        response, _ = self.get(url)
+        etag = response['ETag']
+
+        response, queries = self.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(len([sql for sql in queries if 'courses_' in sql]), 1, queries)
+        self.assertFalse([sql for sql in queries if 'courses_lesson' in sql or 'courses_subscription' in sql])
+
+        # Подписка другого пользователя меняет счетчик в курсе и ETag владельца
+        other = User.objects.create_user(email='etag-other@test.com', password='testpass123', phone='+1', city='Moscow')
+        Subscription.objects.create(user=other, course=self.course)
+        response, _ = self.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'][0]['subscribers_count'], 1)
+
+    def test_list_etag_follows_changes_without_signals(self):
+        """Тест: ETag списка меняется при изменениях, о которых версии кеша не знают"""
+        from django.utils import timezone
+
+        url = reverse('course-list')
+        response, _ = self.get(url)
+        etag = response['ETag']
+
+        Course.objects.filter(pk=self.course.pk).update(title='Новое название', updated_at=timezone.now())
+        response, _ = self.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response['ETag']
+
+        Course.objects.bulk_create([Course(title='Второй курс', description='Описание', owner=self.user)])
+        response, _ = self.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    @override_settings(LIST_CACHE_TIMEOUT=0)
+    def test_list_without_etag_when_cache_disabled(self):
+        """Тест: без общего кеша списков ETag списка не отдается"""
+        response, _ = self.get(reverse('course-list'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('ETag', response)
+
+    def test_list_without_etag_for_dummy_cache(self):
+        """Тест: с кешем, который не хранит версии, ETag списка не отдается"""
+        dummy = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+        with override_settings(CACHES=dummy):
+            response, _ = self.get(reverse('lesson-list-create'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('ETag', response)
+
+    def test_lesson_endpoints(self):
+        """Тест: условные запросы к уроку и списку уроков"""
+        for url in [reverse('lesson-detail', args=[self.lesson.pk]), reverse('lesson-list-create')]:
+            with self.subTest(url=url):
+                response, _ = self.get(url)
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+                response, _ = self.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+                self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_missing_object(self):
+        """Тест: для несуществующего объекта возвращается 404"""
+        response, _ = self.get(reverse('lesson-detail', args=[self.lesson.pk + 100]), HTTP_IF_NONE_MATCH='"x"')
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class CourseFieldSelectionTestCase(APITestCase):
+    """Тесты выбора полей (?fields=) и раскрытия связей (?expand=) курса"""
+
+    def setUp(self):
+        """Подготовка тестовых данных"""
+        from django.core.cache import cache
+
+        cache.clear()
+        self.user = User.objects.create_user(
+            email='fields@test.com',
+            password='testpass123',
+            first_name='Fields',
+            last_name='User',
+            phone='+1234567890',
+            city='Moscow'
+        )
+        self.course = Course.objects.create(title='Курс', description='Длинное описание', owner=self.user)
+        for i in range(2):
+            Lesson.objects.create(
+                title=f'Урок {i}',
+                description='Описание',
+                video_link='https://youtube.com/watch?v=test123',
+                course=self.course,
+                owner=self.user
+            )
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('course-list')
+
+    def get(self, url, params):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, params)
+        return response, [query['sql'] for query in context.captured_queries]
+
+    def test_default_response_is_unchanged(self):
+        """Тест: без параметров курс отдается целиком с полными уроками"""
+        response, _ = self.get(self.url, {})
+
+        course = response.data['results'][0]
+        self.assertIn('description', course)
+        self.assertIn('is_subscribed', course)
+        self.assertIn('video_link', course['lessons'][0])
+
+    def test_fields_prune_response_and_queries(self):
+        """Тест: не запрошенные поля не выводятся и не читаются из базы"""
+        response, queries = self.get(self.url, {'fields': 'id,title'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(response.data['results'][0]), {'id', 'title'})
+        self.assertFalse([sql for sql in queries if sql.startswith('SELECT "courses_lesson"."id"')])
+        course_queries = [sql for sql in queries if 'FROM "courses_course"' in sql and 'LIMIT' in sql]
+        self.assertTrue(course_queries)
+        self.assertNotIn('"courses_course"."description"', course_queries[-1])
+        self.assertNotIn('COUNT(', course_queries[-1])
+
+    def test_lessons_are_brief_unless_expanded(self):
+        """Тест: уроки без ?expand=lessons выводятся кратко"""
+        response, _ = self.get(self.url, {'fields': 'id,lessons'})
+        self.assertEqual(response.data['results'][0]['lessons'][0], {'id': self.course.lessons.first().pk, 'title': 'Урок 0'})
+
+        response, _ = self.get(self.url, {'fields': 'id', 'expand': 'lessons'})
+        lessons = response.data['results'][0]['lessons']
+        self.assertEqual(len(lessons), 2)
+        self.assertIn('video_link', lessons[0])
+
+    def test_retrieve_with_fields(self):
+        """Тест: выбор полей работает для детального просмотра"""
+        response, _ = self.get(reverse('course-detail', args=[self.course.pk]), {'fields': 'title,lessons_count'})
+
+        self.assertEqual(response.data, {'title': 'Курс', 'lessons_count': 2})
+
+
+class CourseCountersTestCase(APITestCase):
+    """Тесты денормализованных счетчиков уроков и подписчиков курса"""
+
+    def setUp(self):
+        """Подготовка тестовых данных"""
+        self.user = User.objects.create_user(
+            email='counters@test.com',
+            password='testpass123',
+            first_name='Counters',
+            last_name='User',
+            phone='+1234567890',
+            city='Moscow'
+        )
+        self.course = Course.objects.create(title='Курс', description='Описание', owner=self.user)
+        self.other_course = Course.objects.create(title='Другой курс', description='Описание', owner=self.user)
+        self.client.force_authenticate(user=self.user)
+
+    def create_lesson(self, course):
+        return Lesson.objects.create(
+            title='Урок',
+            description='Описание',
+            video_link='https://youtube.com/watch?v=test123',
+            course=course,
+            owner=self.user
+        )
+
+    def counters(self, course):
+        course.refresh_from_db()
+        return course.lessons_count, course.subscribers_count
+
+    def test_lesson_counter(self):
+        """Тест: счетчик уроков следует за созданием, переносом и удалением"""
+        lesson = self.create_lesson(self.course)
+        self.create_lesson(self.course)
+        self.assertEqual(self.counters(self.course), (2, 0))
+
+        lesson.course = self.other_course
+        lesson.save()
+        self.assertEqual(self.counters(self.course), (1, 0))
+        self.assertEqual(self.counters(self.other_course), (1, 0))
+
+        lesson.delete()
+        self.assertEqual(self.counters(self.other_course), (0, 0))
+
+    def test_subscription_counter(self):
+        """Тест: счетчик подписчиков учитывает только активные подписки"""
+        url = reverse('course-subscription')
+        self.client.post(url, {'course_id': self.course.pk})
+        self.assertEqual(self.counters(self.course), (0, 1))
+
+        subscription = Subscription.objects.get(user=self.user, course=self.course)
+        subscription.is_active = False
+        subscription.save()
+        self.assertEqual(self.counters(self.course), (0, 0))
+
+        subscription.is_active = True
+        subscription.save()
+        self.client.post(url, {'course_id': self.course.pk})
+        self.assertEqual(self.counters(self.course), (0, 0))
+
+        bulk_url = reverse('course-subscription-bulk')
+        self.client.post(bulk_url, {'course_ids': [self.course.pk, self.other_course.pk]}, format='json')
+        self.assertEqual(self.counters(self.course), (0, 1))
+        self.assertEqual(self.counters(self.other_course), (0, 1))
+
+        self.client.post(bulk_url, {'course_ids': [self.course.pk], 'action': 'unsubscribe'}, format='json')
+        self.assertEqual(self.counters(self.course), (0, 0))
+
+    def count_queries(self, func):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as context:
+            func()
+        return len(context.captured_queries)
+
+    def test_bulk_unsubscribe_queries(self):
+        """Тест: массовая отписка выполняет постоянное число запросов"""
+        from django.core.cache import cache
+
+        cache.clear()
+        url = reverse('course-subscription-bulk')
+        courses = [
+            Course.objects.create(title=f'Курс {i}', description='Описание', owner=self.user)
+            for i in range(20)
+        ]
+        ids = [course.pk for course in courses]
+        self.client.post(url, {'course_ids': ids}, format='json')
+
+        def unsubscribe(course_ids):
+            response = self.client.post(url, {'course_ids': course_ids, 'action': 'unsubscribe'}, format='json')
+            self.assertEqual(response.data['removed'], len(course_ids))
+
+        few = self.count_queries(lambda: unsubscribe(ids[:2]))
+        many = self.count_queries(lambda: unsubscribe(ids[2:]))
+
+        self.assertEqual(few, many)
+        self.assertLessEqual(many, 8)
+        self.assertEqual(self.counters(courses[5]), (0, 0))
+
+        listed = self.client.get(reverse('course-list'), {'ordering': 'title'})
+        self.assertTrue(all(course['subscribers_count'] == 0 for course in listed.data['results']))
+
+    def test_course_delete_queries(self):
+        """Тест: удаление курса не выполняет запросов на каждый урок и подписку"""
+        from courses.models import SearchIndexEntry
+
+        for lessons in (2, 20):
+            course = Course.objects.create(title='Курс', description='Описание', owner=self.user)
+            for _ in range(lessons):
+                self.create_lesson(course)
+            for i in range(lessons):
+                subscriber = User.objects.create_user(email=f'sub{lessons}-{i}@test.com', password='x', phone='+1', city='Moscow')
+                Subscription.objects.create(user=subscriber, course=course)
+            lesson_ids = list(course.lessons.values_list('pk', flat=True))
+
+            with self.subTest(lessons=lessons):
+                with self.assertNumQueries(12):
+                    course.delete()
+                self.assertFalse(SearchIndexEntry.objects.filter(model_name='lesson', object_id__in=lesson_ids).exists())
+
+    def test_course_save_keeps_counters(self):
+        """Тест: сохранение загруженного курса не перезаписывает счетчики"""
+        course = Course.objects.get(pk=self.course.pk)
+        self.create_lesson(self.course)
+
+        course.title = 'Новое название'
+        course.save()
+
+        self.assertEqual(self.counters(self.course), (1, 0))
+        self.assertEqual(self.course.title, 'Новое название')
+
+    def test_rebuild_command(self):
+        """Тест: команда пересчитывает счетчики по таблицам уроков и подписок"""
+        self.create_lesson(self.course)
+        Subscription.objects.create(user=self.user, course=self.course)
+        Course.objects.update(lessons_count=5, subscribers_count=5)
+
+        out = StringIO()
+        call_command('rebuild_course_counters', stdout=out)
+
+        self.assertIn('2', out.getvalue())
+        self.assertEqual(self.counters(self.course), (1, 1))
+        self.assertEqual(self.counters(self.other_course), (0, 0))
+
+    def test_api_exposes_counters(self):
+        """Тест: счетчики доступны в API и по ним можно сортировать"""
+        self.create_lesson(self.other_course)
+
+        response = self.client.get(reverse('course-list'), {'ordering': '-lessons_count'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        first = response.data['results'][0]
+        self.assertEqual((first['title'], first['lessons_count'], first['subscribers_count']), ('Другой курс', 1, 0))
+
+
+class LessonBulkTestCase(APITestCase):
+    """Тесты массового создания и обновления уроков"""
+
+    def setUp(self):
+        """Подготовка тестовых данных"""
+        self.user = User.objects.create_user(
+            email='bulk@test.com',
+            password='testpass123',
+            first_name='Bulk',
+            last_name='User',
+            phone='+1234567890',
+            city='Moscow'
+        )
+        self.other_user = User.objects.create_user(
+            email='bulk-other@test.com',
+            password='testpass123',
+            phone='+1234567890',
+            city='Moscow'
+        )
+        self.course = Course.objects.create(title='Курс', description='Описание', owner=self.user)
+        self.lesson = Lesson.objects.create(
+            title='Старый урок',
+            description='Описание',
+            video_link='https://youtube.com/watch?v=old123',
+            course=self.course,
+            owner=self.user
+        )
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('lesson-bulk')
+
+    def lesson_data(self, i, **extra):
+        return {
+            'title': f'Урок {i}',
+            'description': 'Описание',
+            'video_link': f'https://youtu.be/video{i}',
+            **extra
+        }
+
+    def test_bulk_create_and_update(self):
+        """Тест: уроки создаются и обновляются пакетом, ошибки не прерывают загрузку"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        lessons = [self.lesson_data(i) for i in range(20)]
+        lessons += [
+            self.lesson_data('bad', video_link='https://vimeo.com/123'),
+            {'title': 'Без описания', 'video_link': 'https://youtu.be/x'},
+            'не объект',
+            {'id': self.lesson.pk, 'title': 'Новое название', 'video_link': 'https://youtube.com/watch?v=new123'},
+            {'id': self.lesson.pk + 1000, 'title': 'Чужой урок'},
+        ]
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(self.url, {'course_id': self.course.pk, 'lessons': lessons}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['created']), 20)
+        self.assertEqual(response.data['updated'], [{'index': 23, 'id': self.lesson.pk}])
+        self.assertEqual([error['index'] for error in response.data['errors']], [20, 21, 22, 24])
+        self.assertIn('video_link', response.data['errors'][0]['errors'])
+        self.assertIn('description', response.data['errors'][1]['errors'])
+        # Число запросов не зависит от размера пакета
+        self.assertLess(len(context.captured_queries), 20)
+
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.lessons_count, 21)
+        self.lesson.refresh_from_db()
+        self.assertEqual((self.lesson.title, self.lesson.video_id), ('Новое название', 'new123'))
+        created = Lesson.objects.get(pk=response.data['created'][3]['id'])
+        self.assertEqual((created.title, created.video_id, created.owner_id), ('Урок 3', 'video3', self.user.pk))
+
+        search = self.client.get(reverse('lesson-list-create'), {'search': 'название'})
+        self.assertEqual([lesson['id'] for lesson in search.data['results']], [self.lesson.pk])
+
+    def test_foreign_course(self):
+        """Тест: загрузка в чужой курс запрещена"""
+        self.client.force_authenticate(user=self.other_user)
+
+        response = self.client.post(
+            self.url, {'course_id': self.course.pk, 'lessons': [self.lesson_data(1)]}, format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(Lesson.objects.count(), 1)
+
+    def test_invalid_request(self):
+        """Тест: пустой пакет отклоняется целиком"""
+        response = self.client.post(self.url, {'course_id': self.course.pk, 'lessons': []}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class CourseTransferTestCase(APITestCase):
+    """Тесты выгрузки и загрузки курсов с уроками в JSONL"""
+
+    def setUp(self):
+        """Подготовка тестовых данных"""
+        self.user = User.objects.create_user(
+            email='transfer@test.com',
+            password='testpass123',
+            first_name='Transfer',
+            last_name='User',
+            phone='+1234567890',
+            city='Moscow'
+        )
+        for i in range(3):
+            course = Course.objects.create(title=f'Курс {i}', description='Описание', price='10.00', owner=self.user)
+            for j in range(2):
+                Lesson.objects.create(
+                    title=f'Урок {i}.{j}',
+                    description='Описание',
+                    video_link=f'https://youtube.com/watch?v=v{i}{j}',
+                    course=course,
+                    owner=self.user
+                )
+
+    def export(self, **options):
+        out = StringIO()
+        call_command('export_courses', stdout=out, **options)
+        return out.getvalue().splitlines()
+
+    def test_export_import_round_trip(self):
+        """Тест: выгруженные курсы загружаются обратно с уроками и владельцами"""
+        import json
+        import os
+        import tempfile
+
+        lines = self.export(batch_size=2)
+        self.assertEqual(len(lines), 3)
+        record = json.loads(lines[0])
+        self.assertEqual((record['title'], record['owner'], record['price']), ('Курс 0', 'transfer@test.com', '10.00'))
+        self.assertEqual([lesson['title'] for lesson in record['lessons']], ['Урок 0.0', 'Урок 0.1'])
+
+        Course.objects.all().delete()
+        with tempfile.NamedTemporaryFile('w', suffix='.jsonl', delete=False, encoding='utf-8') as source:
+            source.write('\n'.join(lines + ['{"title": "Без описания"}', 'не json']))
+        self.addCleanup(os.remove, source.name)
+        out = StringIO()
+        call_command('import_courses', source.name, batch_size=2, stdout=out, stderr=StringIO())
+
+        self.assertIn('Загружено курсов: 3, уроков: 6, пропущено записей: 2', out.getvalue())
+        course = Course.objects.get(title='Курс 1')
+        self.assertEqual((course.owner_id, course.lessons_count), (self.user.pk, 2))
+        lesson = course.lessons.order_by('created_at', 'id').first()
+        self.assertEqual((lesson.title, lesson.video_id, lesson.owner_id), ('Урок 1.0', 'v10', self.user.pk))
+
+    def test_import_reports_invalid_records(self):
+        """Тест: записи с неизвестным владельцем или чужими ссылками пропускаются"""
+        from courses.transfer import import_courses
+
+        lines = [
+            '{"title": "Курс", "description": "Описание", "owner": "nobody@test.com"}',
+            '{"title": "Курс", "description": "Описание", "lessons": ['
+            '{"title": "Урок", "description": "Описание", "video_link": "https://vimeo.com/1"}]}',
+            '{"title": "Курс без владельца", "description": "Описание"}',
+        ]
+        result = import_courses(lines)
+
+        self.assertEqual((result['courses'], result['lessons']), (1, 0))
+        self.assertEqual([error['line'] for error in result['errors']], [1, 2])
+        self.assertIn('owner', result['errors'][0]['errors'])
+        self.assertIn('video_link', result['errors'][1]['errors'])
+
+    def test_api_export_and_import(self):
+        """Тест: выгрузка через API и загрузка файла с назначением текущему пользователю"""
+        from django.core.files.uploadedfile import SimpleUploadedFile
+
+        other = User.objects.create_user(email='importer@test.com', password='testpass123', phone='+1', city='Moscow')
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(reverse('course-export'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        content = b''.join(response.streaming_content)
+        self.assertEqual(len(content.splitlines()), 3)
+
+        self.client.force_authenticate(user=other)
+        upload = SimpleUploadedFile('courses.jsonl', content, content_type='application/x-ndjson')
+        response = self.client.post(reverse('course-import-file'), {'file': upload}, format='multipart')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data['courses'], response.data['lessons']), (3, 6))
+        self.assertEqual(Lesson.objects.filter(owner=other).count(), 6)
+        listed = self.client.get(reverse('course-list'))
+        self.assertEqual(listed.data['count'], 3)
@@ -0,0 +1,154 @@
+import re
+import unittest
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from courses.models import Course, Lesson
+from users.models import Payment
+
+User = get_user_model()
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'План запроса разбирается в формате SQLite')
+class QueryPlanIndexTestCase(APITestCase):
+    """Тесты: основные запросы эндпоинтов используют индексы (EXPLAIN QUERY PLAN)"""
+
+    def setUp(self):
+        """Подготовка тестовых данных"""
+        self.user = User.objects.create_user(
+            email='plan@test.com',
+            password='testpass123',
+            phone='+1234567890',
+            city='Moscow'
+        )
+        self.moderator = User.objects.create_user(
+            email='moderator@test.com',
+            password='testpass123',
+            phone='+1234567890',
+            city='Moscow'
+        )
+        moderators, _ = Group.objects.get_or_create(name='Модераторы')
+        self.moderator.groups.add(moderators)
+
+        for i in range(3):
+            course = Course.objects.create(title=f'Курс {i}', description='Описание', owner=self.user)
+            Lesson.objects.create(
+                title=f'Урок {i}',
+                description='Описание',
+                video_link='https://youtube.com/watch?v=test123',
+                course=course,
+                owner=self.user
+            )
+            Payment.objects.create(
+                user=self.user,
+                course=course,
+                amount=Decimal('10.00'),
+                payment_method='stripe',
+                stripe_session_id=f'cs_plan_{i}'
+            )
+
+    def capture(self, url, user, **params):
+        """Выполняет запрос к эндпоинту и возвращает выполненные SQL-запросы"""
+        self.client.force_authenticate(user=user)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [query['sql'] for query in context.captured_queries]
+
+    def find_query(self, queries, pattern):
+        """Первый запрос, подходящий под регулярное выражение"""
+        for sql in queries:
+            if re.search(pattern, sql):
+                return sql
+        self.fail(f'Запрос {pattern!r} не выполнялся')
+
+    def query_plan(self, sql, params=()):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            return '\n'.join(row[-1] for row in cursor.fetchall())
+
+    def assert_uses_index(self, sql, table, index, params=(), ordered_by_index=True):
+        """Проверяет, что таблица читается по индексу (и без отдельной сортировки)"""
+        plan = self.query_plan(sql, params)
+        self.assertRegex(plan, rf'{table} USING (COVERING )?INDEX {index}\b', plan)
+        if ordered_by_index:
+            self.assertNotIn('TEMP B-TREE FOR ORDER BY', plan)
+
+    def assert_queryset_uses_index(self, queryset, table, index):
+        sql, params = queryset.query.sql_with_params()
+        self.assert_uses_index(sql, table, index, params)
+
+    def test_course_list_for_owner(self):
+        """Тест: курсы владельца выбираются по индексу (owner, -created_at)"""
+        queries = self.capture(reverse('course-list'), self.user)
+        sql = self.find_query(queries, r'FROM "courses_course".*ORDER BY')
+        self.assert_uses_index(sql, 'courses_course', 'course_owner_created_idx')
+
+    def test_course_list_for_moderator(self):
+        """Тест: общий список курсов читается по индексу -created_at"""
+        queries = self.capture(reverse('course-list'), self.moderator)
+        sql = self.find_query(queries, r'FROM "courses_course".*ORDER BY')
+        self.assert_uses_index(sql, 'courses_course', 'course_created_idx')
+
+    def test_course_list_by_popularity(self):
+        """Тест: сортировка курсов по счетчикам читается по их индексам"""
+        for ordering, index in [('-subscribers_count', 'course_subscribers_idx'), ('-lessons_count', 'course_lessons_count_idx')]:
+            with self.subTest(ordering=ordering):
+                queries = self.capture(reverse('course-list'), self.moderator, ordering=ordering)
+                sql = self.find_query(queries, r'FROM "courses_course".*ORDER BY')
+                self.assert_uses_index(sql, 'courses_course', index)
+
+    def test_course_search(self):
+        """Тест: поиск отбирает курсы по поисковому индексу, а не просмотром таблицы"""
+        for user in (self.user, self.moderator):
+            with self.subTest(user=user.email):
+                queries = self.capture(reverse('course-list'), user, search='курс')
+                sql = self.find_query(queries, r'^SELECT "courses_course"\."id".*ORDER BY')
+                plan = self.query_plan(sql)
+                self.assertNotRegex(plan, r'SCAN (TABLE )?courses_course\b', plan)
+                self.assertRegex(plan, r'SEARCH (TABLE )?courses_course USING .*rowid=\?', plan)
+                self.assertRegex(plan, r'SEARCH (TABLE )?U0 USING (COVERING )?INDEX', plan)
+
+    def test_course_lessons_prefetch(self):
+        """Тест: уроки курсов загружаются по индексу (course, created_at)"""
+        # Уроки нескольких курсов (IN) сортируются уже после выборки
+        queries = self.capture(reverse('course-list'), self.user)
+        sql = self.find_query(queries, r'FROM "courses_lesson" WHERE "courses_lesson"."course_id" IN')
+        self.assert_uses_index(sql, 'courses_lesson', 'lesson_course_created_idx', ordered_by_index=False)
+
+    def test_lesson_list_for_owner(self):
+        """Тест: уроки владельца выбираются и сортируются по индексу"""
+        queries = self.capture(reverse('lesson-list-create'), self.user)
+        sql = self.find_query(queries, r'FROM "courses_lesson".*ORDER BY')
+        self.assert_uses_index(sql, 'courses_lesson', 'lesson_owner_created_idx')
+
+    def test_lesson_list_for_moderator(self):
+        """Тест: общий список уроков сортируется по индексу"""
+        queries = self.capture(reverse('lesson-list-create'), self.moderator)
+        sql = self.find_query(queries, r'FROM "courses_lesson".*ORDER BY')
+        self.assert_uses_index(sql, 'courses_lesson', 'lesson_created_idx')
+
+    def test_payment_history(self):
+        """Тест: история платежей выбирается и сортируется по индексу"""
+        queries = self.capture(reverse('payment-list'), self.user)
+        sql = self.find_query(queries, r'FROM "users_payment".*ORDER BY')
+        self.assert_uses_index(sql, 'users_payment', 'payment_user_date_idx')
+
+    def test_pending_payments_for_reconcile(self):
+        """Тест: ожидающие платежи для сверки выбираются по индексу (status, id)"""
+        queryset = Payment.objects.filter(
+            status='pending', stripe_session_id__isnull=False, id__gt=0
+        ).order_by('id').values('id')[:500]
+        self.assert_queryset_uses_index(queryset, 'users_payment', 'payment_status_idx')
+
+    def test_payment_by_stripe_session(self):
+        """Тест: платеж находится по индексу stripe_session_id"""
+        queryset = Payment.objects.filter(stripe_session_id__in=['cs_plan_1']).values('id')
+        self.assert_queryset_uses_index(queryset, 'users_payment', r'users_payment_stripe_session_id_\w+')
@@ -0,0 +1,568 @@
+import csv
+import hashlib
+import hmac
+import json
+import time
+from decimal import Decimal
+from io import StringIO
+from types import SimpleNamespace
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from courses.models import Course, Lesson
+from users.models import Payment, PaymentRollup, StripeEvent
+from users.rollups import update_payment_status
+from users.stripe_service import process_stripe_events
+
+User = get_user_model()
+
+
+class StripeCheckoutTestCase(APITestCase):
+    """Тесты создания платежей через Stripe"""
+
+    def setUp(self):
+        """Подготовка тестовых данных"""
+        self.user = User.objects.create_user(
+            email='buyer@test.com',
+            password='testpass123',
+            first_name='Buyer',
+            last_name='User',
+            phone='+1234567890',
+            city='Moscow'
+        )
+        self.course = Course.objects.create(
+            title='Платный курс',
+            description='Описание',
+            price=Decimal('1000.00'),
+            owner=self.user
+        )
+        self.client.force_authenticate(user=self.user)
+
+        counter = iter(range(1, 1000))
+        patches = {
+            'product': mock.patch(
+                'stripe.Product.create',
+                side_effect=lambda **kwargs: SimpleNamespace(id=f'prod_{next(counter)}')
+            ),
+            'price': mock.patch(
+                'stripe.Price.create',
+                side_effect=lambda **kwargs: SimpleNamespace(id=f'price_{next(counter)}')
+            ),
+            'session': mock.patch(
+                'stripe.checkout.Session.create',
+                side_effect=lambda **kwargs: SimpleNamespace(
+                    id=f'cs_{next(counter)}', url='https://checkout.stripe.com/pay'
+                )
+            ),
+        }
+        self.stripe = {name: patcher.start() for name, patcher in patches.items()}
+        for patcher in patches.values():
+            self.addCleanup(patcher.stop)
+
+    def checkout(self):
+        response = self.client.post(reverse('payment-list'), {
+            'course_id': self.course.pk,
+            'amount': self.course.price,
+            'payment_method': 'stripe'
+        })
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return Payment.objects.get(pk=response.data['id'])
+
+    def test_product_and_price_are_reused(self):
+        """Тест: повторная оплата курса создает только сессию"""
+        first = self.checkout()
+        second = self.checkout()
+
+        self.assertEqual(self.stripe['product'].call_count, 1)
+        self.assertEqual(self.stripe['price'].call_count, 1)
+        self.assertEqual(self.stripe['session'].call_count, 2)
+        self.assertEqual(first.stripe_price_id, second.stripe_price_id)
+        self.assertNotEqual(first.stripe_session_id, second.stripe_session_id)
+
+    def test_price_change_creates_new_price(self):
+        """Тест: изменение цены курса создает новую цену для того же продукта"""
+        first = self.checkout()
+        self.course.refresh_from_db()
+        self.course.price = Decimal('1500.00')
+        self.course.save()
+        second = self.checkout()
+
+        self.assertEqual(self.stripe['product'].call_count, 1)
+        self.assertEqual(self.stripe['price'].call_count, 2)
+        self.assertEqual(first.stripe_product_id, second.stripe_product_id)
+        self.assertNotEqual(first.stripe_price_id, second.stripe_price_id)
+        self.assertEqual(second.amount, Decimal('1500.00'))
+
+
+@override_settings(STRIPE_WEBHOOK_SECRET='whsec_test')
+class StripeWebhookTestCase(APITestCase):
+    """Тесты приема webhook-событий Stripe"""
+
+    def setUp(self):
+        """Подготовка тестовых данных"""
+        self.user = User.objects.create_user(
+            email='buyer@test.com',
+            password='testpass123',
+            first_name='Buyer',
+            last_name='User',
+            phone='+1234567890',
+            city='Moscow'
+        )
+        self.payment = Payment.objects.create(
+            user=self.user,
+            amount=Decimal('1000.00'),
+            payment_method='stripe',
+            stripe_session_id='cs_test_1'
+        )
+        self.url = reverse('stripe-webhook')
+
+    def send_event(self, event_id, event_type, session, secret='whsec_test'):
+        """Отправляет подписанное событие, как это делает Stripe"""
+        payload = json.dumps({
+            'id': event_id,
+            'object': 'event',
+            'type': event_type,
+            'created': int(time.time()),
+            'data': {'object': {'object': 'checkout.session', **session}},
+        })
+        timestamp = int(time.time())
+        signature = hmac.new(
+            secret.encode(), f'{timestamp}.{payload}'.encode(), hashlib.sha256
+        ).hexdigest()
+        return self.client.post(
+            self.url, payload, content_type='application/json',
+            HTTP_STRIPE_SIGNATURE=f't={timestamp},v1={signature}'
+        )
+
+    def test_completed_session_marks_payment_paid(self):
+        """Тест: завершенная оплаченная сессия переводит платеж в статус paid"""
+        response = self.send_event(
+            'evt_1', 'checkout.session.completed',
+            {'id': 'cs_test_1', 'payment_status': 'paid'}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, 'paid')
+
+    def test_duplicate_event_is_ignored(self):
+        """Тест: повторная доставка события не обрабатывается второй раз"""
+        self.send_event('evt_1', 'checkout.session.expired', {'id': 'cs_test_1'})
+        Payment.objects.filter(pk=self.payment.pk).update(status='pending')
+
+        response = self.send_event('evt_1', 'checkout.session.expired', {'id': 'cs_test_1'})
+
+        self.assertTrue(response.data['duplicate'])
+        self.assertEqual(StripeEvent.objects.count(), 1)
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, 'pending')
+
+    def test_late_completed_event_keeps_paid_status(self):
+        """Тест: запоздавшее событие завершения сессии не возвращает оплаченный платеж в pending"""
+        self.send_event('evt_1', 'checkout.session.async_payment_succeeded', {'id': 'cs_test_1'})
+        self.send_event(
+            'evt_2', 'checkout.session.completed',
+            {'id': 'cs_test_1', 'payment_status': 'unpaid'}
+        )
+        self.send_event('evt_3', 'checkout.session.expired', {'id': 'cs_test_1'})
+
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, 'paid')
+
+    def test_late_completed_event_in_same_batch(self):
+        """Тест: в одном пакете событие pending не перекрывает итоговый статус"""
+        created = timezone.now()
+        StripeEvent.objects.create(
+            event_id='evt_1', event_type='checkout.session.async_payment_succeeded',
+            session_id='cs_test_1', payload={'id': 'cs_test_1'}, created=created
+        )
+        StripeEvent.objects.create(
+            event_id='evt_2', event_type='checkout.session.completed', session_id='cs_test_1',
+            payload={'id': 'cs_test_1', 'payment_status': 'unpaid'}, created=created
+        )
+
+        process_stripe_events()
+
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, 'paid')
+
+    def test_invalid_signature_rejected(self):
+        """Тест: событие с неверной подписью отклоняется"""
+        response = self.send_event(
+            'evt_1', 'checkout.session.completed',
+            {'id': 'cs_test_1', 'payment_status': 'paid'},
+            secret='whsec_wrong'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(StripeEvent.objects.exists())
+
+    def test_check_status_reads_local_state(self):
+        """Тест: проверка статуса не обращается к Stripe"""
+        self.send_event(
+            'evt_1', 'checkout.session.completed',
+            {'id': 'cs_test_1', 'payment_status': 'paid'}
+        )
+        self.client.force_authenticate(user=self.user)
+
+        with mock.patch('stripe.checkout.Session.retrieve') as retrieve:
+            response = self.client.get(reverse('payment-check-status', kwargs={'pk': self.payment.pk}))
+
+        retrieve.assert_not_called()
+        self.assertEqual(response.data['status'], 'paid')
+
+
+class ReconcilePaymentsTestCase(TestCase):
+    """Тесты команды сверки ожидающих платежей со Stripe"""
+
+    def setUp(self):
+        """Подготовка тестовых данных"""
+        self.user = User.objects.create_user(
+            email='buyer@test.com',
+            password='testpass123',
+            first_name='Buyer',
+            last_name='User',
+            phone='+1234567890',
+            city='Moscow'
+        )
+        self.sessions = {}
+        for i, (payment_status, session_status) in enumerate([
+            ('paid', 'complete'),
+            ('unpaid', 'expired'),
+            ('unpaid', 'open'),
+            ('paid', 'complete'),
+            ('paid', 'complete'),
+        ]):
+            session_id = f'cs_test_{i}'
+            Payment.objects.create(
+                user=self.user,
+                amount=Decimal('1000.00'),
+                payment_method='stripe',
+                stripe_session_id=session_id
+            )
+            self.sessions[session_id] = SimpleNamespace(
+                id=session_id, payment_status=payment_status, status=session_status
+            )
+
+    def run_command(self, *args, on_list=None):
+        out = StringIO()
+        listed = [self.sessions['cs_test_0'], self.sessions['cs_test_1']]
+
+        def list_sessions(**kwargs):
+            if on_list:
+                on_list()
+            return SimpleNamespace(auto_paging_iter=lambda: iter(listed))
+
+        with mock.patch(
+            'stripe.checkout.Session.list', side_effect=list_sessions
+        ) as list_sessions, mock.patch(
+            'stripe.checkout.Session.retrieve',
+            side_effect=lambda session_id: self.sessions[session_id]
+        ) as retrieve:
+            call_command('reconcile_payments', *args, stdout=out)
+        return list_sessions, retrieve, out.getvalue()
+
+    def test_statuses_are_updated(self):
+        """Тест: статусы ожидающих платежей обновляются по данным Stripe"""
+        list_sessions, retrieve, output = self.run_command('--chunk-size', '2')
+
+        statuses = dict(Payment.objects.values_list('stripe_session_id', 'status'))
+        self.assertEqual(statuses, {
+            'cs_test_0': 'paid',
+            'cs_test_1': 'cancelled',
+            'cs_test_2': 'pending',
+            'cs_test_3': 'paid',
+            'cs_test_4': 'paid',
+        })
+        # Три порции: list API на каждую, отдельные запросы только для ненайденных
+        self.assertEqual(list_sessions.call_count, 3)
+        self.assertEqual(retrieve.call_count, 3)
+        self.assertIn('платежей/с', output)
+
+    def test_concurrent_update_is_kept(self):
+        """Тест: статус, измененный во время запросов к Stripe, не перезаписывается"""
+        def expire_first():
+            Payment.objects.filter(stripe_session_id='cs_test_0', status='pending').update(status='cancelled')
+
+        self.run_command('--chunk-size', '2', on_list=expire_first)
+
+        statuses = dict(Payment.objects.values_list('stripe_session_id', 'status'))
+        self.assertEqual(statuses['cs_test_0'], 'cancelled')
+        self.assertEqual(statuses['cs_test_1'], 'cancelled')
+        self.assertEqual(statuses['cs_test_3'], 'paid')
+
+    def test_dry_run_does_not_save(self):
+        """Тест: в режиме --dry-run изменения не сохраняются"""
+        self.run_command('--dry-run', '--no-list')
+
+        self.assertFalse(Payment.objects.exclude(status='pending').exists())
+
+
+class PaymentExportTestCase(APITestCase):
+    """Тесты потоковой выгрузки платежей"""
+
+    def setUp(self):
+        """Подготовка тестовых данных"""
+        self.user = User.objects.create_user(
+            email='finance@test.com',
+            password='testpass123',
+            phone='+1234567890',
+            city='Moscow'
+        )
+        self.other_user = User.objects.create_user(
+            email='other@test.com',
+            password='testpass123',
+            phone='+1234567890',
+            city='Moscow'
+        )
+        self.course = Course.objects.create(title='Курс, "с запятой"', description='Описание', price=Decimal('100.00'))
+        self.other_course = Course.objects.create(title='Другой курс', description='Описание', price=Decimal('50.00'))
+        Payment.objects.create(user=self.user, course=self.course, amount=Decimal('100.00'), payment_method='stripe', status='paid')
+        Payment.objects.create(user=self.user, course=self.other_course, amount=Decimal('50.00'), payment_method='cash')
+        Payment.objects.create(user=self.other_user, course=self.course, amount=Decimal('100.00'), payment_method='stripe')
+        self.url = reverse('payment-export')
+        self.client.force_authenticate(user=self.user)
+
+    def get_export(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode('utf-8'), response
+
+    def test_csv_export(self):
+        """Тест: CSV содержит только платежи пользователя"""
+        content, response = self.get_export()
+
+        rows = list(csv.DictReader(StringIO(content)))
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertIn('payments.csv', response['Content-Disposition'])
+        self.assertEqual([row['course_title'] for row in rows], ['Другой курс', 'Курс, "с запятой"'])
+        self.assertEqual({row['user_email'] for row in rows}, {'finance@test.com'})
+        self.assertEqual(rows[1]['amount'], '100.00')
+
+    def test_jsonl_export_with_filter(self):
+        """Тест: JSONL учитывает фильтры PaymentFilter"""
+        content, _ = self.get_export(file_format='jsonl', payment_method='cash')
+
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['course_id'], self.other_course.pk)
+        self.assertEqual(rows[0]['amount'], '50.00')
+
+    def test_unknown_format(self):
+        """Тест: неизвестный формат выгрузки"""
+        response = self.client.get(self.url, {'file_format': 'xml'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_export_command(self):
+        """Тест: команда выгружает платежи всех пользователей с фильтром"""
+        out = StringIO()
+        call_command('export_payments', '--format', 'jsonl', '--course', str(self.course.pk), stdout=out)
+
+        rows = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([row['user_email'] for row in rows], ['finance@test.com', 'other@test.com'])
+
+
+class PaymentListQueriesTestCase(APITestCase):
+    """Тесты количества SQL-запросов в истории платежей"""
+
+    def setUp(self):
+        """Подготовка тестовых данных"""
+        self.user = User.objects.create_user(
+            email='history@test.com',
+            password='testpass123',
+            phone='+1234567890',
+            city='Moscow'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('payment-list')
+
+    def create_payments(self, count):
+        start = Payment.objects.count()
+        for i in range(start, start + count):
+            course = Course.objects.create(title=f'Курс {i}', description='Описание', price=Decimal('10.00'))
+            lesson = Lesson.objects.create(
+                title=f'Урок {i}',
+                description='Описание',
+                video_link='https://youtube.com/watch?v=test123',
+                course=course
+            )
+            Payment.objects.create(
+                user=self.user,
+                course=course,
+                lesson=lesson,
+                amount=Decimal('10.00'),
+                payment_method='stripe',
+                stripe_price_id='price_test'
+            )
+
+    def get_list(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.url, {'page_size': 50})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return context.captured_queries, response
+
+    def test_list_queries_do_not_depend_on_page_size(self):
+        """Тест: страница истории платежей загружается одним запросом"""
+        self.create_payments(2)
+        small_queries, _ = self.get_list()
+
+        self.create_payments(8)
+        large_queries, response = self.get_list()
+
+        self.assertEqual(len(small_queries), len(large_queries))
+        self.assertEqual(len(response.data['results']), 10)
+        self.assertEqual(
+            {item['lesson_title'] for item in response.data['results']},
+            {f'Урок {i}' for i in range(10)}
+        )
+        select_sql = large_queries[-1]['sql']
+        self.assertIn('courses_lesson', select_sql)
+        self.assertNotIn('stripe_price_id', select_sql)
+
+    def test_retrieve(self):
+        """Тест: детали платежа с названием курса"""
+        self.create_payments(1)
+        payment = Payment.objects.get()
+
+        response = self.client.get(reverse('payment-detail', args=[payment.pk]))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['course_title'], 'Курс 0')
+        self.assertEqual(response.data['status_display'], 'Ожидает оплаты')
+
+
+class PaymentRollupTestCase(APITestCase):
+    """Тесты сводок выручки и отчета о продажах"""
+
+    def setUp(self):
+        """Подготовка тестовых данных"""
+        self.owner = User.objects.create_user(
+            email='owner@test.com',
+            password='testpass123',
+            phone='+1234567890',
+            city='Moscow'
+        )
+        self.buyer = User.objects.create_user(
+            email='buyer@test.com',
+            password='testpass123',
+            phone='+1234567890',
+            city='Moscow'
+        )
+        self.course = Course.objects.create(title='Мой курс', description='Описание', owner=self.owner)
+        self.other_course = Course.objects.create(title='Чужой курс', description='Описание', owner=self.buyer)
+        self.url = reverse('revenue-report')
+
+    def create_payment(self, course, amount, **kwargs):
+        kwargs.setdefault('payment_method', 'stripe')
+        return Payment.objects.create(user=self.buyer, course=course, amount=Decimal(amount), **kwargs)
+
+    def rollup_values(self):
+        return sorted(
+            PaymentRollup.objects.filter(payment_count__gt=0)
+            .values_list('course_id', 'status', 'payment_method', 'payment_count', 'revenue')
+        )
+
+    def test_rollups_follow_payment_changes(self):
+        """Тест: сводки обновляются при создании, смене статуса и удалении"""
+        first = self.create_payment(self.course, '100.00')
+        self.create_payment(self.course, '50.00')
+        self.create_payment(self.course, '20.00', payment_method='cash', status='paid')
+        self.assertEqual(self.rollup_values(), [
+            (self.course.pk, 'paid', 'cash', 1, Decimal('20.00')),
+            (self.course.pk, 'pending', 'stripe', 2, Decimal('150.00')),
+        ])
+
+        first.status = 'paid'
+        first.save()
+        update_payment_status(Payment.objects.filter(status='pending'), 'cancelled')
+        payment = Payment.objects.only('id', 'status').get(payment_method='cash')
+        payment.status = 'failed'
+        payment.save(update_fields=['status'])
+
+        self.assertEqual(self.rollup_values(), [
+            (self.course.pk, 'cancelled', 'stripe', 1, Decimal('50.00')),
+            (self.course.pk, 'failed', 'cash', 1, Decimal('20.00')),
+            (self.course.pk, 'paid', 'stripe', 1, Decimal('100.00')),
+        ])
+
+        Payment.objects.get(pk=first.pk).delete()
+        incremental = self.rollup_values()
+        self.assertNotIn((self.course.pk, 'paid', 'stripe', 1, Decimal('100.00')), incremental)
+
+        call_command('rebuild_payment_rollups', stdout=StringIO())
+        self.assertEqual(self.rollup_values(), incremental)
+
+    def test_webhook_processing_updates_rollups(self):
+        """Тест: пакетная обработка событий Stripe переносит платеж в оплаченные"""
+        self.create_payment(self.course, '100.00', stripe_session_id='cs_rollup')
+        StripeEvent.objects.create(
+            event_id='evt_rollup',
+            event_type='checkout.session.completed',
+            session_id='cs_rollup',
+            payload={'id': 'cs_rollup', 'payment_status': 'paid'},
+            created=timezone.now()
+        )
+
+        process_stripe_events()
+
+        self.assertEqual(self.rollup_values(), [(self.course.pk, 'paid', 'stripe', 1, Decimal('100.00'))])
+
+    def test_reconcile_during_webhook_keeps_rollups(self):
+        """Тест: сверка после webhook, пришедшего во время запроса к Stripe, не меняет сводки второй раз"""
+        self.create_payment(self.course, '100.00', stripe_session_id='cs_race')
+        session = SimpleNamespace(id='cs_race', payment_status='paid', status='complete')
+
+        def list_sessions(**kwargs):
+            update_payment_status(Payment.objects.filter(stripe_session_id='cs_race'), 'paid')
+            return SimpleNamespace(auto_paging_iter=lambda: iter([session]))
+
+        with mock.patch('stripe.checkout.Session.list', side_effect=list_sessions):
+            call_command('reconcile_payments', stdout=StringIO())
+
+        self.assertEqual(
+            sorted(PaymentRollup.objects.values_list('status', 'payment_count', 'revenue')),
+            [('paid', 1, Decimal('100.00')), ('pending', 0, Decimal('0.00'))]
+        )
+
+    def test_report_for_owner(self):
+        """Тест: владелец видит выручку только своих курсов"""
+        self.create_payment(self.course, '100.00', status='paid')
+        self.create_payment(self.course, '40.00', status='paid', payment_method='cash')
+        self.create_payment(self.course, '70.00')
+        self.create_payment(self.other_course, '500.00', status='paid')
+        self.client.force_authenticate(user=self.owner)
+
+        # Роли пользователя, итоги и строки отчета
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['totals'], {'payment_count': 2, 'revenue': '140.00'})
+        self.assertEqual(response.data['results'], [
+            {'course_id': self.course.pk, 'course_title': 'Мой курс', 'payment_count': 2, 'revenue': '140.00'},
+        ])
+
+        response = self.client.get(self.url, {'group_by': 'day', 'status': 'pending'})
+        self.assertEqual(response.data['results'], [
+            {'day': timezone.localdate().isoformat(), 'payment_count': 1, 'revenue': '70.00'},
+        ])
+
+    def test_report_invalid_params(self):
+        """Тест: неверные параметры отчета"""
+        self.client.force_authenticate(user=self.owner)
+
+        response = self.client.get(self.url, {'date_from': '2024-02-01', 'date_to': '2024-01-01'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -5,7 +5,8 @@
 
 from django.test import TestCase
 from django.core.exceptions import ValidationError
-from courses.validators import validate_youtube_url, YouTubeURLValidator
+from courses.admin import LessonAdminForm
+from courses.validators import check_youtube_url, validate_youtube_url, validate_many, extract_video_id, YouTubeURLValidator
 
 
 class YouTubeValidatorTest(TestCase):
@@ -100,3 +101,44 @@ class ValidationErrorMessagesTest(TestCase):
             validate_youtube_url('http://youtube.com/watch?v=123')
         
         self.assertIn('HTTPS протокол', str(cm.exception))
+
+    def test_admin_form_message(self):
+        """Форма урока в админке выводит сообщение валидатора без обертки"""
+        form = LessonAdminForm(data={'video_link': 'https://vimeo.com/123'})
+        form.is_valid()
+
+        self.assertEqual(form.errors['video_link'], [check_youtube_url('https://vimeo.com/123').message])
+
+
+class BatchValidationTest(TestCase):
+    """Тесты пакетной проверки ссылок и извлечения ID видео"""
+
+    def test_validate_many(self):
+        """Тест: результаты возвращаются для каждой ссылки в исходном порядке"""
+        results = validate_many([
+            'https://youtu.be/dQw4w9WgXcQ',
+            'https://vimeo.com/123',
+            'http://youtube.com/watch?v=dQw4w9WgXcQ',
+            '',
+        ])
+
+        self.assertEqual([result.is_valid for result in results], [True, False, False, True])
+        self.assertEqual([result.code for result in results], [None, 'invalid_url', 'insecure_url', None])
+        self.assertEqual(results[0].video_id, 'dQw4w9WgXcQ')
+
+    def test_extract_video_id(self):
+        """Тест: разные формы ссылки дают один и тот же ID видео"""
+        urls = [
+            'https://www.youtube.com/watch?v=dQw4w9WgXcQ&t=42',
+            'https://youtu.be/dQw4w9WgXcQ?si=abc',
+            'https://m.youtube.com/watch?v=dQw4w9WgXcQ',
+            'https://www.youtube.com/embed/dQw4w9WgXcQ',
+            'https://youtube.com/shorts/dQw4w9WgXcQ',
+        ]
+
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(extract_video_id(url), 'dQw4w9WgXcQ')
+
+        self.assertIsNone(extract_video_id('https://www.youtube.com/channel/UC123'))
+        self.assertIsNone(extract_video_id('https://vimeo.com/123'))
@@ -1,6 +1,7 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import User
+from courses.admin_filters import AutocompleteFilter, AutocompleteFilterMixin
+from .models import Payment, User
 
 @admin.register(User)
 class CustomUserAdmin(UserAdmin):
@@ -23,3 +24,14 @@ class CustomUserAdmin(UserAdmin):
     )
     
     ordering = ('email',)
+
+
+@admin.register(Payment)
+class PaymentAdmin(AutocompleteFilterMixin, admin.ModelAdmin):
+    list_display = ('user', 'course', 'lesson', 'amount', 'payment_method', 'status', 'payment_date')
+    list_filter = ('status', 'payment_method', ('course', AutocompleteFilter))
+    list_select_related = ('user', 'course', 'lesson')
+    search_fields = ('user__email', 'stripe_session_id')
+    autocomplete_fields = ('user', 'course')
+    raw_id_fields = ('lesson',)
+    readonly_fields = ('payment_date',)
@@ -0,0 +1,121 @@
+"""
+Аутентификация по JWT без запроса пользователя к базе данных.
+
+RoleTokenObtainPairSerializer добавляет в access-токен email и роли
+пользователя, RoleTokenRefreshSerializer заново читает роли при каждом
+обновлении access-токена (в refresh-токен роли не записываются).
+StatelessJWTAuthentication строит по таким токенам легковесного пользователя
+RoleTokenUser, поэтому запросы к API авторизуются без обращения к таблицам
+пользователей и групп. Роли в токене актуальны на момент его выдачи
+(не дольше ACCESS_TOKEN_LIFETIME).
+
+Режим включается заменой класса в DEFAULT_AUTHENTICATION_CLASSES на
+'users.authentication.StatelessJWTAuthentication'.
+"""
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import update_last_login
+from django.utils.functional import cached_property
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+
+from courses.roles import get_roles_for_user
+
+ROLES_CLAIM = 'roles'
+EMAIL_CLAIM = 'email'
+
+
+def add_role_claims(token, user):
+    """Записывает в access-токен email и текущие роли пользователя"""
+    token[EMAIL_CLAIM] = user.email
+    token[ROLES_CLAIM] = sorted(get_roles_for_user(user))
+    return token
+
+
+class RoleTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """Выдает пару токенов; email и роли пользователя - только в access-токене"""
+
+    def validate(self, attrs):
+        # Проверка учетных данных без выпуска токенов, пара выпускается ниже
+        data = super(TokenObtainPairSerializer, self).validate(attrs)
+        refresh = self.get_token(self.user)
+        data['refresh'] = str(refresh)
+        data['access'] = str(add_role_claims(refresh.access_token, self.user))
+        if api_settings.UPDATE_LAST_LOGIN:
+            update_last_login(None, self.user)
+        return data
+
+
+class RoleTokenObtainPairView(TokenObtainPairView):
+    """Получение пары токенов с ролями пользователя"""
+    serializer_class = RoleTokenObtainPairSerializer
+
+
+class RoleTokenRefreshSerializer(TokenRefreshSerializer):
+    """Обновляет access-токен с ролями, прочитанными заново"""
+
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        access = AccessToken(data['access'])
+        try:
+            user = get_user_model().objects.get(**{api_settings.USER_ID_FIELD: access[api_settings.USER_ID_CLAIM]})
+        except get_user_model().DoesNotExist:
+            raise AuthenticationFailed('Пользователь не найден')
+        data['access'] = str(add_role_claims(access, user))
+        return data
+
+
+class RoleTokenRefreshView(TokenRefreshView):
+    """Обновление access-токена с актуальными ролями пользователя"""
+    serializer_class = RoleTokenRefreshSerializer
+
+
+class RoleTokenUser(TokenUser):
+    """
+    Пользователь, построенный по данным токена.
+    Полная модель пользователя загружается только через get_user().
+    """
+
+    @cached_property
+    def email(self):
+        return self.token.get(EMAIL_CLAIM, '')
+
+    @cached_property
+    def token_roles(self):
+        """Роли из токена или None для токенов, выданных без ролей"""
+        roles = self.token.get(ROLES_CLAIM)
+        return frozenset(roles) if roles is not None else None
+
+    def get_user(self):
+        """Загружает полную модель пользователя (один раз на объект)"""
+        # TokenUser.__getattr__ отдает claims токена, поэтому проверяем __dict__
+        user = self.__dict__.get('_user')
+        if user is None:
+            try:
+                user = get_user_model().objects.get(pk=self.pk)
+            except get_user_model().DoesNotExist:
+                raise AuthenticationFailed('Пользователь не найден')
+            self._user = user
+        return user
+
+
+class StatelessJWTAuthentication(JWTStatelessUserAuthentication):
+    """Аутентификация по JWT без запроса пользователя к базе данных"""
+
+    def get_user(self, validated_token):
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken('Токен не содержит идентификатор пользователя')
+        return RoleTokenUser(validated_token)
+
+
+def get_full_user(user):
+    """Возвращает модель пользователя, загружая ее для пользователя из токена"""
+    if isinstance(user, RoleTokenUser):
+        return user.get_user()
+    return user
@@ -0,0 +1,69 @@
+"""
+Потоковая выгрузка платежей в CSV и JSONL.
+
+Строки читаются из базы порциями через iterator(chunk_size=...) и сразу
+превращаются в текст, поэтому расход памяти не зависит от числа платежей.
+Используется эндпоинтом /api/users/payments/export/ и командой export_payments.
+"""
+
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+# Колонки выгрузки: имя колонки -> поле для values()
+EXPORT_FIELDS = {
+    'id': 'id',
+    'user_email': 'user__email',
+    'course_id': 'course_id',
+    'course_title': 'course__title',
+    'lesson_id': 'lesson_id',
+    'lesson_title': 'lesson__title',
+    'amount': 'amount',
+    'payment_method': 'payment_method',
+    'status': 'status',
+    'payment_date': 'payment_date',
+    'stripe_session_id': 'stripe_session_id',
+}
+
+DEFAULT_CHUNK_SIZE = 2000
+
+
+class _Echo:
+    """Псевдо-файл для csv.writer: возвращает записанную строку вместо записи"""
+
+    def write(self, value):
+        return value
+
+
+def iter_export_rows(queryset, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Возвращает кортежи значений колонок EXPORT_FIELDS (связи подтягиваются JOIN)"""
+    if not queryset.ordered:
+        queryset = queryset.order_by('id')
+    return queryset.values_list(*EXPORT_FIELDS.values()).iterator(chunk_size=chunk_size)
+
+
+def iter_csv(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def iter_jsonl(rows):
+    columns = list(EXPORT_FIELDS)
+    for row in rows:
+        yield json.dumps(dict(zip(columns, row)), cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+
+# Формат -> (генератор строк, Content-Type)
+EXPORT_FORMATS = {
+    'csv': (iter_csv, 'text/csv; charset=utf-8'),
+    'jsonl': (iter_jsonl, 'application/x-ndjson; charset=utf-8'),
+}
+
+
+def export_payments(queryset, file_format, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Генератор строк выгрузки платежей в формате 'csv' или 'jsonl'"""
+    serializer, _ = EXPORT_FORMATS[file_format]
+    return serializer(iter_export_rows(queryset, chunk_size))
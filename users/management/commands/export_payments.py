@@ -0,0 +1,75 @@
+from django.core.management.base import BaseCommand, CommandError
+from users.exports import DEFAULT_CHUNK_SIZE, EXPORT_FORMATS, export_payments
+from users.filters import PaymentFilter
+from users.models import Payment
+
+
+class Command(BaseCommand):
+    help = 'Выгружает платежи в CSV или JSONL для бухгалтерии'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--format',
+            dest='file_format',
+            choices=list(EXPORT_FORMATS),
+            default='csv',
+            help='Формат выгрузки'
+        )
+        parser.add_argument(
+            '--output',
+            help='Путь к файлу (по умолчанию вывод в stdout)'
+        )
+        parser.add_argument('--course', type=int, help='ID курса')
+        parser.add_argument('--lesson', type=int, help='ID урока')
+        parser.add_argument(
+            '--payment-method',
+            choices=[choice for choice, _ in Payment.PAYMENT_METHOD_CHOICES],
+            help='Способ оплаты'
+        )
+        parser.add_argument('--date-from', help='Начало периода (YYYY-MM-DD или ISO дата и время)')
+        parser.add_argument('--date-to', help='Конец периода (YYYY-MM-DD или ISO дата и время)')
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=DEFAULT_CHUNK_SIZE,
+            help='Количество строк, читаемых из базы за один раз'
+        )
+
+    def handle(self, *args, **options):
+        filter_data = {
+            'course': options['course'],
+            'lesson': options['lesson'],
+            'payment_method': options['payment_method'],
+            'payment_date_after': options['date_from'],
+            'payment_date_before': options['date_to'],
+        }
+        payment_filter = PaymentFilter(
+            data={key: value for key, value in filter_data.items() if value is not None},
+            queryset=Payment.objects.all()
+        )
+        if not payment_filter.is_valid():
+            raise CommandError(f'Неверные параметры фильтра: {payment_filter.errors.as_text()}')
+
+        lines = export_payments(
+            payment_filter.qs,
+            options['file_format'],
+            chunk_size=options['chunk_size']
+        )
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8', newline='') as output:
+                count = self._write(lines, output.write)
+            if options['file_format'] == 'csv':
+                count -= 1  # строка заголовка
+            self.stderr.write(self.style.SUCCESS(f'Выгружено платежей: {count} -> {options["output"]}'))
+        else:
+            self._write(lines, self.stdout.write)
+
+    @staticmethod
+    def _write(lines, write):
+        """Пишет строки выгрузки и возвращает их число"""
+        count = 0
+        for line in lines:
+            write(line)
+            count += 1
+        return count
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from users.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает сводки выручки и продаж по таблице платежей'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Размер пакета при записи сводок'
+        )
+
+    def handle(self, *args, **options):
+        count = rebuild_rollups(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Пересчитано строк сводок: {count}'))
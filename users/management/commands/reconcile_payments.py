@@ -0,0 +1,101 @@
+import time
+from datetime import timedelta
+
+import stripe
+from django.core.management.base import BaseCommand
+from users.models import Payment
+from users.rollups import update_payment_status
+from users.stripe_service import fetch_session_statuses
+
+# Сессия создается в Stripe немного раньше, чем платеж в нашей базе
+SESSION_TIME_MARGIN = timedelta(minutes=5)
+
+
+class Command(BaseCommand):
+    help = 'Сверяет ожидающие платежи со Stripe и обновляет их статусы'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Количество платежей в одной порции'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=8,
+            help='Максимальное число параллельных запросов к Stripe'
+        )
+        parser.add_argument(
+            '--no-list',
+            action='store_true',
+            help='Не использовать list API, запрашивать каждую сессию отдельно'
+        )
+        parser.add_argument(
+            '--api-base',
+            help='Адрес Stripe API (например, локального stripe-mock)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Показать изменения без сохранения'
+        )
+
+    def handle(self, *args, **options):
+        if options['api_base']:
+            stripe.api_base = options['api_base']
+
+        pending = Payment.objects.filter(
+            status='pending',
+            stripe_session_id__isnull=False
+        ).only('id', 'stripe_session_id', 'payment_date').order_by('id')
+
+        started = time.monotonic()
+        processed = updated = 0
+        last_id = 0
+
+        while True:
+            chunk = list(pending.filter(id__gt=last_id)[:options['chunk_size']])
+            if not chunk:
+                break
+            last_id = chunk[-1].id
+
+            created_from = created_to = None
+            if not options['no_list']:
+                created_from = min(payment.payment_date for payment in chunk) - SESSION_TIME_MARGIN
+                created_to = max(payment.payment_date for payment in chunk) + SESSION_TIME_MARGIN
+
+            statuses = fetch_session_statuses(
+                [payment.stripe_session_id for payment in chunk],
+                created_from=created_from,
+                created_to=created_to,
+                max_workers=options['workers']
+            )
+
+            payments_by_status = {}
+            for payment in chunk:
+                new_status = statuses.get(payment.stripe_session_id)
+                if new_status and new_status != 'pending':
+                    payments_by_status.setdefault(new_status, []).append(payment.pk)
+
+            for new_status, payment_ids in payments_by_status.items():
+                if options['dry_run']:
+                    updated += len(payment_ids)
+                    continue
+                # Пока шли запросы к Stripe, платеж мог изменить webhook:
+                # обновляются только платежи, которые все еще ожидают оплаты
+                updated += update_payment_status(
+                    Payment.objects.filter(pk__in=payment_ids, status='pending'),
+                    new_status
+                )
+
+            processed += len(chunk)
+            self.stdout.write(f'Обработано платежей: {processed}, изменено: {updated}')
+
+        elapsed = time.monotonic() - started
+        throughput = processed / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово: {processed} платежей, изменено {updated}, '
+            f'{elapsed:.2f} с ({throughput:.1f} платежей/с)'
+        ))
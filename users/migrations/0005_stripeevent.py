@@ -0,0 +1,36 @@
+# Generated by Django 4.2.7 on 2026-10-17 23:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_payment'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='payment',
+            name='stripe_session_id',
+            field=models.CharField(blank=True, db_index=True, max_length=255, null=True, verbose_name='Stripe Session ID'),
+        ),
+        migrations.CreateModel(
+            name='StripeEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_id', models.CharField(max_length=255, unique=True, verbose_name='Stripe Event ID')),
+                ('event_type', models.CharField(max_length=100, verbose_name='Тип события')),
+                ('session_id', models.CharField(blank=True, max_length=255, null=True, verbose_name='Stripe Session ID')),
+                ('payload', models.JSONField(verbose_name='Данные события')),
+                ('created', models.DateTimeField(verbose_name='Дата события в Stripe')),
+                ('received_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата получения')),
+                ('processed_at', models.DateTimeField(blank=True, null=True, verbose_name='Дата обработки')),
+            ],
+            options={
+                'verbose_name': 'Событие Stripe',
+                'verbose_name_plural': 'События Stripe',
+                'indexes': [models.Index(fields=['processed_at', 'created'], name='stripe_event_pending_idx')],
+            },
+        ),
+    ]
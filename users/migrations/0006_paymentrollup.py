@@ -0,0 +1,52 @@
+# Generated by Django 4.2.7 on 2026-10-18 00:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+
+def build_rollups(apps, schema_editor):
+    """Строит сводки по уже существующим платежам"""
+    Payment = apps.get_model('users', 'Payment')
+    PaymentRollup = apps.get_model('users', 'PaymentRollup')
+    aggregated = (
+        Payment.objects.annotate(day=TruncDate('payment_date'))
+        .values('day', 'course_id', 'status', 'payment_method')
+        .annotate(payment_count=Count('id'), revenue=Sum('amount'))
+        .order_by()
+    )
+    PaymentRollup.objects.bulk_create(
+        (PaymentRollup(**row) for row in aggregated.iterator(chunk_size=1000)),
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0007_lesson_video_id'),
+        ('users', '0005_stripeevent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaymentRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='День')),
+                ('status', models.CharField(choices=[('pending', 'Ожидает оплаты'), ('paid', 'Оплачено'), ('cancelled', 'Отменено'), ('failed', 'Ошибка оплаты')], max_length=20, verbose_name='Статус платежа')),
+                ('payment_method', models.CharField(choices=[('cash', 'Наличные'), ('transfer', 'Перевод на счет'), ('stripe', 'Stripe')], max_length=20, verbose_name='Способ оплаты')),
+                ('payment_count', models.IntegerField(default=0, verbose_name='Количество платежей')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Сумма')),
+                ('course', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='payment_rollups', to='courses.course', verbose_name='Курс')),
+            ],
+            options={
+                'verbose_name': 'Сводка платежей',
+                'verbose_name_plural': 'Сводки платежей',
+                'indexes': [models.Index(fields=['day'], name='payment_rollup_day_idx')],
+                'unique_together': {('course', 'day', 'status', 'payment_method')},
+            },
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 
 
@@ -61,7 +62,7 @@ class Payment(models.Model):
     
     # Stripe fields
     stripe_payment_intent_id = models.CharField(max_length=255, blank=True, null=True, verbose_name='Stripe Payment Intent ID')
-    stripe_session_id = models.CharField(max_length=255, blank=True, null=True, verbose_name='Stripe Session ID')
+    stripe_session_id = models.CharField(max_length=255, blank=True, null=True, db_index=True, verbose_name='Stripe Session ID')
     stripe_product_id = models.CharField(max_length=255, blank=True, null=True, verbose_name='Stripe Product ID')
     stripe_price_id = models.CharField(max_length=255, blank=True, null=True, verbose_name='Stripe Price ID')
     payment_url = models.URLField(blank=True, null=True, verbose_name='Ссылка на оплату')
@@ -70,6 +71,86 @@ class Payment(models.Model):
     class Meta:
         verbose_name = 'Платеж'
         verbose_name_plural = 'Платежи'
+        indexes = [
+            # История платежей пользователя, новые сначала
+            models.Index(fields=['user', '-payment_date'], name='payment_user_date_idx'),
+            # Выборка платежей по статусу порциями по id (сверка со Stripe)
+            models.Index(fields=['status', 'id'], name='payment_status_idx'),
+        ]
 
     def __str__(self):
-        return f'Платеж {self.user.email} - {self.amount} руб. ({self.get_status_display()})'
\ No newline at end of file
+        return f'Платеж {self.user.email} - {self.amount} руб. ({self.get_status_display()})'
+
+    # Поля, от которых зависят сводки PaymentRollup
+    ROLLUP_FIELDS = ('payment_date', 'course_id', 'status', 'payment_method', 'amount')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Состояние из базы нужно, чтобы при сохранении обновить сводки разницей
+        instance._rollup_state = instance.get_rollup_state()
+        return instance
+
+    def get_rollup_state(self):
+        """
+        Возвращает (день, курс, статус, способ оплаты, сумма)
+        или None, если часть полей не загружена (only/defer).
+        """
+        if any(field not in self.__dict__ for field in self.ROLLUP_FIELDS) or self.payment_date is None:
+            return None
+        return (
+            timezone.localdate(self.payment_date),
+            self.course_id,
+            self.status,
+            self.payment_method,
+            self.amount,
+        )
+
+
+class StripeEvent(models.Model):
+    """Событие Stripe, полученное через webhook (хранится один раз на event ID)"""
+    event_id = models.CharField(max_length=255, unique=True, verbose_name='Stripe Event ID')
+    event_type = models.CharField(max_length=100, verbose_name='Тип события')
+    session_id = models.CharField(max_length=255, blank=True, null=True, verbose_name='Stripe Session ID')
+    payload = models.JSONField(verbose_name='Данные события')
+    created = models.DateTimeField(verbose_name='Дата события в Stripe')
+    received_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата получения')
+    processed_at = models.DateTimeField(null=True, blank=True, verbose_name='Дата обработки')
+
+    class Meta:
+        verbose_name = 'Событие Stripe'
+        verbose_name_plural = 'События Stripe'
+        indexes = [
+            models.Index(fields=['processed_at', 'created'], name='stripe_event_pending_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.event_type} ({self.event_id})'
+
+
+class PaymentRollup(models.Model):
+    """Дневная сводка платежей по курсу, статусу и способу оплаты"""
+    day = models.DateField(verbose_name='День')
+    course = models.ForeignKey(
+        'courses.Course',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='payment_rollups',
+        verbose_name='Курс'
+    )
+    status = models.CharField(max_length=20, choices=Payment.PAYMENT_STATUS_CHOICES, verbose_name='Статус платежа')
+    payment_method = models.CharField(max_length=20, choices=Payment.PAYMENT_METHOD_CHOICES, verbose_name='Способ оплаты')
+    payment_count = models.IntegerField(default=0, verbose_name='Количество платежей')
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name='Сумма')
+
+    class Meta:
+        verbose_name = 'Сводка платежей'
+        verbose_name_plural = 'Сводки платежей'
+        unique_together = ('course', 'day', 'status', 'payment_method')
+        indexes = [
+            models.Index(fields=['day'], name='payment_rollup_day_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.day} курс #{self.course_id} {self.status}/{self.payment_method}: {self.payment_count}'
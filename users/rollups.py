@@ -0,0 +1,99 @@
+"""
+Сводки выручки и продаж (PaymentRollup).
+
+Для каждого дня, курса, статуса и способа оплаты хранится число платежей
+и их сумма. Сводки обновляются разницей при создании, изменении и удалении
+платежей (сигналы в users/signals.py, массовые обновления статусов через
+update_payment_status) и полностью пересчитываются командой
+rebuild_payment_rollups. Отчеты читают только сводки.
+"""
+
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+
+from .models import Payment, PaymentRollup
+
+
+def add_rollup_delta(deltas, state, sign):
+    """Добавляет в deltas вклад платежа с состоянием state (sign = 1 или -1)"""
+    if state is None:
+        return
+    day, course_id, status, payment_method, amount = state
+    delta = deltas.setdefault((day, course_id, status, payment_method), [0, Decimal('0')])
+    delta[0] += sign
+    delta[1] += sign * (amount or 0)
+
+
+def apply_rollup_deltas(deltas, create=True):
+    """
+    Применяет накопленные изменения к таблице сводок.
+    С create=False отсутствующие строки не создаются (при удалении платежей
+    строки сводок могли быть удалены каскадно вместе с курсом).
+    """
+    for (day, course_id, status, payment_method), (count, revenue) in deltas.items():
+        if not count and not revenue:
+            continue
+        rollups = PaymentRollup.objects.filter(
+            day=day, course_id=course_id, status=status, payment_method=payment_method
+        )
+        changes = {'payment_count': F('payment_count') + count, 'revenue': F('revenue') + revenue}
+        if rollups.update(**changes) or not create:
+            continue
+        try:
+            with transaction.atomic():
+                PaymentRollup.objects.create(
+                    day=day, course_id=course_id, status=status, payment_method=payment_method,
+                    payment_count=count, revenue=revenue
+                )
+        except IntegrityError:
+            # Строку успел создать параллельный процесс
+            rollups.update(**changes)
+
+
+def update_payment_status(queryset, status):
+    """
+    Меняет статус платежей одним UPDATE и обновляет сводки.
+    Строки блокируются и перечитываются, поэтому разница для сводок
+    считается по состоянию в базе, а не по ранее загруженным объектам.
+    Возвращает количество измененных платежей.
+    """
+    with transaction.atomic():
+        rows = list(
+            queryset.exclude(status=status).select_for_update()
+            .values_list('pk', 'payment_date', 'course_id', 'status', 'payment_method', 'amount')
+        )
+        if not rows:
+            return 0
+        Payment.objects.filter(pk__in=[row[0] for row in rows]).update(status=status)
+
+        deltas = {}
+        for payment_id, payment_date, course_id, old_status, payment_method, amount in rows:
+            payment = Payment(
+                pk=payment_id, payment_date=payment_date, course_id=course_id,
+                status=old_status, payment_method=payment_method, amount=amount
+            )
+            add_rollup_delta(deltas, payment.get_rollup_state(), -1)
+            payment.status = status
+            add_rollup_delta(deltas, payment.get_rollup_state(), 1)
+        apply_rollup_deltas(deltas)
+    return len(rows)
+
+
+def rebuild_rollups(batch_size=1000):
+    """Пересчитывает все сводки по таблице платежей, возвращает число строк сводок"""
+    aggregated = (
+        Payment.objects.annotate(day=TruncDate('payment_date'))
+        .values('day', 'course_id', 'status', 'payment_method')
+        .annotate(payment_count=Count('id'), revenue=Sum('amount'))
+        .order_by()
+    )
+    with transaction.atomic():
+        PaymentRollup.objects.all().delete()
+        rollups = PaymentRollup.objects.bulk_create(
+            (PaymentRollup(**row) for row in aggregated.iterator(chunk_size=batch_size)),
+            batch_size=batch_size
+        )
+    return len(rollups)
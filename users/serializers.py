@@ -84,3 +84,29 @@ class PaymentResponseSerializer(serializers.ModelSerializer):
         model = Payment
         fields = ['id', 'amount', 'payment_method', 'payment_date', 'status', 'status_display', 
                  'payment_url', 'course_title', 'lesson_title', 'stripe_session_id']
+
+
+class RevenueReportQuerySerializer(serializers.Serializer):
+    """Параметры отчета о выручке"""
+    date_from = serializers.DateField(required=False, help_text='Начало периода (включительно)')
+    date_to = serializers.DateField(required=False, help_text='Конец периода (включительно)')
+    course = serializers.IntegerField(required=False, min_value=1, help_text='ID курса')
+    status = serializers.ChoiceField(choices=Payment.PAYMENT_STATUS_CHOICES, default='paid')
+    payment_method = serializers.ChoiceField(choices=Payment.PAYMENT_METHOD_CHOICES, required=False)
+    group_by = serializers.ChoiceField(choices=['course', 'day'], default='course')
+
+    def validate(self, attrs):
+        date_from = attrs.get('date_from')
+        date_to = attrs.get('date_to')
+        if date_from and date_to and date_from > date_to:
+            raise serializers.ValidationError("Начало периода позже его конца")
+        return attrs
+
+
+class RevenueReportRowSerializer(serializers.Serializer):
+    """Строка отчета о выручке: за день или по курсу"""
+    day = serializers.DateField(required=False)
+    course_id = serializers.IntegerField(required=False)
+    course_title = serializers.CharField(required=False)
+    payment_count = serializers.IntegerField()
+    revenue = serializers.DecimalField(max_digits=14, decimal_places=2)
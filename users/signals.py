@@ -0,0 +1,41 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import Payment
+from .rollups import add_rollup_delta, apply_rollup_deltas
+
+
+@receiver(pre_save, sender=Payment)
+def remember_payment_state(sender, instance, raw=False, **kwargs):
+    """Запоминает состояние платежа в базе, если оно не было загружено вместе с объектом"""
+    if raw or instance._state.adding or getattr(instance, '_rollup_state', None) is not None:
+        return
+    old = Payment.objects.filter(pk=instance.pk).only(*Payment.ROLLUP_FIELDS).first()
+    instance._rollup_state = old.get_rollup_state() if old else None
+
+
+@receiver(post_save, sender=Payment)
+def update_rollups_on_save(sender, instance, created, raw=False, **kwargs):
+    """Обновляет сводки разницей между прежним и новым состоянием платежа"""
+    if raw:
+        return
+    old_state = None if created else getattr(instance, '_rollup_state', None)
+    new_state = instance.get_rollup_state()
+    if new_state is None:
+        # Объект загружен не полностью (only/defer): берем сохраненное состояние из базы
+        new_state = Payment.objects.only(*Payment.ROLLUP_FIELDS).get(pk=instance.pk).get_rollup_state()
+    if old_state == new_state:
+        return
+    deltas = {}
+    add_rollup_delta(deltas, old_state, -1)
+    add_rollup_delta(deltas, new_state, 1)
+    apply_rollup_deltas(deltas)
+    instance._rollup_state = new_state
+
+
+@receiver(post_delete, sender=Payment)
+def update_rollups_on_delete(sender, instance, **kwargs):
+    """Вычитает удаленный платеж из сводок"""
+    deltas = {}
+    add_rollup_delta(deltas, getattr(instance, '_rollup_state', None) or instance.get_rollup_state(), -1)
+    apply_rollup_deltas(deltas, create=False)
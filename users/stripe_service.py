@@ -4,7 +4,12 @@
 
 import stripe
 from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
 from decimal import Decimal
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone as dt_timezone
+import json
 import logging
 
 logger = logging.getLogger(__name__)
@@ -131,22 +136,127 @@ def get_payment_status(session_id):
     """
     try:
         session = retrieve_stripe_session(session_id)
-        
-        if session.payment_status == 'paid':
-            return 'paid'
-        elif session.payment_status == 'unpaid':
-            return 'pending'
-        else:
-            return 'failed'
+        return get_session_payment_status(session)
     except Exception as e:
         logger.error(f"Ошибка получения статуса платежа: {e}")
         return 'failed'
 
 
+def get_session_payment_status(session):
+    """
+    Переводит состояние сессии Stripe в статус платежа
+    
+    Args:
+        session: Сессия оплаты Stripe
+    
+    Returns:
+        str: Статус платежа ('pending', 'paid', 'cancelled', 'failed')
+    """
+    if session.payment_status == 'paid':
+        return 'paid'
+    elif session.status == 'expired':
+        return 'cancelled'
+    elif session.payment_status == 'unpaid':
+        return 'pending'
+    else:
+        return 'failed'
+
+
+def fetch_session_statuses(session_ids, created_from=None, created_to=None, max_workers=8):
+    """
+    Получает статусы платежей для набора сессий Stripe
+    
+    Если задан интервал создания сессий, сначала используется list API
+    (до 100 сессий за запрос). Оставшиеся сессии запрашиваются по одной
+    с ограниченным числом параллельных запросов.
+    
+    Args:
+        session_ids (iterable): ID сессий в Stripe
+        created_from (datetime, optional): Начало интервала создания сессий
+        created_to (datetime, optional): Конец интервала создания сессий
+        max_workers (int): Максимальное число параллельных запросов
+    
+    Returns:
+        dict: Статус платежа по ID сессии (сессии с ошибкой запроса пропускаются)
+    """
+    remaining = set(session_ids)
+    statuses = {}
+    
+    if remaining and created_from is not None and created_to is not None:
+        sessions = stripe.checkout.Session.list(
+            limit=100,
+            created={'gte': int(created_from.timestamp()), 'lte': int(created_to.timestamp())}
+        )
+        for session in sessions.auto_paging_iter():
+            if session.id in remaining:
+                statuses[session.id] = get_session_payment_status(session)
+                remaining.discard(session.id)
+                if not remaining:
+                    break
+    
+    def retrieve(session_id):
+        try:
+            return retrieve_stripe_session(session_id)
+        except stripe.error.StripeError:
+            return None
+    
+    if remaining:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for session in executor.map(retrieve, remaining):
+                if session is not None:
+                    statuses[session.id] = get_session_payment_status(session)
+    
+    return statuses
+
+
+def get_or_create_course_price(course):
+    """
+    Возвращает продукт и цену Stripe для курса, создавая их только при необходимости
+    
+    Продукт создается один раз на курс. Цена создается заново только если
+    Course.price изменилась с момента создания предыдущей цены.
+    
+    Args:
+        course: Объект курса
+    
+    Returns:
+        tuple: (product_id, price_id)
+    """
+    from courses.models import Course
+    
+    if course.stripe_price_id and course.stripe_price_amount == course.price:
+        return course.stripe_product_id, course.stripe_price_id
+    
+    product_id = course.stripe_product_id
+    if not product_id:
+        product = create_stripe_product(
+            course_title=course.title,
+            course_description=course.description or f"Курс: {course.title}"
+        )
+        product_id = product.id
+    
+    price = create_stripe_price(product_id=product_id, amount=course.price)
+    
+    # update() не меняет updated_at курса и не вызывает сигналы
+    Course.objects.filter(pk=course.pk).update(
+        stripe_product_id=product_id,
+        stripe_price_id=price.id,
+        stripe_price_amount=course.price
+    )
+    course.stripe_product_id = product_id
+    course.stripe_price_id = price.id
+    course.stripe_price_amount = course.price
+    
+    return product_id, price.id
+
+
 def create_payment_flow(course, user, success_url, cancel_url):
     """
     Создает полный процесс оплаты для курса
     
+    Продукт и цена Stripe берутся из курса, поэтому обычно
+    при оплате создается только сессия.
+    
     Args:
         course: Объект курса
         user: Объект пользователя
@@ -157,29 +267,20 @@ def create_payment_flow(course, user, success_url, cancel_url):
         dict: Данные для создания платежа
     """
     try:
-        # 1. Создаем продукт в Stripe
-        product = create_stripe_product(
-            course_title=course.title,
-            course_description=course.description or f"Курс: {course.title}"
-        )
-        
-        # 2. Создаем цену в Stripe
-        price = create_stripe_price(
-            product_id=product.id,
-            amount=course.price
-        )
+        # 1. Получаем (или создаем) продукт и цену в Stripe
+        product_id, price_id = get_or_create_course_price(course)
         
-        # 3. Создаем сессию оплаты
+        # 2. Создаем сессию оплаты
         session = create_stripe_checkout_session(
-            price_id=price.id,
+            price_id=price_id,
             success_url=success_url,
             cancel_url=cancel_url,
             customer_email=user.email
         )
         
         return {
-            'product_id': product.id,
-            'price_id': price.id,
+            'product_id': product_id,
+            'price_id': price_id,
             'session_id': session.id,
             'payment_url': session.url,
             'amount': course.price
@@ -187,3 +288,120 @@ def create_payment_flow(course, user, success_url, cancel_url):
     except Exception as e:
         logger.error(f"Ошибка создания процесса оплаты: {e}")
         raise
+
+
+# Статусы платежа, которые устанавливают события Checkout Session
+SESSION_EVENT_STATUSES = {
+    'checkout.session.async_payment_succeeded': 'paid',
+    'checkout.session.async_payment_failed': 'failed',
+    'checkout.session.expired': 'cancelled',
+}
+
+
+def construct_webhook_event(payload, signature):
+    """
+    Проверяет подпись webhook-запроса Stripe и возвращает событие
+    
+    Args:
+        payload (bytes): Тело запроса
+        signature (str): Заголовок Stripe-Signature
+    
+    Returns:
+        dict: Проверенное событие в виде словаря
+    
+    Raises:
+        ValueError: Некорректное тело запроса
+        stripe.error.SignatureVerificationError: Неверная подпись
+    """
+    if isinstance(payload, bytes):
+        payload = payload.decode('utf-8')
+    stripe.WebhookSignature.verify_header(payload, signature, settings.STRIPE_WEBHOOK_SECRET)
+    return json.loads(payload)
+
+
+def store_stripe_event(event):
+    """
+    Сохраняет событие Stripe, если оно еще не было получено
+    
+    Args:
+        event (dict): Событие Stripe
+    
+    Returns:
+        bool: True, если событие новое
+    """
+    from .models import StripeEvent
+    
+    data_object = event['data']['object']
+    session_id = data_object.get('id') if data_object.get('object') == 'checkout.session' else None
+    _, created = StripeEvent.objects.get_or_create(
+        event_id=event['id'],
+        defaults={
+            'event_type': event['type'],
+            'session_id': session_id,
+            'payload': data_object,
+            'created': datetime.fromtimestamp(event['created'], tz=dt_timezone.utc),
+        }
+    )
+    return created
+
+
+def get_event_payment_status(event_type, data_object):
+    """Возвращает статус платежа для события или None, если событие не меняет статус"""
+    if event_type == 'checkout.session.completed':
+        # Для отложенных способов оплаты сессия завершается до поступления денег
+        return 'paid' if data_object.get('payment_status') == 'paid' else 'pending'
+    return SESSION_EVENT_STATUSES.get(event_type)
+
+
+def process_stripe_events(batch_size=500):
+    """
+    Применяет необработанные события Stripe к платежам пакетами
+    
+    В пределах пакета для каждой сессии берется статус самого позднего
+    события, после чего платежи обновляются одним UPDATE на статус.
+    Stripe не гарантирует порядок доставки событий, поэтому меняются только
+    ожидающие платежи: оплаченный, отмененный или неуспешный платеж
+    не возвращается в pending и не переходит в другой итоговый статус.
+    
+    Args:
+        batch_size (int): Количество событий в одном пакете
+    
+    Returns:
+        int: Количество обновленных платежей
+    """
+    from .models import Payment, StripeEvent
+    from .rollups import update_payment_status
+    
+    updated = 0
+    while True:
+        with transaction.atomic():
+            events = list(
+                StripeEvent.objects.select_for_update()
+                .filter(processed_at__isnull=True)
+                .order_by('created', 'id')[:batch_size]
+            )
+            if not events:
+                return updated
+            
+            session_statuses = {}
+            for event in events:
+                payment_status = get_event_payment_status(event.event_type, event.payload)
+                # pending совпадает с исходным статусом платежа и не должен
+                # перекрывать итоговый статус более раннего события
+                if event.session_id and payment_status and payment_status != 'pending':
+                    session_statuses[event.session_id] = payment_status
+            
+            sessions_by_status = {}
+            for session_id, payment_status in session_statuses.items():
+                sessions_by_status.setdefault(payment_status, []).append(session_id)
+            
+            for payment_status, session_ids in sessions_by_status.items():
+                updated += update_payment_status(
+                    Payment.objects.filter(stripe_session_id__in=session_ids, status='pending'),
+                    payment_status
+                )
+            
+            StripeEvent.objects.filter(
+                pk__in=[event.pk for event in events]
+            ).update(processed_at=timezone.now())
+            logger.info(f"Обработано событий Stripe: {len(events)}")
@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import UserRegistrationView, UserProfileView, UserListView, PaymentViewSet
+from .views import UserRegistrationView, UserProfileView, UserListView, PaymentViewSet, StripeWebhookView, RevenueReportView
 
 router = DefaultRouter()
 router.register(r'payments', PaymentViewSet, basename='payment')
@@ -9,5 +9,7 @@ urlpatterns = [
     path('register/', UserRegistrationView.as_view(), name='user-register'),
     path('profile/', UserProfileView.as_view(), name='user-profile'),
     path('list/', UserListView.as_view(), name='user-list'),
+    path('stripe/webhook/', StripeWebhookView.as_view(), name='stripe-webhook'),
+    path('revenue/', RevenueReportView.as_view(), name='revenue-report'),
     path('', include(router.urls)),
 ]
@@ -1,18 +1,30 @@
+from django.http import StreamingHttpResponse
 from django.shortcuts import render, get_object_or_404
 from rest_framework import viewsets, generics, status
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
 from rest_framework.decorators import action
+from rest_framework.views import APIView
 from django.contrib.auth import get_user_model
+from django.db.models import DecimalField, F, Sum, Value
+from django.db.models.functions import Coalesce
 from django.urls import reverse
+from django_filters.rest_framework import DjangoFilterBackend
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
-from .models import User, Payment
+from .models import User, Payment, PaymentRollup
 from .serializers import (UserRegistrationSerializer, UserProfileSerializer, UserListSerializer, 
-                         PaymentSerializer, PaymentCreateSerializer, PaymentResponseSerializer)
+                         PaymentSerializer, PaymentCreateSerializer, PaymentResponseSerializer,
+                         RevenueReportQuerySerializer, RevenueReportRowSerializer)
 from .filters import PaymentFilter
-from .stripe_service import create_payment_flow, get_payment_status
+from .exports import EXPORT_FORMATS, export_payments
+from .authentication import get_full_user
+from .stripe_service import (create_payment_flow, get_payment_status, construct_webhook_event,
+                             store_stripe_event, process_stripe_events)
+import stripe
 from courses.models import Course, Lesson
+from courses.paginators import StandardResultsSetPagination
+from courses.roles import is_moderator
 
 UserModel = get_user_model()
 
@@ -38,7 +50,7 @@ class UserProfileView(generics.RetrieveUpdateAPIView):
     permission_classes = [IsAuthenticated]
 
     def get_object(self):
-        return self.request.user
+        return get_full_user(self.request.user)
 
 class UserListView(generics.ListAPIView):
     """Список пользователей - доступен только авторизованным"""
@@ -51,13 +63,27 @@ class PaymentViewSet(viewsets.ModelViewSet):
     queryset = Payment.objects.all()
     serializer_class = PaymentSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = StandardResultsSetPagination
+    filter_backends = [DjangoFilterBackend]
     filterset_class = PaymentFilter
     ordering_fields = ['payment_date']
     ordering = ['-payment_date']  # По умолчанию сортировка по дате (новые сначала)
     
+    # Колонки, которые читает PaymentResponseSerializer
+    response_fields = [
+        'id', 'amount', 'payment_method', 'payment_date', 'status', 'payment_url',
+        'stripe_session_id', 'course__title', 'lesson__title',
+    ]
+
     def get_queryset(self):
         """Возвращаем только платежи текущего пользователя"""
-        return Payment.objects.filter(user=self.request.user)
+        if getattr(self, 'swagger_fake_view', False):
+            return Payment.objects.none()
+        queryset = Payment.objects.filter(user_id=self.request.user.pk).order_by(*self.ordering)
+        if self.action in ['list', 'retrieve']:
+            # Названия курса и урока берутся JOIN-ом, а не отдельным запросом на строку
+            queryset = queryset.select_related('course', 'lesson').only(*self.response_fields)
+        return queryset
     
     def get_serializer_class(self):
         """Выбираем сериализатор в зависимости от действия"""
@@ -103,7 +129,7 @@ class PaymentViewSet(viewsets.ModelViewSet):
                 
                 # Создаем платеж в нашей системе
                 payment = Payment.objects.create(
-                    user=request.user,
+                    user_id=request.user.pk,
                     course=course,
                     amount=amount,
                     payment_method='stripe',
@@ -129,7 +155,7 @@ class PaymentViewSet(viewsets.ModelViewSet):
                 
                 # Создаем платеж в нашей системе
                 payment = Payment.objects.create(
-                    user=request.user,
+                    user_id=request.user.pk,
                     lesson=lesson,
                     course=lesson.course,
                     amount=amount,
@@ -151,7 +177,17 @@ class PaymentViewSet(viewsets.ModelViewSet):
     
     @swagger_auto_schema(
         operation_summary="Проверить статус платежа",
-        operation_description="Проверяет статус платежа в Stripe",
+        operation_description=(
+            "Возвращает статус платежа, который обновляется webhook-событиями Stripe. "
+            "С параметром refresh=true статус ожидающего платежа дополнительно запрашивается в Stripe."
+        ),
+        manual_parameters=[
+            openapi.Parameter(
+                'refresh', openapi.IN_QUERY,
+                description='Запросить актуальный статус в Stripe',
+                type=openapi.TYPE_BOOLEAN
+            )
+        ],
         responses={
             200: openapi.Response(
                 description="Статус платежа",
@@ -177,6 +213,14 @@ class PaymentViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
+        refresh = request.query_params.get('refresh', '').lower() in ('1', 'true')
+        if not refresh or payment.status != 'pending':
+            return Response({
+                'status': payment.status,
+                'status_display': payment.get_status_display(),
+                'payment_status': payment.status
+            })
+        
         try:
             stripe_status = get_payment_status(payment.stripe_session_id)
             payment.status = stripe_status
@@ -192,3 +236,112 @@ class PaymentViewSet(viewsets.ModelViewSet):
                 {"error": f"Ошибка проверки статуса: {str(e)}"}, 
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+
+    @swagger_auto_schema(
+        operation_summary="Выгрузить платежи",
+        operation_description=(
+            "Потоковая выгрузка платежей текущего пользователя в CSV или JSONL. "
+            "Поддерживает те же фильтры, что и список платежей."
+        ),
+        manual_parameters=[
+            openapi.Parameter(
+                'file_format', openapi.IN_QUERY,
+                description='Формат файла',
+                type=openapi.TYPE_STRING,
+                enum=list(EXPORT_FORMATS),
+                default='csv'
+            )
+        ],
+        responses={200: "Файл выгрузки", 400: "Неизвестный формат"}
+    )
+    @action(detail=False, methods=['get'], pagination_class=None)
+    def export(self, request):
+        """Потоковая выгрузка платежей"""
+        file_format = request.query_params.get('file_format', 'csv')
+        if file_format not in EXPORT_FORMATS:
+            return Response(
+                {"error": f"Неизвестный формат: {file_format}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        queryset = self.filter_queryset(self.get_queryset())
+        response = StreamingHttpResponse(
+            export_payments(queryset, file_format),
+            content_type=EXPORT_FORMATS[file_format][1]
+        )
+        response['Content-Disposition'] = f'attachment; filename="payments.{file_format}"'
+        return response
+
+
+class StripeWebhookView(APIView):
+    """Прием webhook-событий Stripe"""
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    @swagger_auto_schema(auto_schema=None)
+    def post(self, request, *args, **kwargs):
+        """Проверяет подпись, сохраняет событие и обновляет статусы платежей"""
+        try:
+            event = construct_webhook_event(
+                request.body,
+                request.META.get('HTTP_STRIPE_SIGNATURE', '')
+            )
+        except (ValueError, stripe.error.SignatureVerificationError):
+            return Response(
+                {"error": "Неверная подпись или данные события"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        created = store_stripe_event(event)
+        if created:
+            process_stripe_events()
+        
+        return Response({"received": True, "duplicate": not created})
+
+
+class RevenueReportView(APIView):
+    """
+    Выручка и продажи по курсам владельца (модератор видит все курсы).
+    Читает только дневные сводки PaymentRollup, а не таблицу платежей.
+    """
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_summary="Отчет о выручке",
+        operation_description="Сумма и количество платежей по курсам или по дням",
+        query_serializer=RevenueReportQuerySerializer,
+        responses={200: RevenueReportRowSerializer(many=True), 400: "Неверные параметры"}
+    )
+    def get(self, request, *args, **kwargs):
+        query = RevenueReportQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+
+        rollups = PaymentRollup.objects.filter(status=params['status'])
+        if not is_moderator(request):
+            rollups = rollups.filter(course__owner_id=request.user.pk)
+        if 'date_from' in params:
+            rollups = rollups.filter(day__gte=params['date_from'])
+        if 'date_to' in params:
+            rollups = rollups.filter(day__lte=params['date_to'])
+        if 'course' in params:
+            rollups = rollups.filter(course_id=params['course'])
+        if 'payment_method' in params:
+            rollups = rollups.filter(payment_method=params['payment_method'])
+
+        sums = {
+            'payment_count': Coalesce(Sum('payment_count'), 0),
+            'revenue': Coalesce(Sum('revenue'), Value(0), output_field=DecimalField()),
+        }
+        if params['group_by'] == 'day':
+            rows = rollups.values('day').annotate(**sums).order_by('day')
+        else:
+            rows = rollups.values('course_id', course_title=F('course__title')).annotate(**sums).order_by('-revenue', 'course_id')
+
+        totals = rollups.aggregate(**sums)
+        return Response({
+            'group_by': params['group_by'],
+            'status': params['status'],
+            'totals': RevenueReportRowSerializer(totals).data,
+            'results': RevenueReportRowSerializer(rows, many=True).data,
+        })